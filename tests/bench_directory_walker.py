@@ -0,0 +1,94 @@
+# Throughput of the recursive crawl walk on a synthetic tree of scene\
+# folders, against the os.walk loop the crawlers used before the walker.\
+# The second pass adds a fixed latency to every directory listing, the way\
+# a network share answers, which is where the parallel walk pays off.
+#
+#   python tests/bench_directory_walker.py [depth] [width] [latencyMs]
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from conftest import loadShared  # noqa: E402
+
+
+def makeTree(root, depth, width):
+    # width**level folders per level, each with one yaml document and the\
+    # band files next to it
+    directories = [root]
+    count = 0
+    for level in range(depth):
+        children = []
+        for directory in directories:
+            for i in range(width):
+                child = os.path.join(directory, 'd{0}'.format(i))
+                os.mkdir(child)
+                children.append(child)
+                for name in ['doc.yaml'] + ['band{0}.tif'.format(b) for b in range(8)]:
+                    with open(os.path.join(child, name), 'w') as f:
+                        f.write('x')
+                count += 1
+        directories = children
+    return count
+
+
+def walkBaseline(top):
+    # the crawler loop before the walker
+    for root, dirs, files in (os.walk(top)):
+        for file in (files):
+            if (file.endswith(".yaml")):
+                yield os.path.join(root, file)
+
+
+def slowScandir(scandir, latency):
+    def listDirectory(path='.'):
+        time.sleep(latency)
+        return scandir(path)
+    return listDirectory
+
+
+def timeWalk(walk, top, expected):
+    started = time.time()
+    found = sum(1 for path in walk(top))
+    elapsed = time.time() - started
+    if (found != expected):
+        raise Exception('Err. {0} of {1} documents found!'.format(found, expected))
+    return elapsed
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    latency = float(sys.argv[3]) / 1000.0 if len(sys.argv) > 3 else 0.002
+    top = tempfile.mkdtemp()
+    try:
+        count = makeTree(top, depth, width)
+        shared = loadShared()
+        walks = [
+            ('os.walk, endswith', walkBaseline),
+            ('walker, 1 worker', shared.DirectoryWalker('*.yaml', 1).walk),
+            ('walker, 8 workers', shared.DirectoryWalker('*.yaml', 8).walk),
+            ('walker, 32 workers', shared.DirectoryWalker('*.yaml', 32).walk),
+        ]
+        print('{0} folders, {1} files'.format(count + 1, count * 9))
+        for (title, delay) in (('local listing', 0), ('{0:g} ms per listing'.format(latency * 1000), latency)):
+            (scandir, sharedScandir) = (os.scandir, shared.scandir)
+            if (delay):
+                os.scandir = slowScandir(scandir, delay)
+                shared.scandir = slowScandir(sharedScandir, delay)
+            try:
+                print(title)
+                for (name, walk) in walks:
+                    elapsed = min(timeWalk(walk, top, count) for r in range(3))
+                    print('  {0:<22}{1:10.0f} folders/s'.format(name, (count + 1) / elapsed))
+            finally:
+                (os.scandir, shared.scandir) = (scandir, sharedScandir)
+    finally:
+        shutil.rmtree(top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# Per-object latency of readYamlS3_boto3 against a stubbed S3 endpoint.
+# The requests go through the whole botocore pipeline (serializing, signing,\
+# retries, parsing) and are answered by a before-send handler, so no network\
+# is used and the numbers are the client side cost per object.
+#
+#   python tests/bench_s3_client.py [objects] [rounds]
+
+import os
+import sys
+import time
+
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'bench')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'bench')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-west-2')
+
+import boto3
+import yaml
+from botocore.awsrequest import AWSResponse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from conftest import landsatDocument, loadRasterType  # noqa: E402
+
+DOCUMENT = yaml.safe_dump(landsatDocument()).encode('utf-8')
+
+
+class RawBody(object):
+
+    # the urllib3 response botocore reads the object body from
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def read(self, amt=None):
+        end = len(self.data) if amt is None else self.offset + amt
+        chunk = self.data[self.offset:end]
+        self.offset += len(chunk)
+        return chunk
+
+    def stream(self, amt=1024, decode_content=None):
+        chunk = self.read(amt)
+        while (chunk):
+            yield chunk
+            chunk = self.read(amt)
+
+
+def answer(request, **kwargs):
+    headers = {'Content-Length': str(len(DOCUMENT)), 'ETag': '"bench"'}
+    return AWSResponse(request.url, 200, headers, RawBody(DOCUMENT))
+
+
+def readYamlS3_boto3_baseline(bucket, path, gets=1):
+    # the reader before the pooled client: a client per document, and a\
+    # second plain GET in the Geoscience type
+    client = boto3.client('s3')
+    page = client.get_object(Bucket=bucket, Key=path, RequestPayer='requester')
+    for i in range(gets - 1):
+        page = client.get_object(Bucket=bucket, Key=path)
+    return yaml.load(page['Body'].read())
+
+
+def timePerObject(read, objects, rounds):
+    best = None
+    for r in range(rounds):
+        started = time.time()
+        for i in range(objects):
+            read('bucket', 'scenes/{0}/doc.yaml'.format(i))
+        elapsed = (time.time() - started) / objects
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000.0
+
+
+def main():
+    objects = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    # clients created from the default session copy its handlers
+    boto3.setup_default_session()
+    boto3.DEFAULT_SESSION.events.register('before-send.s3.GetObject', answer)
+    module = loadRasterType('DataCube-Landsat')
+    utils = module.Utilities()
+    results = [
+        ('client per object, 1 GET', timePerObject(readYamlS3_boto3_baseline, objects, rounds)),
+        ('client per object, 2 GETs', timePerObject(
+            lambda bucket, path: readYamlS3_boto3_baseline(bucket, path, 2), objects, rounds)),
+        ('pooled client, 1 GET', timePerObject(utils.readYamlS3_boto3, objects, rounds)),
+    ]
+    print('{0} objects, best of {1} rounds'.format(objects, rounds))
+    for (name, ms) in results:
+        print('{0:<28}{1:8.3f} ms/object'.format(name, ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+# Build time per tag of the Sentinel-2 builder, on a cached ARD-METADATA\
+# document so that only the building itself is timed. Other revisions of the\
+# raster type can be timed next to the tree, e.g. the builder that resolved\
+# all the bands of a scene for every tag:
+#
+#   git show 4343862^:types/Geoscience-Sentinel2/Geoscience-Sentinel.py > /tmp/allBands.py
+#   python tests/bench_sentinel2_tags.py /tmp/allBands.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from conftest import BUILD_CASES, loadModule, loadRasterType, sentinel2Document  # noqa: E402
+
+PATH = 's3://bucket/s2/ARD-METADATA.yaml'
+TAGS = BUILD_CASES['Geoscience-Sentinel2'][3]
+
+
+def timePerBuild(module, tag, builds, rounds):
+    # the raster types before the shared module keep their own document cache
+    shared = getattr(module, 'rasterTypeUtils', module)
+    shared.documentCache.put(PATH, sentinel2Document())
+    builder = module.GeoscienceSentinelBuilder()
+    uri = {'path': PATH, 'tag': tag}
+    builder.build(uri)
+    best = None
+    for r in range(rounds):
+        started = time.process_time()
+        for i in range(builds):
+            builder.build(uri)
+        elapsed = (time.process_time() - started) / builds
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000000.0
+
+
+def main():
+    modules = [('tree', loadRasterType('Geoscience-Sentinel2'))]
+    for (i, path) in enumerate(sys.argv[1:]):
+        modules.append((os.path.basename(path), loadModule('sentinel2Bench{0}'.format(i), path)))
+    (builds, rounds) = (200, 25)
+    print('{0} builds per tag, best of {1} rounds, us/build'.format(builds, rounds))
+    print('{0:<16}'.format('tag') + ''.join('{0:>16}'.format(name) for (name, module) in modules))
+    for tag in TAGS:
+        print('{0:<16}'.format(tag) + ''.join(
+            '{0:16.1f}'.format(timePerBuild(module, tag, builds, rounds)) for (name, module) in modules))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+import copy
+import gzip
+import importlib.util
+import io
+import itertools
+import json
+import os
+import sys
+
+import pytest
+import yaml
+
+# arcpy (and osgeo for the Geoscience type) only exist inside ArcGIS, the\
+# stand-ins are appended so that the real packages win where installed
+sys.path.append(os.path.join(os.path.dirname(__file__), 'stubs'))
+
+TYPES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'types')
+
+RASTER_TYPES = {
+    'DataCube-Landsat': 'DataCube-Landsat/DataCube-Landsat.py',
+    'DataCube-Sentinel': 'DataCube-Sentinel/DataCube-Sentinel.py',
+    'GeoScience-Landsat': 'GeoScience-Landsat/Geoscience-Landsat.py',
+    'Geoscience-Sentinel2': 'Geoscience-Sentinel2/Geoscience-Sentinel.py',
+    'Geoscience': 'Geoscience/Geoscience.py',
+    'SuperView-1': 'SuperView-1/SuperView-1.py',
+    'Triplesat': 'Triplesat/TripleSat.py',
+}
+
+YAML_TYPES = ('DataCube-Landsat', 'DataCube-Sentinel', 'GeoScience-Landsat',
+              'Geoscience-Sentinel2', 'Geoscience')
+XML_TYPES = ('SuperView-1', 'Triplesat')
+
+# the raster types call yaml.load without a Loader, which PyYAML 6 rejects
+try:
+    yaml.load('a: 1')
+except TypeError:
+    _yamlLoad = yaml.load
+
+    def _load(stream, Loader=yaml.SafeLoader):
+        return _yamlLoad(stream, Loader=Loader)
+    yaml.load = _load
+
+_moduleIds = itertools.count()
+
+
+def loadModule(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def loadShared():
+    # a fresh copy of the rasterTypeUtils module shared by the raster types,\
+    # registered for the raster type modules loaded after it
+    shared = loadModule('rasterTypeUtils', os.path.join(TYPES, 'common', 'rasterTypeUtils.py'))
+    sys.modules['rasterTypeUtils'] = shared
+    return shared
+
+
+def loadRasterType(name):
+    # a fresh module per call, on a fresh shared module reachable as\
+    # .rasterTypeUtils, so that the module level caches and pools of one test\
+    # are not seen by the next
+    shared = loadShared()
+    module = loadModule('rasterType{0}'.format(next(_moduleIds)),
+                        os.path.join(TYPES, RASTER_TYPES[name]))
+    module.rasterTypeUtils = shared
+    return module
+
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Remote metadata stand-ins
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class FakeResponse(object):
+
+    def __init__(self, content, status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSession(object):
+
+    # serves the documents of a {url: bytes} dict in place of requests.Session
+    def __init__(self, documents):
+        self.documents = documents
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(url)
+        return FakeResponse(self.documents[url], headers={'ETag': '"e"'})
+
+    def head(self, url, allow_redirects=True, timeout=None):
+        return FakeResponse(b'', headers={'ETag': '"e"', 'Content-Length': len(self.documents[url])})
+
+
+class FakeS3Client(object):
+
+    # serves the documents of a {s3 uri: bytes} dict in place of a boto3 client
+    def __init__(self, documents):
+        self.documents = documents
+        self.requests = []
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self.requests.append((Bucket, Key, kwargs))
+        return {'Body': io.BytesIO(self.documents['s3://{0}/{1}'.format(Bucket, Key)]),
+                'ETag': '"e"'}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        return {'ContentLength': len(self.documents['s3://{0}/{1}'.format(Bucket, Key)]),
+                'ETag': '"e"'}
+
+
+def serveRemote(module, documents):
+    # routes the http:// and s3:// reads of a raster type module to the\
+    # documents of a {url: bytes} dict
+    session = FakeSession(documents)
+    client = FakeS3Client(documents)
+    module.rasterTypeUtils.httpTransport._session = session
+    module.rasterTypeUtils.s3ClientPool._client = client
+    return session, client
+
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Metadata documents
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+LANDSAT_DOCUMENT = {
+    'id': 'x',
+    'product_type': 'LaSRC',
+    'platform': {'code': 'LANDSAT_8'},
+    'instrument': {'name': 'OLI'},
+    'extent': {'center_dt': '2018-01-01T00:00:00'},
+    'grid_spatial': {'projection': {
+        'spatial_reference': 'EPSG:32650',
+        'geo_ref_points': {'ll': {'x': 1, 'y': 2}, 'lr': {'x': 3, 'y': 2}, 'ur': {'x': 3, 'y': 4}},
+        'valid_data': {'coordinates': [[[1, 2]]]}}},
+    'image': {'bands': dict((band, {'path': band + '.tif'}) for band in (
+        'aerosol_qa', 'blue', 'coastal_aerosol', 'green', 'nir', 'pixel_qa',
+        'radsat_qa', 'red', 'swir1', 'swir2'))},
+}
+
+SENTINEL2_BANDS = (
+    ['azimuthal_exiting', 'azimuthal_incident', 'exiting', 'fmask', 'incident'] +
+    [prefix + band for prefix in ('lambertian_', 'nbar_', 'nbart_') for band in (
+        'blue', 'coastal_aerosol', 'contiguity', 'green', 'nir_1', 'nir_2', 'red',
+        'red_edge_1', 'red_edge_2', 'red_edge_3', 'swir_2', 'swir_3')] +
+    ['relative_azimuth', 'relative_slope', 'satellite_azimuth', 'satellite_view',
+     'solar_azimuth', 'solar_zenith', 'terrain_shadow', 'timedelta'])
+
+SENTINEL2_DOCUMENT = {
+    'id': 'x',
+    'product_type': 'ard',
+    'processing_level': 'Level-2',
+    'platform': {'code': 'SENTINEL_2A'},
+    'extent': {'center_dt': '2018-01-01T00:00:00'},
+    'grid_spatial': {'projection': {
+        'spatial_reference': 'EPSG:32755',
+        'geo_ref_points': {'ll': {'x': 100.5, 'y': 200.0}, 'lr': {'x': 300.0, 'y': 200.0},
+                           'ur': {'x': 300.0, 'y': 400.25}},
+        'valid_data': {'coordinates': [[[1, 2], [3, 4]]]}}},
+    'image': {'bands': dict((band, {'path': band + '.tif', 'layer': 1}) for band in SENTINEL2_BANDS)},
+    'lineage': {'source_datasets': {'level1': {
+        'image': {'sun_elevation': 30.5, 'sun_azimuth': 120.0, 'cloud_cover_percentage': 1.2,
+                  'reflectance_conversion': 0.97, 'tile_reference': 'T55', 'bands': {}},
+        'datatake_sensing_start': '2018-01-01T00:00:00.123Z', 'datastrip_id': 'DS',
+        'product_format': {'name': 'SAFE'}, 'platform': {'code': 'SENTINEL_2A'},
+        'tile_id': 'T1', 'lineage': {}}}},
+}
+
+
+def landsatDocument(kind='l8', **changes):
+    # the Landsat 8 document, its Landsat 7 variant or a Sentinel-1 variant\
+    # of it as read by the DataCube and GeoScience-Landsat types
+    doc = copy.deepcopy(LANDSAT_DOCUMENT)
+    bands = doc['image']['bands']
+    if (kind == 'l7'):
+        bands['atmos_opacity'] = bands.pop('aerosol_qa')
+        bands['cloud_qa'] = bands.pop('coastal_aerosol')
+        doc['platform']['code'] = 'LANDSAT_7'
+    elif (kind == 's1'):
+        doc['image']['bands'] = {'vh': {'path': 'vh.tif'}, 'vv': {'path': 'vv.tif'}}
+        doc['platform']['code'] = 'SENTINEL_1A'
+    doc.update(changes)
+    return doc
+
+
+def sentinel2Document(**changes):
+    doc = copy.deepcopy(SENTINEL2_DOCUMENT)
+    doc.update(changes)
+    return doc
+
+
+def writeDocument(path, doc):
+    directory = os.path.dirname(path)
+    if (not os.path.isdir(directory)):
+        os.makedirs(directory)
+    with open(path, 'w') as f:
+        yaml.safe_dump(doc, f)
+    return path
+
+
+def xmlDocument(satelliteId, bands=4, productLevel='LEVEL1A', cloudPercent=0, corner=(30.0, 110.0)):
+    # the <ProductMetaData> document of a TripleSat or SuperView-1 scene
+    lat, lon = corner
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<ProductMetaData>\n'
+        '  <SatelliteID>{0}</SatelliteID>\n'
+        '  <ProductLevel>{1}</ProductLevel>\n'
+        '  <Bands>{2}</Bands>\n'
+        '  <CenterTime>2018-01-01 00:00:00</CenterTime>\n'
+        '  <CloudPercent>{3}</CloudPercent>\n'
+        '  <TopLeftLatitude>{4}</TopLeftLatitude>\n'
+        '  <TopLeftLongitude>{5}</TopLeftLongitude>\n'
+        '  <TopRightLatitude>{4}</TopRightLatitude>\n'
+        '  <TopRightLongitude>{6}</TopRightLongitude>\n'
+        '  <BottomRightLatitude>{7}</BottomRightLatitude>\n'
+        '  <BottomRightLongitude>{6}</BottomRightLongitude>\n'
+        '  <BottomLeftLatitude>{7}</BottomLeftLatitude>\n'
+        '  <BottomLeftLongitude>{5}</BottomLeftLongitude>\n'
+        '</ProductMetaData>\n').format(
+            satelliteId, productLevel, bands, cloudPercent, lat, lon, lon + 0.1, lat - 0.1)
+
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Builder goldens
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+# builder, documents by kind and tags of the raster types with goldens
+BUILD_CASES = {
+    'DataCube-Landsat': (
+        'LandsatDataCubeBuilder', 'doc.yaml', ('l7', 'l8'),
+        ['DataCube_L8_MS', 'DataCube_L8_MS_QA', 'DataCube_L7_MS', 'DataCube_L7_MS_QA', 'DataCube_Scene']),
+    'DataCube-Sentinel': (
+        'SentinelDataCubeBuilder', 'doc.yaml', ('s1',), ['DataCube_S1_SAR']),
+    'GeoScience-Landsat': (
+        'GeoscienceBuilder', 'doc.yaml', ('l8',), ['NBART']),
+    'Geoscience-Sentinel2': (
+        'GeoscienceSentinelBuilder', 'ARD-METADATA.yaml', ('s2',),
+        ['MS', 'Supplementary', 'Lambertian', 'QA', 'NBART', 'NBAR']),
+}
+
+GOLDENS = os.path.join(os.path.dirname(__file__), 'data', 'builds')
+
+
+def buildPaths(kind, fileName):
+    # a local, an http and an s3 path of the same document
+    return ['/data/{0}/{1}'.format(kind, fileName),
+            'http://bucket.s3.amazonaws.com/{0}/{1}'.format(kind, fileName),
+            's3://bucket/{0}/{1}'.format(kind, fileName)]
+
+
+def buildDocument(kind):
+    return sentinel2Document() if kind == 's2' else landsatDocument(kind)
+
+
+def buildAll(module, name, documents=None):
+    # the items built for every path and tag of a raster type, keyed by\
+    # 'path|tag' and passed through json like the goldens. The documents\
+    # are handed to the builder through the document cache.
+    (builderName, fileName, kinds, tags) = BUILD_CASES[name]
+    for kind in kinds:
+        for path in buildPaths(kind, fileName):
+            module.rasterTypeUtils.documentCache.put(path, (documents or {}).get(kind) or buildDocument(kind))
+    builder = getattr(module, builderName)()
+    items = {}
+    for kind in kinds:
+        for path in buildPaths(kind, fileName):
+            for tag in tags:
+                items['{0}|{1}'.format(path, tag)] = builder.build({'path': path, 'tag': tag})
+    return json.loads(json.dumps(items))
+
+
+def loadGolden(name):
+    with gzip.open(os.path.join(GOLDENS, name + '.json.gz'), 'rb') as golden:
+        return json.loads(golden.read().decode('utf-8'))
+
+
+@pytest.fixture
+def arcpyStub():
+    import arcpy
+    if (not hasattr(arcpy, 'messages')):
+        pytest.skip('runs against the arcpy stand-in only')
+    return arcpy
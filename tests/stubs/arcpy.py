@@ -0,0 +1,48 @@
+# Minimal stand-in for the parts of arcpy used by the raster types. It is\
+# only on the path when arcpy itself cannot be imported.
+
+messages = []
+
+
+def AddMessage(message):
+    messages.append(message)
+
+
+class Field(object):
+    pass
+
+
+class Point(object):
+
+    def __init__(self, X=None, Y=None, *args):
+        self.X = X
+        self.Y = Y
+
+
+class Array(list):
+
+    def __init__(self, items=None):
+        list.__init__(self, items or [])
+
+    def add(self, item):
+        self.append(item)
+
+
+class Polygon(object):
+
+    def __init__(self, array, spatialReference=None, *args):
+        self.points = list(array)
+        self.spatialReference = spatialReference
+
+
+class SpatialReference(object):
+
+    created = 0
+
+    def __init__(self, code=None):
+        SpatialReference.created += 1
+        self.code = code
+        self.PCSCode = code if isinstance(code, int) else 0
+
+    def exportToString(self):
+        return 'PROJCS["EPSG {0}"]'.format(self.code)
@@ -0,0 +1,6 @@
+# Minimal stand-in for osgeo.gdal, which the Geoscience raster type imports\
+# to read raster dimensions. Tests do not open rasters.
+
+
+def Open(path):
+    raise Exception('Err. gdal is not available in the tests!')
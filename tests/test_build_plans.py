@@ -0,0 +1,29 @@
+import pytest
+
+from conftest import BUILD_CASES, buildAll, buildDocument, loadGolden, loadRasterType
+
+# the goldens of the DataCube and GeoScience-Landsat types were built by the\
+# hand-unrolled builders before commit 8c8bd87, those of Geoscience-Sentinel2\
+# before commit 4343862
+
+
+@pytest.mark.parametrize('name', sorted(BUILD_CASES))
+def test_items_match_the_goldens(name):
+    module = loadRasterType(name)
+    golden = loadGolden(name)
+    items = buildAll(module, name)
+    assert sorted(items) == sorted(golden)
+    for key in sorted(golden):
+        assert items[key] == golden[key], key
+
+
+@pytest.mark.parametrize('name', ('DataCube-Landsat', 'DataCube-Sentinel'))
+def test_unsupported_tag_is_reported(name):
+    # the hand-unrolled builders failed on an unbound local instead
+    module = loadRasterType(name)
+    (builderName, fileName, kinds, tags) = BUILD_CASES[name]
+    path = '/data/{0}/{1}'.format(kinds[0], fileName)
+    module.rasterTypeUtils.documentCache.put(path, buildDocument(kinds[0]))
+    with pytest.raises(Exception, match='Unsupported tag bogus'):
+        getattr(module, builderName)().build({'path': path, 'tag': 'bogus'})
+
@@ -0,0 +1,46 @@
+from conftest import loadShared
+
+
+def test_optional_keys_are_left_out():
+    shared = loadShared()
+    keyProperties = {'AcquisitionDate': '2018-01-01'}
+    item = shared.BuiltItem('s3://bucket/doc.yaml', 32650, keyProperties, {'rings': []})
+    builtItem = item.toDict()
+    assert list(builtItem) == ['spatialReference', 'variables', 'itemUri', 'keyProperties', 'footprint']
+    assert builtItem['variables'] == {}
+    assert builtItem['keyProperties'] is keyProperties
+    assert 'bandProperties' not in keyProperties
+
+
+def test_records_are_serialized_to_their_shared_dicts():
+    shared = loadShared()
+    rasterInfo = shared.rasterInfoPool.get(6, 4000, (32650, 1, 2, 3, 4))
+    bands = (shared.BandProperty('Blue'), shared.BandProperty('Green'))
+    raster = {'functionDataset': {
+        'rasterFunction': 'Composite.rft.xml',
+        'rasterFunctionArguments': {
+            'Raster1': '<MRF_META>1</MRF_META>', 'Raster1_rasterInfo': rasterInfo,
+            'Raster2': '<MRF_META>2</MRF_META>', 'Raster2_rasterInfo': rasterInfo}}}
+    variables = {'Dates': '2018-01-01'}
+    item = shared.BuiltItem('s3://bucket/doc.yaml', 32650, {'SensorName': 'x'}, {'rings': []},
+                            raster=raster, bandProperties=bands, variables=variables)
+    builtItem = item.toDict()
+    assert list(builtItem) == ['raster', 'spatialReference', 'variables', 'itemUri',
+                               'keyProperties', 'footprint']
+    arguments = builtItem['raster']['functionDataset']['rasterFunctionArguments']
+    assert arguments['Raster1'] == '<MRF_META>1</MRF_META>'
+    assert arguments['Raster1_rasterInfo'] is rasterInfo.toDict()
+    assert arguments['Raster2_rasterInfo'] is rasterInfo.toDict()
+    assert builtItem['variables'] is variables
+    assert builtItem['keyProperties'] == {'SensorName': 'x',
+                                          'bandProperties': [{'bandName': 'Blue'}, {'bandName': 'Green'}]}
+    assert all(band is record.toDict() for (band, record) in
+               zip(builtItem['keyProperties']['bandProperties'], bands))
+    # a second conversion gives the same dict
+    assert item.toDict() == builtItem
+
+
+def test_band_dicts_are_created_once():
+    band = loadShared().BandProperty('NIR')
+    assert band.toDict() == {'bandName': 'NIR'}
+    assert band.toDict() is band.toDict()
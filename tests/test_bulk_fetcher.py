@@ -0,0 +1,100 @@
+import threading
+import time
+
+import yaml
+
+from conftest import landsatDocument, loadRasterType, loadShared, serveRemote
+
+
+class SlowUtilities(object):
+
+    # records the documents read and the requests in flight per host
+    def __init__(self, delay=0.01, failing=()):
+        self.delay = delay
+        self.failing = failing
+        self.read = []
+        self.inFlight = {}
+        self.maxInFlight = {}
+        self._lock = threading.Lock()
+
+    def readDocument(self, path):
+        host = path.split('/')[2]
+        with self._lock:
+            self.inFlight[host] = self.inFlight.get(host, 0) + 1
+            self.maxInFlight[host] = max(self.maxInFlight.get(host, 0), self.inFlight[host])
+        # the fetches of a batch finish out of manifest order
+        time.sleep(self.delay * (3 - len(path) % 3))
+        with self._lock:
+            self.inFlight[host] -= 1
+            self.read.append(path)
+        if (path in self.failing):
+            raise IOError('Err. {0} not found'.format(path))
+
+
+def manifest(count):
+    rows = []
+    for i in range(count):
+        if (i % 3 == 0):
+            rows.append('s3://bucket/scene{0}/doc.yaml'.format(i))
+        elif (i % 3 == 1):
+            rows.append('https://other.example.com/scene{0}/doc.yaml'.format(i))
+        else:
+            rows.append('/data/scene{0}/doc.yaml'.format(i))
+    return rows
+
+
+def test_rows_are_yielded_in_manifest_order():
+    utils = SlowUtilities()
+    fetcher = loadShared().BulkMetadataFetcher(utils, True, 4, 7)
+    rows = manifest(30)
+    assert list(fetcher.fetchAll(iter(rows))) == rows
+    # every remote row was fetched, local ones are left to the builder
+    assert sorted(utils.read) == sorted(row for row in rows if not row.startswith('/'))
+
+
+def test_requests_in_flight_stay_within_the_per_host_limit():
+    utils = SlowUtilities(delay=0.02)
+    fetcher = loadShared().BulkMetadataFetcher(utils, True, 3, 64)
+    list(fetcher.fetchAll(iter(manifest(60))))
+    assert utils.maxInFlight == {'bucket': 3, 'other.example.com': 3}
+
+
+def test_a_failed_fetch_still_yields_its_row():
+    rows = manifest(9)
+    utils = SlowUtilities(failing=(rows[0], rows[4]))
+    fetcher = loadShared().BulkMetadataFetcher(utils, True, 2, 4)
+    assert list(fetcher.fetchAll(iter(rows))) == rows
+
+
+def test_disabled_fetcher_reads_nothing():
+    utils = SlowUtilities()
+    fetcher = loadShared().BulkMetadataFetcher(utils, False)
+    rows = manifest(6)
+    assert list(fetcher.fetchAll(iter(rows))) == rows
+    assert utils.read == []
+
+
+def test_builder_is_served_from_the_document_cache(tmpdir):
+    module = loadRasterType('DataCube-Landsat')
+    paths = ['s3://bucket/scene{0}/doc.yaml'.format(i) for i in range(40)]
+    (session, client) = serveRemote(module, dict(
+        (path, yaml.safe_dump(landsatDocument(id=path)).encode('utf-8')) for path in paths))
+    csvPath = tmpdir.join('scenes.csv')
+    csvPath.write('raster\n' + '\n'.join(paths) + '\n')
+    crawler = module.LandsatDataCubeCrawler(
+        paths=[str(csvPath)], recurse=False, filter=None,
+        bulkFetch=True, bulkFetchPerHost=4, bulkFetchBatchSize=16)
+    # the cache holds two batches of documents
+    assert module.rasterTypeUtils.documentCache.maxSize >= 32
+    builder = module.LandsatDataCubeBuilder()
+    crawled = []
+    uri = crawler.getNextUri()
+    while (uri is not None):
+        if (uri['tag'] == 'DataCube_L8_MS'):
+            crawled.append(uri['path'])
+            assert builder.build(uri)
+        uri = crawler.getNextUri()
+    assert crawled == paths
+    # one GET per document, by the fetcher
+    assert sorted(key for (bucket, key, kwargs) in client.requests) == \
+        sorted(path[len('s3://bucket/'):] for path in paths)
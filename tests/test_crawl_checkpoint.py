@@ -0,0 +1,183 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import buildDocument, landsatDocument, loadRasterType, writeDocument, xmlDocument
+
+XML_CRAWLERS = {
+    'SuperView-1': ('SuperView1Crawler', 'SV1_{0:02d}.xml', 'SV1'),
+    'Triplesat': ('TripleSatCrawler', 'TRIPLESAT_{0:02d}.xml', 'TripleSat'),
+}
+
+
+def writeXmlScenes(root, fileName, satelliteId, count=5):
+    for i in range(count):
+        with open(os.path.join(root, fileName.format(i)), 'w') as f:
+            f.write(xmlDocument(satelliteId, bands=1 if i % 2 else 4))
+
+
+def crawl(crawler, limit=None):
+    uris = []
+    while (limit is None or len(uris) < limit):
+        uri = crawler.getNextUri()
+        if (uri is None):
+            break
+        uris.append((uri['path'], uri['tag']))
+    return uris
+
+
+@pytest.mark.parametrize('name', sorted(XML_CRAWLERS))
+def test_xml_crawl_resumes_from_checkpoint(name, tmpdir):
+    module = loadRasterType(name)
+    (crawlerName, fileName, satelliteId) = XML_CRAWLERS[name]
+    root = tmpdir.mkdir('scenes')
+    writeXmlScenes(str(root), fileName, satelliteId)
+    checkpointPath = str(tmpdir.join('crawl.checkpoint'))
+
+    def newCrawler(resume=False):
+        return getattr(module, crawlerName)(
+            paths=[str(root)], recurse=False, filter=None,
+            checkpointPath=checkpointPath, resume=resume)
+
+    expected = crawl(getattr(module, crawlerName)(paths=[str(root)], recurse=False, filter=None))
+    assert len(expected) == 5
+    assert set(tag for (path, tag) in expected) == set(['MS', 'Pan'])
+
+    first = crawl(newCrawler(), limit=2)  # interrupted after two items
+    assert os.path.exists(checkpointPath)
+    resumed = newCrawler(resume=True)
+    rest = crawl(resumed)
+    assert first + rest == expected
+    # the scene in progress at the interruption is read again, its emitted\
+    # tag is skipped
+    assert resumed.getSkipStats()['checkpoint']['count'] == 1
+    assert not os.path.exists(checkpointPath)
+
+
+def test_resumed_crawl_keeps_dropping_duplicates(tmpdir):
+    # the second input repeats the first, the third holds copies of its\
+    # scenes under other paths, so only the first input yields scenes
+    module = loadRasterType('DataCube-Landsat')
+    first = tmpdir.mkdir('first')
+    copies = tmpdir.mkdir('copies')
+    for i in range(4):
+        doc = landsatDocument(id='scene{0}'.format(i))
+        writeDocument(os.path.join(str(first), 'scene{0}'.format(i), 'doc.yaml'), doc)
+        writeDocument(os.path.join(str(copies), 'scene{0}'.format(i), 'doc.yaml'), doc)
+    inputs = [str(first), str(first), str(copies)]
+    checkpointPath = str(tmpdir.join('crawl.checkpoint'))
+
+    def newCrawler(**properties):
+        return module.LandsatDataCubeCrawler(
+            paths=inputs, recurse=True, filter=None, deduplicate=True, **properties)
+
+    expected = crawl(newCrawler())
+    assert len(set(path for (path, tag) in expected)) == 4
+    assert len(set(expected)) == len(expected)
+
+    # interrupted twice, within the first scene and after two more scenes
+    items = crawl(newCrawler(checkpointPath=checkpointPath), limit=3)
+    items += crawl(newCrawler(checkpointPath=checkpointPath, resume=True), limit=7)
+    resumed = newCrawler(checkpointPath=checkpointPath, resume=True)
+    items += crawl(resumed)
+    # the walk order of a crawl without a checkpoint is not repeatable
+    assert sorted(items) == sorted(expected)
+    assert resumed.deduplicator.dropped == {'path': 4, 'id': 4}
+    assert not os.path.exists(checkpointPath)
+    assert not os.path.exists(checkpointPath + '.keys')
+
+
+@pytest.mark.parametrize('name', sorted(XML_CRAWLERS))
+def test_resumed_xml_crawl_keeps_dropping_duplicates(name, tmpdir):
+    module = loadRasterType(name)
+    (crawlerName, fileName, satelliteId) = XML_CRAWLERS[name]
+    root = tmpdir.mkdir('scenes')
+    writeXmlScenes(str(root), fileName, satelliteId)
+    checkpointPath = str(tmpdir.join('crawl.checkpoint'))
+
+    def newCrawler(**properties):
+        return getattr(module, crawlerName)(
+            paths=[str(root), str(root)], recurse=False, filter=None, deduplicate=True,
+            **properties)
+
+    expected = crawl(newCrawler())
+    assert len(expected) == 5
+    items = crawl(newCrawler(checkpointPath=checkpointPath), limit=3)
+    items += crawl(newCrawler(checkpointPath=checkpointPath, resume=True))
+    assert items == expected
+
+
+def test_fresh_crawl_discards_an_old_key_journal(tmpdir):
+    module = loadRasterType('Triplesat')
+    root = tmpdir.mkdir('scenes')
+    writeXmlScenes(str(root), 'TRIPLESAT_{0:02d}.xml', 'TripleSat')
+    checkpointPath = str(tmpdir.join('crawl.checkpoint'))
+    crawl(module.TripleSatCrawler(
+        paths=[str(root)], recurse=False, filter=None, deduplicate=True,
+        checkpointPath=checkpointPath), limit=3)
+    assert os.path.exists(checkpointPath + '.keys')
+    crawler = module.TripleSatCrawler(
+        paths=[str(root)], recurse=False, filter=None, deduplicate=True,
+        checkpointPath=checkpointPath)
+    assert not os.path.exists(checkpointPath + '.keys')
+    assert len(crawl(crawler)) == 5
+
+
+YAML_CRAWLERS = {
+    'DataCube-Landsat': ('LandsatDataCubeCrawler', 'l8'),
+    'DataCube-Sentinel': ('SentinelDataCubeCrawler', 's1'),
+    'GeoScience-Landsat': ('GeoscienceCrawler', 'l8'),
+    'Geoscience-Sentinel2': ('GeoscienceSentinelCrawler', 's2'),
+}
+
+
+@pytest.mark.parametrize('name', sorted(YAML_CRAWLERS))
+def test_resume_fails_when_a_completed_scene_is_removed(name, tmpdir):
+    module = loadRasterType(name)
+    (crawlerName, kind) = YAML_CRAWLERS[name]
+    root = tmpdir.mkdir('scenes')
+    for i in range(3):
+        doc = buildDocument(kind)
+        doc['id'] = 'scene{0}'.format(i)
+        writeDocument(os.path.join(str(root), 'scene{0}'.format(i), 'doc.yaml'), doc)
+    checkpointPath = str(tmpdir.join('crawl.checkpoint'))
+
+    def newCrawler(resume=False):
+        return getattr(module, crawlerName)(
+            paths=[str(root)], recurse=True, filter='*.yaml',
+            checkpointPath=checkpointPath, resume=resume)
+
+    # interrupted once the second scene was reached
+    crawler = newCrawler()
+    first = crawler.getNextUri()['path']
+    while (crawler.getNextUri()['path'] == first):
+        pass
+    shutil.rmtree(os.path.dirname(first))
+    with pytest.raises(Exception, match='Crawler input changed since the checkpoint'):
+        crawl(newCrawler(resume=True))
+
+
+@pytest.mark.parametrize('name', sorted(YAML_CRAWLERS))
+def test_resume_skips_the_emitted_tags_of_the_scene_in_progress(name, tmpdir):
+    module = loadRasterType(name)
+    (crawlerName, kind) = YAML_CRAWLERS[name]
+    root = tmpdir.mkdir('scenes')
+    for i in range(3):
+        doc = buildDocument(kind)
+        doc['id'] = 'scene{0}'.format(i)
+        writeDocument(os.path.join(str(root), 'scene{0}'.format(i), 'doc.yaml'), doc)
+    checkpointPath = str(tmpdir.join('crawl.checkpoint'))
+
+    def newCrawler(resume=False):
+        return getattr(module, crawlerName)(
+            paths=[str(root)], recurse=True, filter='*.yaml',
+            checkpointPath=checkpointPath, resume=resume)
+
+    expected = crawl(newCrawler())
+    tags = len(expected) // 3
+    first = crawl(newCrawler(), limit=tags + 1)
+    resumed = newCrawler(resume=True)
+    assert first + crawl(resumed) == expected
+    # the one tag emitted from the second scene is skipped in the loop
+    assert resumed.getSkipStats()['checkpoint']['count'] == 1
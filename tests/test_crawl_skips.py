@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from conftest import loadRasterType, xmlDocument
+
+XML_CRAWLERS = {
+    'SuperView-1': ('SuperView1Crawler', 'SV1', 'SV1_{0}_{1:04d}.xml'),
+    'Triplesat': ('TripleSatCrawler', 'TripleSat', 'TRIPLESAT_{0}_{1:04d}.xml'),
+}
+
+REJECTED = 1000  # files per reason, well past the recursion limit of the old crawlers
+
+
+def crawl(crawler):
+    uris = []
+    uri = crawler.getNextUri()
+    while (uri is not None):
+        uris.append(uri)
+        uri = crawler.getNextUri()
+    return uris
+
+
+@pytest.mark.parametrize('name', sorted(XML_CRAWLERS))
+def test_thousands_of_rejected_xml_files_are_counted(name, tmpdir):
+    module = loadRasterType(name)
+    (crawlerName, satelliteId, fileName) = XML_CRAWLERS[name]
+    root = str(tmpdir.mkdir('scenes'))
+    noProductName = '\n'.join(line for line in xmlDocument(satelliteId).split('\n')
+                              if '<ProductLevel>' not in line)
+    files = {
+        'parseError': '<ProductMetaData><Bands>4</Bands>',
+        'unknownTag': xmlDocument(satelliteId, bands=2),
+        'noProductName': noProductName,
+    }
+    for (reason, content) in files.items():
+        for i in range(REJECTED):
+            with open(os.path.join(root, fileName.format(reason, i)), 'w') as f:
+                f.write(content)
+    for i in range(3):
+        with open(os.path.join(root, fileName.format('good', i)), 'w') as f:
+            f.write(xmlDocument(satelliteId))
+
+    crawler = getattr(module, crawlerName)(paths=[root], recurse=False, filter=None)
+    uris = crawl(crawler)
+    assert sorted(os.path.basename(uri['path']) for uri in uris) == \
+        [fileName.format('good', i) for i in range(3)]
+    stats = crawler.getSkipStats()
+    assert dict((reason, stats[reason]['count']) for reason in stats) == {
+        'parseError': REJECTED, 'unknownTag': REJECTED, 'noProductName': REJECTED, 'checkpoint': 0}
+    assert all(stats[reason]['seconds'] >= 0 for reason in stats)
+
+
+def test_thousands_of_unknown_yaml_files_are_counted(tmpdir):
+    module = loadRasterType('Geoscience')
+    root = str(tmpdir.mkdir('scenes'))
+    for i in range(3 * REJECTED):
+        with open(os.path.join(root, 'unknown_{0:04d}.yaml'.format(i)), 'w') as f:
+            f.write('id: {0}\n'.format(i))
+    for i in range(3):
+        with open(os.path.join(root, 'LS_WATER_{0}.yaml'.format(i)), 'w') as f:
+            f.write('id: water{0}\n'.format(i))
+
+    crawler = module.GeoscienceCrawler(paths=[root], recurse=False, filter='*.yaml')
+    uris = crawl(crawler)
+    assert sorted((os.path.basename(uri['path']), uri['tag']) for uri in uris) == \
+        [('LS_WATER_{0}.yaml'.format(i), 'wofs') for i in range(3)]
+    stats = crawler.getSkipStats()
+    # every product name has a tag, the files are rejected by their names
+    assert dict((reason, stats[reason]['count']) for reason in stats) == {
+        'unknownTag': 0, 'noProductName': 3 * REJECTED, 'checkpoint': 0}
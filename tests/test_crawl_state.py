@@ -0,0 +1,73 @@
+import os
+import sqlite3
+
+from conftest import landsatDocument, loadRasterType, sentinel2Document, writeDocument
+
+SENTINEL2_TAGS = ['MS', 'Supplementary', 'Lambertian', 'QA', 'NBART', 'NBAR']
+
+
+def sentinel2Crawler(module, root, statePath):
+    return module.GeoscienceSentinelCrawler(
+        paths=[root], recurse=True, filter=None, crawlStatePath=statePath)
+
+
+def test_level1_scenes_are_skipped_once_ms_is_built(tmpdir):
+    module = loadRasterType('Geoscience-Sentinel2')
+    root = tmpdir.mkdir('scenes')
+    level1 = writeDocument(os.path.join(str(root), 'l1', 'L2_ARD-METADATA.yaml'),
+                           sentinel2Document(id='l1', processing_level='Level-1'))
+    level2 = writeDocument(os.path.join(str(root), 'l2', 'L2_ARD-METADATA.yaml'),
+                           sentinel2Document(id='l2'))
+    statePath = str(tmpdir.join('state.db'))
+
+    crawler = sentinel2Crawler(module, str(root), statePath)
+    assert crawler.getSceneTags(level1) == ['MS']
+    assert crawler.getSceneTags(level2) == SENTINEL2_TAGS
+    assert list(crawler.skipUnchanged(iter([level1, level2]))) == [level1, level2]
+    builder = module.GeoscienceSentinelBuilder()
+    for uri in ({'path': level1, 'tag': 'MS'}, {'path': level2, 'tag': 'MS'}):
+        builder.build(uri)
+
+    crawler = sentinel2Crawler(module, str(root), statePath)
+    assert list(crawler.skipUnchanged(iter([level1, level2]))) == [level2]
+    for tag in SENTINEL2_TAGS:
+        builder.build({'path': level2, 'tag': tag})
+
+    crawler = sentinel2Crawler(module, str(root), statePath)
+    assert list(crawler.skipUnchanged(iter([level1, level2]))) == []
+
+
+def test_changed_scene_is_crawled_again(tmpdir):
+    module = loadRasterType('DataCube-Landsat')
+    root = tmpdir.mkdir('scenes')
+    path = writeDocument(os.path.join(str(root), 'scene', 'doc.yaml'), landsatDocument())
+    statePath = str(tmpdir.join('state.db'))
+
+    def crawl():
+        crawler = module.LandsatDataCubeCrawler(
+            paths=[str(root)], recurse=True, filter=None, crawlStatePath=statePath)
+        return list(iter(crawler.getNextUri, None))
+
+    builder = module.LandsatDataCubeBuilder()
+    uris = crawl()
+    assert uris
+    for uri in uris:
+        builder.build(uri)
+    assert crawl() == []
+    writeDocument(path, landsatDocument(id='changed', product_type='LaSRC 2'))
+    assert [uri['tag'] for uri in crawl()] == [uri['tag'] for uri in uris]
+
+
+def test_builds_are_recorded_in_a_store_with_build_hashes(tmpdir):
+    # stores created while builds were hashed keep their hash column
+    statePath = str(tmpdir.join('state.db'))
+    db = sqlite3.connect(statePath)
+    db.execute('CREATE TABLE builds (path TEXT, tag TEXT, hash TEXT, built REAL, PRIMARY KEY (path, tag))')
+    db.commit()
+    db.close()
+    module = loadRasterType('Triplesat')
+    state = module.rasterTypeUtils.CrawlState(statePath)
+    state.beginRun('scope')
+    assert not state.observe('a.xml', 1, 'v', ['MS'])
+    state.recordBuild('a.xml', 'MS')
+    assert state.observe('a.xml', 1, 'v', ['MS'])
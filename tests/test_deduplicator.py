@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from conftest import RASTER_TYPES, loadRasterType, loadShared
+
+CRAWLERS = {
+    'DataCube-Landsat': 'LandsatDataCubeCrawler',
+    'DataCube-Sentinel': 'SentinelDataCubeCrawler',
+    'GeoScience-Landsat': 'GeoscienceCrawler',
+    'Geoscience-Sentinel2': 'GeoscienceSentinelCrawler',
+    'Geoscience': 'GeoscienceCrawler',
+    'SuperView-1': 'SuperView1Crawler',
+    'Triplesat': 'TripleSatCrawler',
+}
+
+
+@pytest.mark.parametrize('name', sorted(RASTER_TYPES))
+def test_deduplication_is_opt_in(name, tmpdir):
+    module = loadRasterType(name)
+    crawlerClass = getattr(module, CRAWLERS[name])
+    properties = {'paths': [str(tmpdir)], 'recurse': False, 'filter': '*.yaml'}
+    assert crawlerClass(**properties).deduplicator is None
+    deduplicator = crawlerClass(deduplicate=True, **properties).deduplicator
+    assert deduplicator.exactLimit is None
+    # the Bloom filter is only used when a limit is given
+    assert crawlerClass(deduplicate=True, dedupExactLimit=10, **properties).deduplicator.exactLimit == 10
+
+
+def test_keys_stay_exact_without_a_limit():
+    deduplicator = loadShared().Deduplicator()
+    assert all(deduplicator.add('key{0}'.format(i)) for i in range(5000))
+    assert not any(deduplicator.add('key{0}'.format(i)) for i in range(5000))
+    assert deduplicator.bloom is None
+    assert len(deduplicator.keys) == 5000
+
+
+def test_keys_move_to_a_bloom_filter_past_the_limit():
+    deduplicator = loadShared().Deduplicator(exactLimit=10, bloomCapacity=1000, falsePositiveRate=0.001)
+    for i in range(10):
+        assert deduplicator.add('key{0}'.format(i))
+    assert deduplicator.bloom is None
+    assert deduplicator.add('key10')
+    assert deduplicator.bloom is not None
+    assert deduplicator.keys == set()
+    # the keys of the exact set are still known
+    assert not any(deduplicator.add('key{0}'.format(i)) for i in range(11))
+    assert deduplicator.add('key11')
+    assert not deduplicator.add('key11')
+
+
+def test_bloom_filter_never_misses_and_rarely_matches():
+    bloom = loadShared().BloomFilter(1000, 0.01)
+    # while it fills, a new key is only rarely reported as present
+    assert sum(1 for i in range(1000) if bloom.add('key{0}'.format(i))) < 1000 * 0.03
+    assert all(bloom.add('key{0}'.format(i)) for i in range(1000))
+    # a full filter matches other keys at about the configured rate
+    full = bytes(bloom.bits)
+    matches = 0
+    for i in range(10000):
+        bloom.bits = bytearray(full)  # tests membership of the 1000 keys only
+        matches += bloom.add('other{0}'.format(i))
+    assert matches < 10000 * 0.03
+
+
+def test_s3_and_virtual_hosted_urls_of_an_object_are_one_path(tmpdir):
+    deduplicator = loadShared().Deduplicator()
+    key = deduplicator.normalizePath('s3://bucket/scenes/a/doc.yaml')
+    assert deduplicator.normalizePath('https://bucket.s3.amazonaws.com/scenes/a/doc.yaml') == key
+    assert deduplicator.normalizePath('http://bucket.s3.us-west-2.amazonaws.com/scenes/a/doc.yaml') == key
+    assert deduplicator.normalizePath(' https://bucket.s3-us-west-2.amazonaws.com/scenes/a/doc.yaml\n') == key
+    assert deduplicator.normalizePath('https://example.com/scenes/a/doc.yaml') == \
+        'https://example.com/scenes/a/doc.yaml'
+    local = str(tmpdir.join('doc.yaml'))
+    assert deduplicator.normalizePath(os.path.join(str(tmpdir), 'x', '..', 'doc.yaml')) == \
+        deduplicator.normalizePath(local)
+
+
+def test_dropped_counts_per_kind():
+    deduplicator = loadShared().Deduplicator()
+    paths = ['s3://bucket/a.yaml', 'https://bucket.s3.amazonaws.com/a.yaml',
+             's3://bucket/b.yaml', 's3://bucket/c.yaml', 's3://bucket/a.yaml']
+    ids = {'s3://bucket/a.yaml': 'scene1', 's3://bucket/b.yaml': 'scene1', 's3://bucket/c.yaml': None}
+    seen = []
+    deduplicator.listener = lambda path, key: seen.append(key)
+    selected = deduplicator.select(paths, deduplicator.normalizePath, 'path')
+    selected = list(deduplicator.select(selected, ids.get, 'id'))
+    # scenes without an id are kept
+    assert selected == ['s3://bucket/a.yaml', 's3://bucket/c.yaml']
+    assert deduplicator.dropped == {'path': 2, 'id': 1}
+    assert seen == ['path:s3://bucket/a.yaml', 'id:scene1', 'path:s3://bucket/b.yaml',
+                    'path:s3://bucket/c.yaml']
@@ -0,0 +1,100 @@
+import fnmatch
+import os
+
+import pytest
+
+from conftest import loadShared
+
+
+def makeTree(root, depth=3, width=3):
+    # yaml documents and other files spread over a tree of directories
+    expected = []
+    directories = [root]
+    for level in range(depth):
+        children = []
+        for directory in directories:
+            for i in range(width):
+                child = os.path.join(directory, 'd{0}{1}'.format(level, i))
+                os.mkdir(child)
+                children.append(child)
+            for name in ('a{0}.yaml'.format(level), 'b{0}.tif'.format(level), 'c{0}.YAML.bak'.format(level)):
+                with open(os.path.join(directory, name), 'w') as f:
+                    f.write('x')
+            expected.append(os.path.join(directory, 'a{0}.yaml'.format(level)))
+        directories = children
+    return sorted(expected)
+
+
+@pytest.mark.parametrize('walkWorkers', (1, 8))
+def test_walk_finds_every_match(walkWorkers, tmpdir):
+    expected = makeTree(str(tmpdir))
+    walker = loadShared().DirectoryWalker('*.yaml', walkWorkers, 4)
+    found = list(walker.walk(str(tmpdir)))
+    assert sorted(found) == expected
+    if (walkWorkers == 1):
+        assert found == list(walker.walk(str(tmpdir)))  # a repeatable order
+
+
+@pytest.mark.parametrize('walkWorkers', (1, 8))
+def test_symlinked_directories_are_not_followed(walkWorkers, tmpdir):
+    shared = loadShared()
+    real = tmpdir.mkdir('real')
+    real.join('a.yaml').write('x')
+    top = tmpdir.mkdir('top')
+    top.join('b.yaml').write('x')
+    os.symlink(str(real), str(top.join('link')))
+    walker = shared.DirectoryWalker('*.yaml', walkWorkers)
+    assert list(walker.walk(str(top))) == [str(top.join('b.yaml'))]
+
+
+def test_walk_can_be_abandoned(tmpdir):
+    shared = loadShared()
+    makeTree(str(tmpdir), depth=4)
+    walker = shared.DirectoryWalker('*.yaml', 8, 1)
+    walk = walker.walk(str(tmpdir))
+    assert next(walk).endswith('.yaml')
+    walk.close()  # stops the workers without waiting for the rest of the tree
+
+
+def test_filter_patterns():
+    shared = loadShared()
+    walker = shared.DirectoryWalker('TRIPLESAT*.xml;TR*.dim')
+    assert walker.matches('TRIPLESAT_1.xml')
+    assert walker.matches('TR_1.dim')
+    assert not walker.matches('TRIPLESAT_1.dim.bak')
+    assert shared.DirectoryWalker(None).matches('anything')
+
+
+class FakePaginator(object):
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    def paginate(self, Bucket, Prefix, Delimiter, RequestPayer):
+        contents = []
+        prefixes = set()
+        for key in self.keys:
+            if (not key.startswith(Prefix)):
+                continue
+            rest = key[len(Prefix):]
+            if (Delimiter in rest):
+                prefixes.add(Prefix + rest.split(Delimiter)[0] + Delimiter)
+            else:
+                contents.append({'Key': key})
+        # one page per object, like a listing split over many requests
+        for obj in contents:
+            yield {'Contents': [obj]}
+        yield {'CommonPrefixes': [{'Prefix': prefix} for prefix in sorted(prefixes)]}
+
+
+@pytest.mark.parametrize('walkWorkers', (1, 8))
+def test_walk_s3_prefix(walkWorkers):
+    shared = loadShared()
+    keys = ['scenes/{0}/{1}/{2}'.format(a, b, fileName)
+            for a in range(3) for b in range(3) for fileName in ('doc.yaml', 'band.tif')]
+    paginator = FakePaginator(keys + ['other/doc.yaml'])
+    shared.s3ClientPool._client = type('Client', (), {'get_paginator': lambda self, name: paginator})()
+    walker = shared.DirectoryWalker('*.yaml', walkWorkers)
+    expected = ['s3://bucket/' + key for key in keys if fnmatch.fnmatch(key, '*.yaml')]
+    assert sorted(walker.walkS3('s3://bucket/scenes/')) == sorted(expected)
+    assert list(walker.walkS3('s3://bucket/scenes/', recurse=False)) == []
@@ -0,0 +1,115 @@
+import threading
+
+import pytest
+import requests
+
+from conftest import FakeResponse, loadRasterType, loadShared
+
+
+class ErrorResponse(FakeResponse):
+
+    def raise_for_status(self):
+        raise requests.HTTPError('{0} Error'.format(self.status_code))
+
+
+class RecordingSession(object):
+
+    # stands in for requests.Session, recording mounts and requests
+    created = []
+
+    def __init__(self):
+        self.mounted = {}
+        self.requests = []
+        RecordingSession.created.append(self)
+
+    def mount(self, prefix, adapter):
+        self.mounted[prefix] = adapter
+
+    def get(self, url, **kwargs):
+        self.requests.append(('get', url, kwargs))
+        if ('missing' in url):
+            return ErrorResponse(b'', status_code=404)
+        return FakeResponse(b'doc')
+
+    def head(self, url, **kwargs):
+        self.requests.append(('head', url, kwargs))
+        return FakeResponse(b'', headers={'ETag': '"e"'})
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    shared = loadShared()
+    RecordingSession.created = []
+    monkeypatch.setattr(shared.requests, 'Session', RecordingSession)
+    return shared
+
+
+def test_session_is_reused(shared):
+    transport = shared.HttpTransport()
+    threads = [threading.Thread(target=transport.getSession) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for i in range(3):
+        transport.get('https://example.com/doc{0}.yaml'.format(i))
+    transport.head('https://example.com/doc0.yaml')
+    assert len(RecordingSession.created) == 1
+    assert len(RecordingSession.created[0].requests) == 4
+
+
+def test_timeouts_are_passed(shared):
+    transport = shared.HttpTransport(connectTimeout=3, readTimeout=30)
+    transport.get('https://example.com/doc.yaml', headers={'If-None-Match': '"e"'})
+    transport.head('https://example.com/doc.yaml')
+    assert RecordingSession.created[0].requests == [
+        ('get', 'https://example.com/doc.yaml', {'headers': {'If-None-Match': '"e"'}, 'timeout': (3, 30)}),
+        ('head', 'https://example.com/doc.yaml', {'allow_redirects': True, 'timeout': (3, 30)})]
+
+
+def test_error_responses_raise(shared):
+    with pytest.raises(requests.HTTPError):
+        shared.HttpTransport().get('https://example.com/missing.yaml')
+
+
+def test_adapter_follows_the_settings(shared):
+    transport = shared.HttpTransport(poolSize=16, maxRetries=5, backoffFactor=0.25)
+    session = transport.getSession()
+    assert sorted(session.mounted) == ['http://', 'https://']
+    adapter = session.mounted['https://']
+    assert session.mounted['http://'] is adapter
+    assert isinstance(adapter, shared.HTTPAdapter)
+    assert adapter._pool_connections == 16
+    assert adapter._pool_maxsize == 16
+    retries = adapter.max_retries
+    assert isinstance(retries, shared.Retry)
+    assert retries.total == 5
+    assert retries.backoff_factor == 0.25
+    assert sorted(retries.status_forcelist) == [429, 500, 502, 503, 504]
+
+
+def test_configure_recreates_the_session_only_on_change(shared):
+    transport = shared.HttpTransport()
+    first = transport.getSession()
+    transport.configure()  # crawler properties left unset
+    transport.configure(10, 10, 60, 3, 0.5)  # the defaults
+    assert transport.getSession() is first
+    transport.configure(readTimeout=120)
+    second = transport.getSession()
+    assert second is not first
+    assert transport.readTimeout == 120
+    transport.configure(maxRetries=0)  # zero is a setting, not a missing value
+    third = transport.getSession()
+    assert third is not second
+    assert third.mounted['https://'].max_retries.total == 0
+    assert len(RecordingSession.created) == 3
+
+
+def test_crawler_properties_configure_the_transport(tmpdir):
+    module = loadRasterType('DataCube-Landsat')
+    module.LandsatDataCubeCrawler(
+        paths=[str(tmpdir)], recurse=False, filter=None,
+        httpPoolSize=4, httpConnectTimeout=2, httpReadTimeout=20, httpMaxRetries=1, httpBackoffFactor=2)
+    transport = module.rasterTypeUtils.httpTransport
+    assert (transport.poolSize, transport.connectTimeout, transport.readTimeout,
+            transport.maxRetries, transport.backoffFactor) == (4, 2.0, 20.0, 1, 2.0)
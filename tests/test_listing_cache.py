@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from conftest import landsatDocument, loadRasterType, loadShared, writeDocument
+
+
+def makeManifest(root, directories=5, files=20):
+    # the paths of a csv manifest: existing documents, missing ones, paths\
+    # in a missing directory and remote urls, interleaved across directories
+    paths = []
+    for i in range(files):
+        for d in range(directories):
+            path = os.path.join(root, 'd{0}'.format(d), 'scene{0}.yaml'.format(i))
+            if (i % 3):
+                writeDocument(path, {'id': path})
+            paths.append(path)
+        paths.append(os.path.join(root, 'missing', 'scene{0}.yaml'.format(i)))
+        paths.append('s3://bucket/scene{0}.yaml'.format(i))
+    return paths
+
+
+def expected(paths):
+    return [path for path in paths if path.startswith('s3') or os.path.exists(path)]
+
+
+@pytest.mark.parametrize('batchSize', (1, 7, 10000))
+@pytest.mark.parametrize('maxDirectories', (1, 4096))
+def test_listings_agree_with_stat_calls(batchSize, maxDirectories, tmpdir):
+    paths = makeManifest(str(tmpdir))
+    cache = loadShared().ListingCache(True, maxDirectories, batchSize, 4)
+    assert list(cache.select(paths)) == expected(paths)
+
+
+def test_listings_replace_stat_calls(tmpdir):
+    paths = makeManifest(str(tmpdir))
+    local = [path for path in paths if not path.startswith('s3')]
+    shared = loadShared()
+    statted = shared.ListingCache()
+    assert list(statted.select(paths)) == expected(paths)
+    assert statted.getStats() == {'statCalls': len(local), 'listCalls': 0,
+                                  'lookups': 0, 'directories': 0}
+    listed = shared.ListingCache(True)
+    assert list(listed.select(paths)) == expected(paths)
+    # one listing per directory, the missing one included
+    assert listed.getStats() == {'statCalls': 0, 'listCalls': 6,
+                                 'lookups': len(local), 'directories': 6}
+
+
+def test_crawler_lists_directories_when_asked(tmpdir):
+    module = loadRasterType('DataCube-Landsat')
+    root = str(tmpdir.mkdir('scenes'))
+    rows = []
+    for i in range(6):
+        path = os.path.join(root, 'd{0}'.format(i % 2), 'scene{0}.yaml'.format(i))
+        if (i != 3):
+            writeDocument(path, landsatDocument(id='scene{0}'.format(i)))
+        rows.append(path)
+    manifest = tmpdir.join('scenes.csv')
+    manifest.write('raster\n' + '\n'.join(rows) + '\n')
+
+    def crawl(**properties):
+        crawler = module.LandsatDataCubeCrawler(
+            paths=[str(manifest)], recurse=False, filter=None, **properties)
+        uris = []
+        uri = crawler.getNextUri()
+        while (uri is not None):
+            uris.append(uri['path'])
+            uri = crawler.getNextUri()
+        return crawler.listingCache, uris
+
+    (statted, statUris) = crawl()
+    assert not statted.enabled
+    assert statted.getStats()['statCalls'] == 6
+    (listed, listUris) = crawl(listDirectories=True)
+    assert listUris == statUris
+    assert sorted(set(statUris)) == sorted(path for path in rows if os.path.exists(path))
+    assert listed.getStats()['statCalls'] == 0
+    assert listed.getStats()['listCalls'] == 2
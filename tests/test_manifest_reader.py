@@ -0,0 +1,117 @@
+import gzip
+import json
+
+import pytest
+
+from conftest import LANDSAT_DOCUMENT, landsatDocument, loadRasterType, loadShared, serveRemote, writeDocument
+
+
+def stacItem(i, baseDir='s3://bucket/scenes/{0}/', **changes):
+    # a STAC item of a Landsat 8 scene with projection info and band assets
+    baseDir = baseDir.format(i)
+    item = {
+        'type': 'Feature',
+        'id': 'scene{0}'.format(i),
+        'bbox': [110.0, 30.0, 110.1, 30.1],
+        'properties': {
+            'datetime': '2018-01-01T00:00:00Z',
+            'platform': 'landsat-8',
+            'instruments': ['oli'],
+            'odc:product': 'ls8_ard',
+            'proj:epsg': 32650,
+            'proj:bbox': [1, 2, 3, 4],
+            'proj:geometry': {'type': 'Polygon', 'coordinates': [[[1, 2], [3, 2], [3, 4], [1, 2]]]},
+            'eo:cloud_cover': 5},
+        'assets': dict((band, {'href': baseDir + band + '.tif'})
+                       for band in LANDSAT_DOCUMENT['image']['bands']),
+        'links': [{'rel': 'odc_yaml', 'href': baseDir + 'doc.yaml'}],
+    }
+    item['properties'].update(changes)
+    return item
+
+
+def writeManifest(path, records, compress=False):
+    lines = [json.dumps(record) if isinstance(record, dict) else record for record in records]
+    data = ('\n'.join(lines) + '\n').encode('utf-8')
+    with (gzip.open(path, 'wb') if compress else open(path, 'wb')) as f:
+        f.write(data)
+    return path
+
+
+@pytest.mark.parametrize('fileName', ('scenes.jsonl', 'scenes.ndjson', 'scenes.jsonl.gz', 'scenes.NDJSON.GZ'))
+def test_json_lines_manifests(fileName, tmpdir):
+    shared = loadShared()
+    reader = shared.ManifestReader()
+    local = writeDocument(str(tmpdir.join('a', 'doc.yaml')), landsatDocument())
+    records = [
+        {'path': local},
+        '',
+        {'raster': 's3://bucket/b/doc.yaml'},
+        {'path': str(tmpdir.join('missing', 'doc.yaml'))},  # skipped like in csv manifests
+        {'name': 'no document path'},
+        {'path': 'https://bucket.s3.amazonaws.com/c/doc.yaml', 'document': {'id': 'c'}},
+    ]
+    manifest = writeManifest(str(tmpdir.join(fileName)), records, fileName.lower().endswith('.gz'))
+    assert reader.isManifest(manifest)
+    assert list(reader.read(manifest)) == [
+        local, 's3://bucket/b/doc.yaml', 'https://bucket.s3.amazonaws.com/c/doc.yaml']
+    # inline documents are handed to the builder through the document cache
+    assert shared.documentCache.get('https://bucket.s3.amazonaws.com/c/doc.yaml') == {'id': 'c'}
+    assert shared.documentCache.get('s3://bucket/b/doc.yaml') is None
+    assert not reader.isManifest(str(tmpdir.join('scenes.csv')))
+
+
+def test_stac_items_are_mapped_onto_documents(tmpdir):
+    shared = loadShared()
+    reader = shared.ManifestReader()
+    items = [stacItem(0), stacItem(1, **{'proj:epsg': None}),
+             stacItem(2, baseDir='s3://other/{0}/'), dict(stacItem(3), links=[])]
+    # a band outside the scene folder can not be addressed by the builder
+    items[2]['assets']['blue']['href'] = 's3://elsewhere/blue.tif'
+    manifest = writeManifest(str(tmpdir.join('items.jsonl')), items)
+    assert list(reader.read(manifest)) == [
+        's3://bucket/scenes/0/doc.yaml', 's3://bucket/scenes/1/doc.yaml', 's3://other/2/doc.yaml']
+    doc = shared.documentCache.get('s3://bucket/scenes/0/doc.yaml')
+    assert doc['id'] == 'scene0'
+    assert doc['platform'] == {'code': 'LANDSAT_8'}
+    assert doc['instrument'] == {'name': 'OLI'}
+    assert doc['product_type'] == 'ls8_ard'
+    assert doc['grid_spatial']['projection']['spatial_reference'] == 'EPSG:32650'
+    assert doc['grid_spatial']['projection']['geo_ref_points']['ur'] == {'x': 3, 'y': 4}
+    assert doc['extent']['coord']['ll'] == {'lat': 30.0, 'lon': 110.0}
+    assert doc['image']['bands']['blue'] == {'path': 'blue.tif'}
+    assert doc['image']['cloud_cover_percentage'] == 5
+    # items without projection info or with outside bands are fetched
+    assert shared.documentCache.get('s3://bucket/scenes/1/doc.yaml') is None
+    assert shared.documentCache.get('s3://other/2/doc.yaml') is None
+    # an item without an odc_yaml link has no document path
+    assert reader.getDocumentPath(items[3]) is None
+
+
+def test_stac_documents_are_not_synthesized_when_disabled(tmpdir):
+    shared = loadShared()
+    manifest = writeManifest(str(tmpdir.join('items.jsonl')), [stacItem(0)])
+    assert list(shared.ManifestReader(False).read(manifest)) == ['s3://bucket/scenes/0/doc.yaml']
+    assert shared.documentCache.get('s3://bucket/scenes/0/doc.yaml') is None
+
+
+def test_build_from_a_stac_manifest_fetches_no_yaml(tmpdir):
+    module = loadRasterType('DataCube-Landsat')
+    (session, client) = serveRemote(module, {})
+    manifest = writeManifest(str(tmpdir.join('items.jsonl.gz')), [stacItem(i) for i in range(3)], True)
+    crawler = module.LandsatDataCubeCrawler(paths=[manifest], recurse=False, filter=None)
+    builder = module.LandsatDataCubeBuilder()
+    items = []
+    uri = crawler.getNextUri()
+    while (uri is not None):
+        if (uri['tag'] == 'DataCube_L8_MS'):
+            items.extend(builder.build(uri))
+        uri = crawler.getNextUri()
+    assert len(items) == 3
+    assert all(item['spatialReference'] == 32650 for item in items)
+    # the bands are addressed relative to the document path of the item
+    for (i, item) in enumerate(items):
+        mrf = item['raster']['functionDataset']['rasterFunctionArguments']['Raster1']
+        assert '<Source>/vsis3/bucket/scenes/{0}/blue.tif</Source>'.format(i) in mrf
+    assert session.requests == []
+    assert client.requests == []
@@ -0,0 +1,122 @@
+import os
+
+import pytest
+import yaml
+from botocore.exceptions import ClientError
+
+from conftest import FakeResponse, FakeS3Client, FakeSession, landsatDocument, loadShared, writeDocument
+
+
+class CountingUtilities(object):
+
+    # the shared readers, counting the documents they parse
+    def __init__(self, shared):
+        self.utils = shared.BaseUtilities()
+        self.parsed = []
+        loadYaml = self.utils.loadYaml
+
+        def counted(data):
+            self.parsed.append(data)
+            return loadYaml(data)
+        self.utils.loadYaml = counted
+
+
+class ConditionalSession(FakeSession):
+
+    # answers If-None-Match requests for an unchanged document with a 304
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append((url, headers))
+        if ((headers or {}).get('If-None-Match') == '"e"'):
+            return FakeResponse(b'', status_code=304)
+        return FakeResponse(self.documents[url], headers={'ETag': '"e"'})
+
+
+class ConditionalS3Client(FakeS3Client):
+
+    # raises botocore's NotModified error for an unchanged document
+    def get_object(self, Bucket, Key, **kwargs):
+        if (kwargs.get('IfNoneMatch') == '"e"'):
+            self.requests.append((Bucket, Key, kwargs))
+            raise ClientError({'Error': {'Code': '304', 'Message': 'Not Modified'}}, 'GetObject')
+        return FakeS3Client.get_object(self, Bucket, Key, **kwargs)
+
+
+@pytest.fixture
+def shared(tmpdir):
+    shared = loadShared()
+    shared.BaseUtilities().configureMetadataCache(str(tmpdir.join('cache.db')))
+    return shared
+
+
+def test_unchanged_local_document_is_a_hit(shared, tmpdir):
+    path = str(tmpdir.join('doc.yaml'))
+    writeDocument(path, landsatDocument(id='a'))
+    reader = CountingUtilities(shared)
+    assert reader.utils.readYaml(path)['id'] == 'a'
+    assert reader.utils.readYaml(path)['id'] == 'a'
+    assert len(reader.parsed) == 1
+
+
+def test_changed_local_document_is_a_miss(shared, tmpdir):
+    path = str(tmpdir.join('doc.yaml'))
+    writeDocument(path, landsatDocument(id='a'))
+    reader = CountingUtilities(shared)
+    reader.utils.readYaml(path)
+    stat = os.stat(path)
+    # a new mtime
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert reader.utils.readYaml(path)['id'] == 'a'
+    assert len(reader.parsed) == 2
+    # a new size with the same mtime
+    writeDocument(path, landsatDocument(id='longer'))
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert reader.utils.readYaml(path)['id'] == 'longer'
+    assert len(reader.parsed) == 3
+
+
+def test_unmodified_http_document_is_served_from_the_cache(shared):
+    url = 'https://bucket.s3.amazonaws.com/scene/doc.yaml'
+    session = ConditionalSession({url: yaml.safe_dump(landsatDocument(id='a')).encode('utf-8')})
+    shared.httpTransport._session = session
+    reader = CountingUtilities(shared)
+    assert reader.utils.readYamlS3(url)['id'] == 'a'
+    assert reader.utils.readYamlS3(url)['id'] == 'a'
+    assert len(reader.parsed) == 1
+    assert [headers for (url, headers) in session.requests] == [{}, {'If-None-Match': '"e"'}]
+
+
+def test_unmodified_s3_document_is_served_from_the_cache(shared):
+    client = ConditionalS3Client({'s3://bucket/scene/doc.yaml':
+                                  yaml.safe_dump(landsatDocument(id='a')).encode('utf-8')})
+    shared.s3ClientPool._client = client
+    reader = CountingUtilities(shared)
+    assert reader.utils.readYamlS3_boto3('bucket', 'scene/doc.yaml')['id'] == 'a'
+    assert reader.utils.readYamlS3_boto3('bucket', 'scene/doc.yaml')['id'] == 'a'
+    assert len(reader.parsed) == 1
+    assert [kwargs.get('IfNoneMatch') for (bucket, key, kwargs) in client.requests] == [None, '"e"']
+
+
+def test_least_recently_used_documents_are_evicted(tmpdir):
+    shared = loadShared()
+    path = str(tmpdir.join('cache.db'))
+    doc = {'data': 'x' * 1000}
+    size = len(shared.pickle.dumps(doc, shared.pickle.HIGHEST_PROTOCOL))
+    cache = shared.MetadataCache(path, maxSizeMB=3.5 * size / (1024.0 * 1024))
+    for key in ('a', 'b', 'c'):
+        cache.put(key, 'v', doc)
+    assert cache.get('a', 'v') == doc  # b is now the least recently used
+    cache.put('d', 'v', doc)
+    assert cache.get('b', 'v') is None
+    assert [cache.get(key, 'v') is not None for key in ('a', 'c', 'd')] == [True, True, True]
+    assert cache.totalBytes == 3 * size
+    # replacing a document does not count it twice
+    cache.put('a', 'w', doc)
+    assert cache.totalBytes == 3 * size
+    assert cache.get('c', 'v') == doc
+    # a new process starts from the stored total and access times
+    cache.commit(True)
+    reopened = shared.MetadataCache(path, maxSizeMB=3.5 * size / (1024.0 * 1024))
+    assert reopened.totalBytes == 3 * size
+    reopened.put('e', 'v', doc)
+    assert reopened.get('d', 'v') is None
+    assert reopened.totalBytes == 3 * size
@@ -0,0 +1,107 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from conftest import BUILD_CASES, buildAll, loadRasterType, loadShared
+
+CRAWLERS = {
+    'DataCube-Landsat': 'LandsatDataCubeCrawler',
+    'DataCube-Sentinel': 'SentinelDataCubeCrawler',
+    'GeoScience-Landsat': 'GeoscienceCrawler',
+    'Geoscience-Sentinel2': 'GeoscienceSentinelCrawler',
+    'Geoscience': 'GeoscienceCrawler',
+}
+
+
+def withSidecars(name, tmpdir):
+    # a fresh module whose crawler was given a sidecar directory
+    module = loadRasterType(name)
+    getattr(module, CRAWLERS[name])(
+        paths=[str(tmpdir.ensure('scenes', dir=True))], recurse=False, filter='*.yaml',
+        mrfSidecarPath=str(tmpdir.join('sidecars')))
+    assert module.rasterTypeUtils.mrfSidecars is not None
+    return module
+
+
+def sidecarFiles(tmpdir):
+    root = str(tmpdir.join('sidecars'))
+    return sorted(os.path.join(path, f) for (path, dirs, files) in os.walk(root) for f in files)
+
+
+def readSidecar(path):
+    with io.open(path, 'r', encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+def pairMRFs(inline, referenced):
+    # the (inline MRF, sidecar path) pairs of two builds of the same items,\
+    # which must agree everywhere else
+    if (isinstance(inline, dict)):
+        assert sorted(inline) == sorted(referenced)
+        for key in inline:
+            for pair in pairMRFs(inline[key], referenced[key]):
+                yield pair
+    elif (isinstance(inline, list)):
+        assert len(inline) == len(referenced)
+        for (a, b) in zip(inline, referenced):
+            for pair in pairMRFs(a, b):
+                yield pair
+    elif (isinstance(inline, str) and inline.startswith('<MRF_META>')):
+        yield (inline, referenced)
+    else:
+        assert inline == referenced
+
+
+def sidecarPath(tmpdir, mrf):
+    digest = hashlib.sha1(mrf.encode('utf-8')).hexdigest()
+    return os.path.join(str(tmpdir.join('sidecars')), digest[0:2], digest + '.mrf')
+
+
+@pytest.mark.parametrize('name', sorted(BUILD_CASES))
+def test_built_items_reference_sidecars_of_the_inline_mrf(name, tmpdir):
+    inline = buildAll(loadRasterType(name), name)
+    referenced = buildAll(withSidecars(name, tmpdir), name)
+    pairs = list(pairMRFs(inline, referenced))
+    assert pairs  # the http and s3 paths embed an MRF per band
+    for (mrf, path) in pairs:
+        assert path == sidecarPath(tmpdir, mrf)
+        assert readSidecar(path) == mrf
+    # identical documents share one file
+    assert sidecarFiles(tmpdir) == sorted(set(path for (mrf, path) in pairs))
+
+
+@pytest.mark.parametrize('name', sorted(BUILD_CASES))
+def test_sidecar_paths_are_stable_across_builds(name, tmpdir):
+    first = buildAll(withSidecars(name, tmpdir), name)
+    files = sidecarFiles(tmpdir)
+    stamps = [os.stat(path).st_mtime_ns for path in files]
+    # a new process finds the files written by the first one
+    second = buildAll(withSidecars(name, tmpdir), name)
+    assert second == first
+    assert sidecarFiles(tmpdir) == files
+    assert [os.stat(path).st_mtime_ns for path in files] == stamps
+
+
+def test_geoscience_embedmrf_references_a_sidecar(tmpdir):
+    args = ('bucket/WOfS/x', 'water.tif', 3, 4, 1, 2, 'EPSG:3577',
+            4000, 4000, 'Int16', 'WOfS', 1, 'vsis3/', 'WOfS/x')
+    mrf = loadRasterType('Geoscience').GeoscienceBuilder().embedMRF(*args)
+    assert mrf.startswith('<MRF_META>')
+    path = withSidecars('Geoscience', tmpdir).GeoscienceBuilder().embedMRF(*args)
+    assert path == sidecarPath(tmpdir, mrf)
+    assert readSidecar(path) == mrf
+
+
+def test_store_writes_each_document_once(tmpdir):
+    store = loadShared().MRFSidecarStore(str(tmpdir.join('sidecars')), maxKnown=1)
+    first = store.reference(u'<MRF_META>a</MRF_META>\n')
+    assert store.reference(u'<MRF_META>a</MRF_META>\n') == first
+    second = store.reference(u'<MRF_META>b</MRF_META>\n')  # forgets the first digest
+    assert second != first
+    stamp = os.stat(first).st_mtime_ns
+    assert store.reference(u'<MRF_META>a</MRF_META>\n') == first
+    assert os.stat(first).st_mtime_ns == stamp
+    assert sidecarFiles(tmpdir) == sorted([first, second])
+    assert not [f for f in os.listdir(os.path.dirname(first)) if f.endswith('.tmp')]
@@ -0,0 +1,243 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from conftest import loadRasterType
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# The string-built embedMRF of each builder before the precompiled templates
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+def legacyDataCubeLandsat(inputDir, fileName, maxX, maxY, minX, minY, prjString, protocol, cachePath):
+    return \
+        '<MRF_META>\n'  \
+        '  <CachedSource>\n'  \
+        '    <Source>/{8}{0}/{1}</Source>\n'  \
+        '  </CachedSource>\n'  \
+        '  <Raster>\n'  \
+        '    <Size c="1" x="3500" y="3500"/>\n'  \
+        '    <PageSize c="1" x="512" y="512"/>\n'  \
+        '    <Compression>LERC</Compression>\n'  \
+        '    <DataType>Int16</DataType>\n'  \
+        '   <DataValues NoData="-9999" />\n' \
+        '  <DataFile>z:/mrfcache/{9}/{7}.mrf_cache</DataFile><IndexFile>z:/mrfcache/{9}/{7}.mrf_cache</IndexFile></Raster>\n'  \
+        '  <Rsets model="uniform" scale="2"/>\n'  \
+        '  <GeoTags>\n'  \
+        '    <BoundingBox maxx="{2}" maxy="{3}" minx="{4}" miny="{5}"/>\n'  \
+        '    <Projection>{6}</Projection>\n'  \
+        '  </GeoTags>\n'  \
+        '  <Options>V2=ON</Options>\n'  \
+        '</MRF_META>\n'.format(inputDir, fileName, maxX, maxY, minX, minY, prjString, fileName[0:-4], protocol, cachePath)
+
+
+def legacyDataCubeSentinel(inputDir, fileName, maxX, maxY, minX, minY, prjString, protocol, cachePath):
+    return \
+        '<MRF_META>\n'  \
+        '  <CachedSource>\n'  \
+        '    <Source>/{8}{0}/{1}</Source>\n'  \
+        '  </CachedSource>\n'  \
+        '  <Raster>\n'  \
+        '    <Size c="1" x="5529" y="5529"/>\n'  \
+        '    <PageSize c="1" x="512" y="512"/>\n'  \
+        '    <Compression>LERC</Compression>\n'  \
+        '    <DataType>Float32</DataType>\n'  \
+        '  <DataFile>z:/mrfcache/{9}/{7}.mrf_cache</DataFile><IndexFile>z:/mrfcache/{9}/{7}.mrf_cache</IndexFile></Raster>\n'  \
+        '  <Rsets model="uniform" scale="2"/>\n'  \
+        '  <GeoTags>\n'  \
+        '    <BoundingBox maxx="{2}" maxy="{3}" minx="{4}" miny="{5}"/>\n'  \
+        '    <Projection>{6}</Projection>\n'  \
+        '  </GeoTags>\n'  \
+        '  <Options>V2=ON</Options>\n'  \
+        '</MRF_META>\n'.format(inputDir, fileName, maxX, maxY, minX, minY, prjString, fileName[0:-4], protocol, cachePath)
+
+
+def legacyGeoscienceLandsat(inputDir, fileName, maxX, maxY, minX, minY, prjString, protocol):
+    return \
+        '<MRF_META>\n'  \
+        '  <CachedSource>\n'  \
+        '    <Source>/{8}{0}/{1}</Source>\n'  \
+        '  </CachedSource>\n'  \
+        '  <Raster>\n'  \
+        '    <Size c="1" x="4000" y="4000"/>\n'  \
+        '    <PageSize c="1" x="512" y="512"/>\n'  \
+        '    <Compression>LERC</Compression>\n'  \
+        '    <DataType>Int16</DataType>\n'  \
+        '  <DataFile>z:/mrfcache/Geoscience/Landsat/{7}.mrf_cache</DataFile><IndexFile>z:/mrfcache/Geoscience/Landsat/{7}.mrf_cache</IndexFile></Raster>\n'  \
+        '  <Rsets model="uniform" scale="2"/>\n'  \
+        '  <GeoTags>\n'  \
+        '    <BoundingBox maxx="{2}" maxy="{3}" minx="{4}" miny="{5}"/>\n'  \
+        '    <Projection>{6}</Projection>\n'  \
+        '  </GeoTags>\n'  \
+        '  <Options>V2=ON</Options>\n'  \
+        '</MRF_META>\n'.format(inputDir, fileName, maxX, maxY, minX, minY, prjString, fileName[0:-4], protocol)
+
+
+def legacyGeoscienceSentinel2(inputDir, fileName, cols, rows, dtype, nodata, maxX, maxY, minX, minY, prjString, protocol):
+    return \
+        '<MRF_META>\n'  \
+        '  <CachedSource>\n'  \
+        '    <Source>/{12}{0}/{1}</Source>\n'  \
+        '  </CachedSource>\n'  \
+        '  <Raster>\n'  \
+        '    <Size c="1" x="{2}" y="{3}"/>\n'  \
+        '    <PageSize c="1" x="512" y="512"/>\n'  \
+        '    <Compression>LERC</Compression>\n'  \
+        '    <DataType>{4}</DataType>\n'  \
+        '  <DataValues NoData="{6}"/>\n' \
+        '  <DataFile>z:/mrfcache/Geoscience/Sentinel2/{0}/{1}/{5}.mrf_cache</DataFile><IndexFile>z:/mrfcache/Geoscience/Sentinel2/{0}/{1}/{5}.mrf_cache</IndexFile></Raster>\n'  \
+        '  <Rsets model="uniform" scale="2"/>\n'  \
+        '  <GeoTags>\n'  \
+        '    <BoundingBox maxx="{7}" maxy="{8}" minx="{9}" miny="{10}"/>\n'  \
+        '    <Projection>{11}</Projection>\n'  \
+        '  </GeoTags>\n'  \
+        '  <Options>V2=ON</Options>\n'  \
+        '</MRF_META>\n'.format(inputDir, fileName, cols, rows, dtype, fileName[0:-4], nodata, maxX, maxY, minX, minY, prjString, protocol)
+
+
+def legacyGeoscience(inputDir, fileName, maxX, maxY, minX, minY, prjString, nRows, nCols, dataType, tag, nBands, protocol, cachePath):
+    return \
+        '<MRF_META>\n'  \
+        '  <CachedSource>\n'  \
+        '    <Source>/{13}{0}/{1}</Source>\n'  \
+        '  </CachedSource>\n'  \
+        '  <Raster>\n'  \
+        '    <Size c="{12}" x="{8}" y="{9}"/>\n'  \
+        '    <PageSize c="1" x="512" y="512"/>\n'  \
+        '    <Compression>LERC</Compression>\n'  \
+        '    <DataType>{10}</DataType>\n'  \
+        '  <DataFile>z:/mrfcache/Geoscience/{14}/{7}.mrf_cache</DataFile><IndexFile>z:/mrfcache/Geoscience/{14}/{7}.mrf_cache</IndexFile></Raster>\n'  \
+        '  <Rsets model="uniform" scale="2"/>\n'  \
+        '  <GeoTags>\n'  \
+        '    <BoundingBox maxx="{2}" maxy="{3}" minx="{4}" miny="{5}"/>\n'  \
+        '    <Projection>{6}</Projection>\n'  \
+        '  </GeoTags>\n'  \
+        '  <Options>V2=ON</Options>\n'  \
+        '</MRF_META>'.format(inputDir, fileName, maxX, maxY, minX, minY, prjString, fileName[0:-4], nCols, nRows, dataType, tag, nBands, protocol, cachePath)
+
+
+def legacyFractionalCover(inputDir, fileName, maxX, maxY, minX, minY, prjString, nRows, nCols, tag, nBands, protocol, cachePath):
+    return \
+        '<MRF_META>\n'  \
+        '  <CachedSource>\n'  \
+        '    <Source>/{12}{0}/{1}</Source>\n'  \
+        '  </CachedSource>\n'  \
+        '  <Raster>\n'  \
+        '    <Size c="{11}" x="{8}" y="{9}"/>\n'  \
+        '    <PageSize c="1" x="512" y="512"/>\n'  \
+        '    <Compression>LERC</Compression>\n'  \
+        '  <DataFile>z:/mrfcache/Geoscience/{13}/{7}.mrf_cache</DataFile><IndexFile>z:/mrfcache/Geoscience/{13}/{7}.mrf_cache</IndexFile></Raster>\n'  \
+        '  <Rsets model="uniform" scale="2"/>\n'  \
+        '  <GeoTags>\n'  \
+        '    <BoundingBox maxx="{2}" maxy="{3}" minx="{4}" miny="{5}"/>\n'  \
+        '    <Projection>{6}</Projection>\n'  \
+        '  </GeoTags>\n'  \
+        '  <Options>V2=ON</Options>\n'  \
+        '</MRF_META>'.format(inputDir, fileName, maxX, maxY, minX, minY, prjString, fileName[0:-4], nCols, nRows, tag, nBands, protocol, cachePath)
+
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Scenes rendered both ways
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+WKT = 'PROJCS["WGS 84 / UTM zone 50N",GEOGCS["WGS 84",UNIT["degree",0.0174532925199433]]]'
+
+# protocol, inputDir, cachePath, extent (maxX, maxY, minX, minY), projection\
+# and the band files of a scene, with a float extent, a '%' and braces in the\
+# values which neither formatting may expand
+SCENES = [
+    ('vsicurl/http://', 'bucket.s3.amazonaws.com/L8/088/080', 'L8/088/080',
+     (3, 4, 1, 2), WKT, ['blue.tif', 'nir.tif']),
+    ('vsis3/', 'bucket/S2/2018/T55', 'S2/2018/T55',
+     (300.0, 400.25, 100.5, 200.0), 'EPSG:32755', ['nbart_red.tif', 'fmask.tif']),
+    ('vsis3/', 'bucket/odd 50%/{x}', 'odd 50%/{x}',
+     (-1.5e-05, 7, -180, -90.0), '{0} %s', ['a%d{1}.TIF']),
+]
+
+
+def elementTree(mrf):
+    # the tag, attributes, stripped text and children of each element, which\
+    # is what GDAL reads of the document
+    def walk(element):
+        return (element.tag, sorted(element.attrib.items()), (element.text or '').strip(),
+                [walk(child) for child in element])
+    return walk(ET.fromstring(mrf))
+
+
+def assertSameMRF(rendered, legacy):
+    assert elementTree(rendered) == elementTree(legacy)
+    assert rendered == legacy
+
+
+@pytest.mark.parametrize('scene', SCENES)
+@pytest.mark.parametrize('name,legacy', [
+    ('DataCube-Landsat', legacyDataCubeLandsat),
+    ('DataCube-Sentinel', legacyDataCubeSentinel),
+])
+def test_datacube_templates_match_the_legacy_mrf(name, legacy, scene):
+    module = loadRasterType(name)
+    (protocol, inputDir, cachePath, (maxX, maxY, minX, minY), projection, files) = scene
+    template = module.landsatMRF if name == 'DataCube-Landsat' else module.sentinelMRF
+    # bound per scene and formatted per band, as the builder does
+    sceneMRF = template.bind(
+        protocol=protocol, inputDir=inputDir, cachePath=cachePath,
+        maxX=maxX, maxY=maxY, minX=minX, minY=minY, projection=projection)
+    for fileName in files:
+        assertSameMRF(
+            sceneMRF.format(fileName=fileName, stem=fileName[0:-4]),
+            legacy(inputDir, fileName, maxX, maxY, minX, minY, projection, protocol, cachePath))
+
+
+@pytest.mark.parametrize('scene', SCENES)
+def test_geoscience_landsat_template_matches_the_legacy_mrf(scene):
+    module = loadRasterType('GeoScience-Landsat')
+    (protocol, inputDir, cachePath, (maxX, maxY, minX, minY), projection, files) = scene
+    sceneMRF = module.landsatMRF.bind(
+        protocol=protocol, inputDir=inputDir,
+        maxX=maxX, maxY=maxY, minX=minX, minY=minY, projection=projection)
+    for fileName in files:
+        assertSameMRF(
+            sceneMRF.format(fileName=fileName, stem=fileName[0:-4]),
+            legacyGeoscienceLandsat(inputDir, fileName, maxX, maxY, minX, minY, projection, protocol))
+
+
+@pytest.mark.parametrize('scene', SCENES)
+def test_sentinel2_template_matches_the_legacy_mrf_for_every_band_profile(scene):
+    module = loadRasterType('Geoscience-Sentinel2')
+    (protocol, inputDir, cachePath, (maxX, maxY, minX, minY), projection, files) = scene
+    sceneMRF = module.sentinelMRF.bind(
+        protocol=protocol, inputDir=inputDir,
+        maxX=maxX, maxY=maxY, minX=minX, minY=minY, projection=projection)
+    for (bandName, cols, rows, dtype, nodata) in module.sentinelBands.values():
+        fileName = bandName + '.tif'
+        assertSameMRF(
+            sceneMRF.profile(cols=cols, rows=rows, dataType=dtype, noData=nodata).format(
+                fileName=fileName, stem=fileName[0:-4]),
+            legacyGeoscienceSentinel2(inputDir, fileName, cols, rows, dtype, nodata,
+                                      maxX, maxY, minX, minY, projection, protocol))
+
+
+@pytest.mark.parametrize('scene', SCENES)
+def test_geoscience_embedmrf_matches_the_legacy_mrf(scene):
+    module = loadRasterType('Geoscience')
+    builder = module.GeoscienceBuilder()
+    (protocol, inputDir, cachePath, (maxX, maxY, minX, minY), projection, files) = scene
+    for fileName in files:
+        for (nRows, nCols, dataType, nBands) in ((4000, 4000, 'Int16', 1), (100, 200, 'UInt8', 3)):
+            assertSameMRF(
+                builder.embedMRF(inputDir, fileName, maxX, maxY, minX, minY, projection,
+                                 nRows, nCols, dataType, 'WOfS', nBands, protocol, cachePath),
+                legacyGeoscience(inputDir, fileName, maxX, maxY, minX, minY, projection,
+                                 nRows, nCols, dataType, 'WOfS', nBands, protocol, cachePath))
+            assertSameMRF(
+                builder.embedMRF_fc(inputDir, fileName, maxX, maxY, minX, minY, projection,
+                                    nRows, nCols, 'FC', nBands, protocol, cachePath),
+                legacyFractionalCover(inputDir, fileName, maxX, maxY, minX, minY, projection,
+                                      nRows, nCols, 'FC', nBands, protocol, cachePath))
+
+
+def test_template_reports_a_missing_field():
+    module = loadRasterType('DataCube-Landsat')
+    with pytest.raises(Exception, match='MRF field'):
+        module.landsatMRF.bind(protocol='vsis3/').format(fileName='a.tif')
@@ -0,0 +1,43 @@
+import threading
+
+import pytest
+
+from conftest import loadShared
+
+
+class RecordingUtilities(object):
+
+    def __init__(self):
+        self.read = {}
+
+    def readDocument(self, path):
+        self.read.setdefault(path, threading.Event()).set()
+
+
+def pulled(paths, log):
+    for path in paths:
+        log.append(path)
+        yield path
+
+
+@pytest.mark.parametrize('depth', (1, 2, 3))
+def test_depth_documents_are_read_ahead_of_the_current_one(depth):
+    utils = RecordingUtilities()
+    prefetcher = loadShared().MetadataPrefetcher(utils, depth=depth)
+    paths = ['scene{0}'.format(i) for i in range(6)]
+    log = []
+    handedOn = prefetcher.prefetch(pulled(paths, log))
+    assert next(handedOn) == 'scene0'
+    # the current path and 'depth' paths after it were pulled and fetched
+    assert log == paths[:depth + 1]
+    for path in log:
+        assert utils.read.setdefault(path, threading.Event()).wait(5)
+    assert list(handedOn) == paths[1:]
+
+
+def test_depth_zero_reads_nothing():
+    shared = loadShared()
+    utils = RecordingUtilities()
+    prefetcher = shared.MetadataPrefetcher(utils, depth=0)
+    assert list(prefetcher.prefetch(iter(['a', 'b']))) == ['a', 'b']
+    assert utils.read == {}
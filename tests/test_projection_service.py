@@ -0,0 +1,60 @@
+import os
+
+import yaml
+
+from conftest import landsatDocument, loadRasterType, loadShared, serveRemote, writeDocument
+
+
+def test_lookup_resolves_each_code_once(arcpyStub):
+    service = loadShared().ProjectionService()
+    created = arcpyStub.SpatialReference.created
+    wkt = service.exportToString(32650)
+    assert service.exportToString(32650) == wkt == 'PROJCS["EPSG 32650"]'
+    assert service.getPCSCode(32650) == 32650
+    assert arcpyStub.SpatialReference.created == created + 1
+    assert service.getStats() == {'hits': 2, 'misses': 3, 'size': 3}
+
+
+def test_lookup_evicts_least_recently_used():
+    service = loadShared().ProjectionService(maxSize=2, spatialReference=lambda code: 'sr{0}'.format(code))
+    service.getSpatialReference(1)
+    service.getSpatialReference(2)
+    service.getSpatialReference(1)
+    service.getSpatialReference(3)  # evicts 2
+    assert service.getStats()['size'] == 2
+    service.getSpatialReference(1)
+    service.getSpatialReference(2)
+    assert service.getStats() == {'hits': 2, 'misses': 4, 'size': 2}
+
+
+def test_configure_replaces_spatial_reference_and_clears():
+    service = loadShared().ProjectionService()
+    service.exportToString(32650)
+    service.configure(spatialReference=lambda code: type('SR', (), {
+        'exportToString': lambda self: 'WKT{0}'.format(code)})())
+    assert service.getStats()['size'] == 0
+    assert service.exportToString(32650) == 'WKT32650'
+
+
+def test_crawled_scenes_share_one_lookup(tmpdir):
+    module = loadRasterType('DataCube-Landsat')
+    root = str(tmpdir)
+    documents = {}
+    for i in range(3):
+        doc = landsatDocument(id='scene{0}'.format(i))
+        writeDocument(os.path.join(root, 'scene{0}'.format(i), 'doc.yaml'), doc)
+        documents['s3://bucket/scene{0}/doc.yaml'.format(i)] = yaml.safe_dump(doc).encode('utf-8')
+    serveRemote(module, documents)
+
+    crawler = module.LandsatDataCubeCrawler(paths=[root], recurse=True, filter=None)
+    builder = module.LandsatDataCubeBuilder()
+    uris = list(iter(crawler.getNextUri, None))
+    assert sorted(set(os.path.basename(os.path.dirname(uri['path'])) for uri in uris)) == \
+        ['scene0', 'scene1', 'scene2']
+    for uri in uris:
+        remote = dict(uri, path='s3://bucket/' + os.path.relpath(uri['path'], root).replace(os.sep, '/'))
+        for item in builder.build(uri) + builder.build(remote):
+            assert item['spatialReference'] == 32650
+    # the WKT of the zone is resolved once for the whole crawl
+    assert module.rasterTypeUtils.projectionService.getStats()['misses'] == 2
+    assert module.rasterTypeUtils.projectionService.getStats()['hits'] == len(uris) - 1
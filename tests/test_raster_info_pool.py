@@ -0,0 +1,60 @@
+import pytest
+
+from conftest import BUILD_CASES, buildAll, buildPaths, loadRasterType, loadShared
+
+EXTENT = (32650, 1, 2, 3, 4)
+
+
+def rasterInfos(value):
+    # the rasterInfo dicts of the raster function arguments of an item
+    if (isinstance(value, dict)):
+        for (key, child) in value.items():
+            if (key.endswith('_rasterInfo')):
+                yield child
+            else:
+                for rasterInfo in rasterInfos(child):
+                    yield rasterInfo
+    elif (isinstance(value, list)):
+        for child in value:
+            for rasterInfo in rasterInfos(child):
+                yield rasterInfo
+
+
+def test_pool_hits_and_misses():
+    pool = loadShared().RasterInfoPool()
+    first = pool.get(6, 4000, EXTENT)
+    assert pool.get(6, 4000, EXTENT) is first
+    assert pool.get(6, 4000, (32650, 1, 2, 3, 5)) is not first
+    assert pool.get(3, 4000, EXTENT) is not first
+    assert pool.getStats() == {'hits': 1, 'misses': 3, 'size': 3}
+    assert first.toDict() is first.toDict()
+    assert first.toDict() == {'pixelType': 6, 'ncols': 4000, 'nRows': 4000, 'nBands': 1,
+                              'spatialReference': 32650, 'xMin': 1, 'yMin': 2, 'xMax': 3, 'yMax': 4}
+
+
+def test_pool_keeps_the_most_recently_created_records():
+    pool = loadShared().RasterInfoPool(maxSize=2)
+    first = pool.get(6, 1, EXTENT)
+    pool.get(6, 2, EXTENT)
+    pool.get(6, 3, EXTENT)  # drops the first record
+    assert pool.getStats()['size'] == 2
+    assert pool.get(6, 1, EXTENT) is not first
+    assert pool.getStats() == {'hits': 0, 'misses': 4, 'size': 2}
+
+
+@pytest.mark.parametrize('name', sorted(BUILD_CASES))
+def test_items_of_a_scene_share_their_raster_info(name):
+    module = loadRasterType(name)
+    (builderName, fileName, kinds, tags) = BUILD_CASES[name]
+    buildAll(module, name)  # puts the documents in the document cache
+    builder = getattr(module, builderName)()
+    path = buildPaths(kinds[0], fileName)[2]
+    items = [item for tag in tags for item in builder.build({'path': path, 'tag': tag})]
+    infos = list(rasterInfos(items))
+    assert infos
+    distinct = dict((tuple(sorted(info.items())), info) for info in infos)
+    # equal blocks are one dict, within an item and across the items
+    assert all(info is distinct[tuple(sorted(info.items()))] for info in infos)
+    stats = module.rasterTypeUtils.rasterInfoPool.getStats()
+    assert stats['size'] == len(distinct)
+    assert stats['hits'] > 0
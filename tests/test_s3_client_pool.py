@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+import yaml
+
+from conftest import FakeS3Client, YAML_TYPES, landsatDocument, loadRasterType, loadShared
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    created = []
+    documents = dict(('s3://bucket/scene{0}/doc.yaml'.format(i),
+                      yaml.safe_dump(landsatDocument(id='scene{0}'.format(i))).encode('utf-8'))
+                     for i in range(5))
+
+    def client(service, config=None):
+        created.append(config)
+        return FakeS3Client(documents)
+    monkeypatch.setattr('boto3.client', client)
+    return created
+
+
+@pytest.mark.parametrize('name', YAML_TYPES)
+def test_documents_share_one_client(name, clients):
+    module = loadRasterType(name)
+    utils = module.Utilities()
+    for i in range(5):
+        doc = utils.readDocument('s3://bucket/scene{0}/doc.yaml'.format(i))
+        assert doc['id'] == 'scene{0}'.format(i)
+    assert len(clients) == 1
+    client = module.rasterTypeUtils.s3ClientPool.getClient()
+    # one GET per document, with the requester pays header
+    assert [(bucket, key) for (bucket, key, kwargs) in client.requests] == \
+        [('bucket', 'scene{0}/doc.yaml'.format(i)) for i in range(5)]
+    assert all(kwargs == {'RequestPayer': 'requester'} for (bucket, key, kwargs) in client.requests)
+
+
+def test_client_is_created_once_across_threads(clients):
+    pool = loadShared().S3ClientPool()
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(pool.getClient())) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(clients) == 1
+    assert all(client is seen[0] for client in seen)
+
+
+def test_client_is_recreated_when_its_settings_change(clients):
+    pool = loadShared().S3ClientPool()
+    first = pool.getClient()
+    pool.configure(10, 'standard', 3)  # the defaults
+    assert pool.getClient() is first
+    pool.configure(maxPoolConnections=32)
+    second = pool.getClient()
+    assert second is not first
+    assert len(clients) == 2
+    assert clients[1].max_pool_connections == 32
+    assert clients[1].retries == {'mode': 'standard', 'max_attempts': 3}
@@ -0,0 +1,148 @@
+import os
+
+import pytest
+
+from conftest import (landsatDocument, loadRasterType, loadShared, sentinel2Document,
+                      writeDocument, xmlDocument)
+
+SCENE = {'date': '2018-06-15T10:20:30', 'platform': 'LANDSAT_8',
+         'bbox': (110.0, 30.0, 111.0, 31.0), 'cloudCover': 20}
+
+
+def sceneFilter(**properties):
+    return loadShared().SceneFilter(**properties)
+
+
+@pytest.mark.parametrize('startDate, endDate, kept', (
+    ('2018-06-15', None, True),
+    ('2018-06-16', None, False),
+    (None, '2018-06-15T00:00:00', True),  # the day of the bound is included
+    (None, '2018-06-14', False),
+    ('2018-01-01', '2018-12-31', True),
+    ('2019-01-01', '2019-12-31', False),
+))
+def test_date_range(startDate, endDate, kept):
+    assert sceneFilter(startDate=startDate, endDate=endDate).matches(SCENE) == kept
+
+
+@pytest.mark.parametrize('bbox, kept', (
+    ((110.5, 30.5, 112.0, 32.0), True),  # overlaps
+    ((109.0, 29.0, 112.0, 32.0), True),  # contains
+    ('111.0,31.0,112.0,32.0', True),  # touches a corner
+    ((111.1, 30.0, 112.0, 31.0), False),  # east
+    ((108.0, 30.0, 109.9, 31.0), False),  # west
+    ((110.0, 31.1, 111.0, 32.0), False),  # north
+    ((110.0, 28.0, 111.0, 29.9), False),  # south
+))
+def test_bbox_intersection(bbox, kept):
+    assert sceneFilter(bbox=bbox).matches(SCENE) == kept
+
+
+@pytest.mark.parametrize('platforms, kept', (
+    ('landsat', True),
+    ('landsat-8', True),
+    ('Landsat_8', True),
+    ('sentinel_2;landsat_8', True),
+    (['SENTINEL', 'LANDSAT_7'], False),
+    ('landsat_7', False),
+    ('8', False),  # a prefix, not a substring
+))
+def test_platforms_prefix_match(platforms, kept):
+    assert sceneFilter(platforms=platforms).matches(SCENE) == kept
+
+
+def test_cloud_cover():
+    assert sceneFilter(maxCloudCover=20).matches(SCENE)
+    assert not sceneFilter(maxCloudCover='19.5').matches(SCENE)
+    assert not sceneFilter(maxCloudCover=0).matches(dict(SCENE, cloudCover='0.1'))
+
+
+def test_missing_values_do_not_exclude():
+    strict = sceneFilter(startDate='2030-01-01', endDate='2030-12-31', bbox=(0, 0, 1, 1),
+                         maxCloudCover=0, platforms='SENTINEL')
+    assert not strict.matches(SCENE)
+    assert strict.matches({})
+    assert strict.matches({'date': None, 'platform': None, 'bbox': None, 'cloudCover': None})
+
+
+def test_select_counts_dropped_scenes_and_keeps_unreadable_ones():
+    scenes = {'a': SCENE, 'b': dict(SCENE, platform='SENTINEL_2A'), 'c': dict(SCENE, cloudCover=None)}
+
+    def getSceneProperties(path):
+        return scenes[path]  # 'd' can not be read
+    selected = sceneFilter(platforms='landsat')
+    assert list(selected.select(iter('abcd'), getSceneProperties)) == ['a', 'c', 'd']
+    assert selected.dropped == 1
+    # an inactive filter reads no metadata
+    inactive = sceneFilter()
+    assert not inactive.active
+    assert list(inactive.select(iter('abcd'), None)) == ['a', 'b', 'c', 'd']
+
+
+def test_yaml_scene_properties(tmpdir):
+    utils = loadRasterType('DataCube-Landsat').Utilities()
+    coord = {'ll': {'lat': 30.0, 'lon': 110.0}, 'lr': {'lat': 30.0, 'lon': 111.0},
+             'ul': {'lat': 31.0, 'lon': 110.0}, 'ur': {'lat': 31.0, 'lon': 111.0}}
+    path = writeDocument(str(tmpdir.join('full', 'doc.yaml')), landsatDocument(
+        extent={'center_dt': '2018-06-15T10:20:30', 'coord': coord},
+        image={'bands': {}, 'cloud_cover_percentage': 20}))
+    assert utils.getSceneProperties(path) == SCENE
+    # from_dt stands in for center_dt
+    path = writeDocument(str(tmpdir.join('from', 'doc.yaml')), landsatDocument(
+        extent={'from_dt': '2018-06-15T10:20:30'}))
+    assert utils.getSceneProperties(path)['date'] == '2018-06-15T10:20:30'
+    path = writeDocument(str(tmpdir.join('empty', 'doc.yaml')), {'id': 'x'})
+    scene = utils.getSceneProperties(path)
+    assert scene == {'date': None, 'platform': None, 'bbox': None, 'cloudCover': None}
+    assert sceneFilter(startDate='2030-01-01', bbox=(0, 0, 1, 1), maxCloudCover=0,
+                       platforms='SENTINEL').matches(scene)
+
+
+def test_sentinel2_cloud_cover_comes_from_the_level1_source(tmpdir):
+    utils = loadRasterType('Geoscience-Sentinel2').Utilities()
+    doc = sentinel2Document()
+    doc['lineage']['source_datasets']['level1']['image'] = {'cloud_cover_percentage': 42.5}
+    path = writeDocument(str(tmpdir.join('s2', 'ARD-METADATA.yaml')), doc)
+    scene = utils.getSceneProperties(path)
+    assert scene['cloudCover'] == 42.5
+    assert scene['platform'] == 'SENTINEL_2A'
+    assert not sceneFilter(maxCloudCover=40).matches(scene)
+
+
+@pytest.mark.parametrize('name, satelliteId', (('SuperView-1', 'SV1'), ('Triplesat', 'TripleSat')))
+def test_xml_scene_properties(name, satelliteId, tmpdir):
+    utils = loadRasterType(name).Utilities()
+    path = str(tmpdir.join('scene.xml'))
+    with open(path, 'w') as f:
+        f.write(xmlDocument(satelliteId, cloudPercent=20, corner=(31.0, 110.0)))
+    scene = utils.getSceneProperties(path)
+    assert scene['date'] == '2018-01-01 00:00:00'
+    assert scene['platform'] == satelliteId
+    assert scene['cloudCover'] == '20'
+    assert scene['bbox'] == pytest.approx((110.0, 30.9, 110.1, 31.0))
+    assert sceneFilter(bbox=(110.05, 30.95, 111, 32), maxCloudCover=20).matches(scene)
+    # a missing corner leaves the box unknown, missing values are None
+    with open(path, 'w') as f:
+        f.write('\n'.join(line for line in xmlDocument(satelliteId).split('\n')
+                          if 'TopLeftLatitude' not in line and 'CenterTime' not in line and
+                          'CloudPercent' not in line))
+    scene = utils.getSceneProperties(path)
+    assert scene == {'date': None, 'platform': satelliteId, 'bbox': None, 'cloudCover': None}
+    assert sceneFilter(startDate='2030-01-01', bbox=(0, 0, 1, 1), maxCloudCover=0).matches(scene)
+
+
+def test_crawler_drops_filtered_scenes(tmpdir):
+    module = loadRasterType('DataCube-Landsat')
+    root = str(tmpdir.mkdir('scenes'))
+    for (i, kind) in enumerate(('l8', 'l7', 's1', 'l8')):
+        writeDocument(os.path.join(root, 'scene{0}'.format(i), 'doc.yaml'),
+                      landsatDocument(kind, id='scene{0}'.format(i)))
+    crawler = module.LandsatDataCubeCrawler(
+        paths=[root], recurse=True, filter=None, platforms='landsat_8')
+    paths = set()
+    uri = crawler.getNextUri()
+    while (uri is not None):
+        paths.add(os.path.basename(os.path.dirname(uri['path'])))
+        uri = crawler.getNextUri()
+    assert paths == set(['scene0', 'scene3'])
+    assert crawler.sceneFilter.dropped == 2
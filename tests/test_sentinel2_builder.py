@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from conftest import BUILD_CASES, buildPaths, loadGolden, loadRasterType, sentinel2Document
+
+# the goldens were built by the builder that resolved all the bands of a\
+# scene for every tag, before commit 4343862. They are compared as a whole\
+# with the items of every tag in test_build_plans.py.
+
+
+@pytest.mark.parametrize('tag', BUILD_CASES['Geoscience-Sentinel2'][3])
+def test_only_the_bands_of_the_tag_are_resolved(tag):
+    # a document holding only the bands of one tag builds that tag alone
+    module = loadRasterType('Geoscience-Sentinel2')
+    golden = loadGolden('Geoscience-Sentinel2')
+    doc = sentinel2Document()
+    names = set(module.sentinelBands[band][0] for band in module.tagBands[tag])
+    doc['image']['bands'] = dict((name, band) for (name, band) in doc['image']['bands'].items()
+                                 if name in names)
+    builder = module.GeoscienceSentinelBuilder()
+    for path in buildPaths('s2', 'ARD-METADATA.yaml'):
+        module.rasterTypeUtils.documentCache.put(path, doc)
+        key = '{0}|{1}'.format(path, tag)
+        assert json.loads(json.dumps(builder.build({'path': path, 'tag': tag}))) == golden[key]
+        for other in module.tagBands:
+            if (not names.issuperset(module.sentinelBands[band][0] for band in module.tagBands[other])):
+                with pytest.raises(KeyError):
+                    builder.build({'path': path, 'tag': other})
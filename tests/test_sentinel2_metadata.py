@@ -0,0 +1,32 @@
+import os
+
+from conftest import loadRasterType, sentinel2Document, writeDocument
+
+
+def writeScenes(root, cloudCovers):
+    for (i, cloudCover) in enumerate(cloudCovers):
+        doc = sentinel2Document(id='scene{0}'.format(i))
+        # the cloud cover of the ARD product rather than of its level 1 source
+        doc['image']['cloud_cover_percentage'] = cloudCover
+        del doc['lineage']['source_datasets']['level1']['image']['cloud_cover_percentage']
+        writeDocument(os.path.join(root, 'scene{0}'.format(i), 'L2_ARD-METADATA.yaml'), doc)
+
+
+def test_documents_are_read_whole(tmpdir):
+    module = loadRasterType('Geoscience-Sentinel2')
+    doc = sentinel2Document()
+    doc['lineage']['source_datasets']['level1']['lineage'] = {'source_datasets': {'l0': {'id': 'y'}}}
+    doc['software_versions'] = {'wagl': {'version': '5'}}
+    path = writeDocument(str(tmpdir.join('L2_ARD-METADATA.yaml')), doc)
+    assert module.Utilities().readDocument(path) == doc
+
+
+def test_max_cloud_cover_filters_scenes(tmpdir):
+    module = loadRasterType('Geoscience-Sentinel2')
+    writeScenes(str(tmpdir), [1.2, 80.0, 49.5])
+    crawler = module.GeoscienceSentinelCrawler(
+        paths=[str(tmpdir)], recurse=True, filter=None, maxCloudCover=50)
+    paths = set(uri['path'] for uri in iter(crawler.getNextUri, None))
+    assert sorted(os.path.basename(os.path.dirname(path)) for path in paths) == ['scene0', 'scene2']
+    assert crawler.utils.getSceneProperties(
+        os.path.join(str(tmpdir), 'scene1', 'L2_ARD-METADATA.yaml'))['cloudCover'] == 80.0
@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from conftest import RASTER_TYPES, buildDocument, loadRasterType, writeDocument
+
+CRAWLERS = {
+    'DataCube-Landsat': 'LandsatDataCubeCrawler',
+    'DataCube-Sentinel': 'SentinelDataCubeCrawler',
+    'GeoScience-Landsat': 'GeoscienceCrawler',
+    'Geoscience-Sentinel2': 'GeoscienceSentinelCrawler',
+    'Geoscience': 'GeoscienceCrawler',
+    'SuperView-1': 'SuperView1Crawler',
+    'Triplesat': 'TripleSatCrawler',
+}
+
+
+def newCrawler(module, name, root, **properties):
+    return getattr(module, CRAWLERS[name])(
+        paths=[root], recurse=True, filter='*.yaml', **properties)
+
+
+def crawl(crawler):
+    uris = []
+    uri = crawler.getNextUri()
+    while (uri is not None):
+        uris.append((uri['path'], uri['tag']))
+        uri = crawler.getNextUri()
+    return uris
+
+
+@pytest.mark.parametrize('name', sorted(RASTER_TYPES))
+@pytest.mark.parametrize('shardCount', (2, 3, 7))
+def test_shards_are_disjoint_and_cover_every_path(name, shardCount, tmpdir):
+    module = loadRasterType(name)
+    paths = ['s3://bucket/scenes/{0}/doc{0}.yaml'.format(i) for i in range(500)]
+    shards = [list(newCrawler(module, name, str(tmpdir), shardIndex=index,
+                              shardCount=shardCount).selectShard(iter(paths)))
+              for index in range(shardCount)]
+    assert sorted(path for shard in shards for path in shard) == sorted(paths)
+    assert all(shard for shard in shards)
+    # a path is kept by the shard that getShard names
+    crawler = newCrawler(module, name, str(tmpdir), shardIndex=0, shardCount=shardCount)
+    for (index, shard) in enumerate(shards):
+        assert all(crawler.getShard(path) == index for path in shard)
+
+
+@pytest.mark.parametrize('name', ('DataCube-Landsat', 'Geoscience-Sentinel2'))
+def test_all_tags_of_a_scene_land_on_one_shard(name, tmpdir):
+    module = loadRasterType(name)
+    root = str(tmpdir.mkdir('scenes'))
+    kind = 's2' if name == 'Geoscience-Sentinel2' else 'l8'
+    for i in range(12):
+        doc = buildDocument(kind)
+        doc['id'] = 'scene{0}'.format(i)
+        writeDocument(os.path.join(root, 'scene{0}'.format(i), 'doc.yaml'), doc)
+    expected = crawl(newCrawler(module, name, root))
+    shards = [crawl(newCrawler(module, name, root, shardIndex=index, shardCount=3))
+              for index in range(3)]
+    assert sorted(uri for shard in shards for uri in shard) == sorted(expected)
+    tagsPerScene = len(expected) // 12
+    assert tagsPerScene > 1
+    scenes = [set(path for (path, tag) in shard) for shard in shards]
+    for (shard, paths) in zip(shards, scenes):
+        assert len(shard) == len(paths) * tagsPerScene
+    assert sum(len(paths) for paths in scenes) == 12
+
+
+@pytest.mark.parametrize('name', ('SuperView-1', 'Triplesat'))
+def test_pan_and_mux_files_of_a_scene_share_a_shard(name, tmpdir):
+    module = loadRasterType(name)
+    crawler = newCrawler(module, name, str(tmpdir), shardIndex=0, shardCount=5)
+    shards = set()
+    for i in range(50):
+        scene = '/data/{0}/scene{1}/scene{1}_'.format(name, i)
+        assert crawler.getShard(scene + 'PAN.xml') == crawler.getShard(scene + 'MUX.xml')
+        shards.add(crawler.getShard(scene + 'MUX.xml'))
+    assert len(shards) == 5
+    # the pair is selected by one shard and by none of the others
+    pair = ['/data/scene/scene_PAN.xml', '/data/scene/scene_MUX.xml']
+    selected = [list(newCrawler(module, name, str(tmpdir), shardIndex=index, shardCount=5)
+                     .selectShard(iter(pair))) for index in range(5)]
+    assert sorted(len(paths) for paths in selected) == [0, 0, 0, 0, 2]
+
+
+@pytest.mark.parametrize('name', sorted(RASTER_TYPES))
+@pytest.mark.parametrize('shard', ((3, 3), (-1, 3), (0, 0), (1, -2)))
+def test_invalid_shard_index_or_count(name, shard, tmpdir):
+    module = loadRasterType(name)
+    (shardIndex, shardCount) = shard
+    with pytest.raises(Exception, match='Invalid shard index or count'):
+        newCrawler(module, name, str(tmpdir), shardIndex=shardIndex, shardCount=shardCount)
@@ -23,10 +23,14 @@
 # ------------------------------------------------------------------------------
 
 import os
+import sys
 import arcpy
 import glob
 import csv
+import hashlib
+import time
 import requests
+from collections import OrderedDict
 
 try:
     import yaml
@@ -34,6 +38,24 @@ try:
 except ImportError as e:
     raise
 
+# the crawler and builder infrastructure shared by the raster types lives\
+# in rasterTypeUtils.py, deployed next to the raster type or found in the\
+# types/common folder of the repository
+commonPath = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'common')
+if (os.path.isdir(commonPath) and commonPath not in sys.path):
+    sys.path.append(commonPath)
+from rasterTypeUtils import (
+    BaseUtilities, BuildPlan, BuiltItem, BulkMetadataFetcher, CrawlCheckpoint,
+    Deduplicator, DirectoryWalker, ListingCache, MRFTemplate, ManifestReader,
+    MetadataPrefetcher, SceneFilter, httpTransport, projectionService,
+    s3ClientPool)
+
+
+# tag of the single URI the crawler emits per scene when the builder is asked
+# to build every applicable product of the scene in one call
+SCENE_TAG = "DataCube_Scene"
+
 
 class DataSourceType():
     File = 1
@@ -235,40 +257,39 @@ class RasterTypeFactory():
         ]
 
 # ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
-# Utility functions used by the Builder and Crawler classes
+# Precompiled MRF templates for the Builder class
 # ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
 
 
-class Utilities():
+# embedded MRF of the bands of a scene, compiled for the Landsat profile
+landsatMRF = MRFTemplate.compile(
+    '<MRF_META>\n'
+    '  <CachedSource>\n'
+    '    <Source>/{protocol}{inputDir}/{fileName}</Source>\n'
+    '  </CachedSource>\n'
+    '  <Raster>\n'
+    '    <Size c="1" x="{cols}" y="{rows}"/>\n'
+    '    <PageSize c="1" x="512" y="512"/>\n'
+    '    <Compression>LERC</Compression>\n'
+    '    <DataType>{dataType}</DataType>\n'
+    '   <DataValues NoData="{noData}" />\n'
+    '  <DataFile>z:/mrfcache/{cachePath}/{stem}.mrf_cache</DataFile><IndexFile>z:/mrfcache/{cachePath}/{stem}.mrf_cache</IndexFile></Raster>\n'
+    '  <Rsets model="uniform" scale="2"/>\n'
+    '  <GeoTags>\n'
+    '    <BoundingBox maxx="{maxX}" maxy="{maxY}" minx="{minX}" miny="{minY}"/>\n'
+    '    <Projection>{projection}</Projection>\n'
+    '  </GeoTags>\n'
+    '  <Options>V2=ON</Options>\n'
+    '</MRF_META>\n').profile(
+    cols=3500, rows=3500, dataType='Int16', noData=-9999)
 
-    def readYaml(self, path):  # to read the yaml file located locally.
-        try:
-            with open(path, 'r') as q:
-                try:
-                    doc = (yaml.load(q))
-                except yaml.YAMLError as exc:
-                    raise
-                return doc
-        except BaseException:
-            raise
 
-    def readYamlS3(self, path):  # to read the yaml file located on S3
-        page = requests.get(path, stream=True, timeout=None)
-        try:
-            doc = (yaml.load(page.content))
-        except yaml.YAMLError as exc:
-            raise
-        return doc
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Utility functions used by the Builder and Crawler classes
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
 
-    def readYamlS3_boto3(self, bucket, path):  # to read the yaml file located on S3
-        client = boto3.client('s3')
-        try:
-            page = client.get_object(
-                Bucket=bucket, Key=path, RequestPayer='requester')
-            doc = (yaml.load(page['Body'].read()))
-        except yaml.YAMLError as exc:
-            raise
-        return doc
+
+class Utilities(BaseUtilities):
 
     def getProductName(self, doc):
         try:
@@ -289,6 +310,39 @@ class Utilities():
         return None
 
 
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Compiled build plans for the Builder class
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+# document bands of the raster function arguments, Landsat 8 names are\
+# tried before the Landsat 7 names of the same slot
+landsatSources = (
+    ('blue',), ('green',), ('red',), ('nir',), ('swir1',), ('swir2',),
+    ('aerosol_qa', 'atmos_opacity'), ('coastal_aerosol', 'cloud_qa'),
+    ('pixel_qa',), ('radsat_qa',))
+
+buildPlans = {
+    'DataCube_L8_MS': BuildPlan(
+        "DataCube_MS_Composite.rft.xml",
+        ['blue', 'green', 'red', 'nir', 'swir1', 'swir2'],
+        6, 3500, landsatSources[:6]),
+    'DataCube_L8_MS_QA': BuildPlan(
+        "DataCube_MS_QA_Composite.rft.xml",
+        ['blue', 'green', 'red', 'nir', 'swir1', 'swir2',
+         'aerosol_qa', 'coastal_aerosol', 'pixel_qa', 'radsat_qa'],
+        6, 3500, landsatSources),
+    'DataCube_L7_MS': BuildPlan(
+        "DataCube_MS_Composite.rft.xml",
+        ['blue', 'green', 'red', 'nir', 'swir1', 'swir2'],
+        6, 3500, landsatSources[:6]),
+    'DataCube_L7_MS_QA': BuildPlan(
+        "DataCube_MS_QA_Composite.rft.xml",
+        ['blue', 'green', 'red', 'nir', 'swir1', 'swir2',
+         'atmos_opacity', 'cloud_qa', 'pixel_qa', 'radsat_qa'],
+        6, 3500, landsatSources)}
+
+
 # ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
 # LandsatDataCube builder class
 # ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
@@ -301,45 +355,14 @@ class LandsatDataCubeBuilder():
     def canOpen(self, datasetPath):
         return True
 
-    def embedMRF(
-            self,
-            inputDir,
-            fileName,
-            maxX,
-            maxY,
-            minX,
-            minY,
-            prjString,
-            protocol,
-            cachePath):
-
-        try:
-            # create template
-            cachingMRF = \
-                '<MRF_META>\n'  \
-                '  <CachedSource>\n'  \
-                '    <Source>/{8}{0}/{1}</Source>\n'  \
-                '  </CachedSource>\n'  \
-                '  <Raster>\n'  \
-                '    <Size c="1" x="3500" y="3500"/>\n'  \
-                '    <PageSize c="1" x="512" y="512"/>\n'  \
-                '    <Compression>LERC</Compression>\n'  \
-                '    <DataType>Int16</DataType>\n'  \
-                '   <DataValues NoData="-9999" />\n' \
-                '  <DataFile>z:/mrfcache/{9}/{7}.mrf_cache</DataFile><IndexFile>z:/mrfcache/{9}/{7}.mrf_cache</IndexFile></Raster>\n'  \
-                '  <Rsets model="uniform" scale="2"/>\n'  \
-                '  <GeoTags>\n'  \
-                '    <BoundingBox maxx="{2}" maxy="{3}" minx="{4}" miny="{5}"/>\n'  \
-                '    <Projection>{6}</Projection>\n'  \
-                '  </GeoTags>\n'  \
-                '  <Options>V2=ON</Options>\n'  \
-                '</MRF_META>\n'.format(inputDir, fileName, maxX, maxY, minX, minY, prjString, fileName[0:-4], protocol, cachePath)
-
-        except Exception as exp:
-#            log.Message(str(exp), log.const_critical_text)
-            raise Exception(str(exp))
-
-        return cachingMRF
+    # tags that apply to a scene, taken from the platform in the document and\
+    # from the bands it carries when the platform is not recognised
+    def getSceneTags(self, doc):
+        platform = str(doc.get('platform', {}).get('code', '')).upper()
+        bands = doc['image']['bands']
+        if (platform.endswith('8') or (not platform.endswith('7') and 'aerosol_qa' in bands)):
+            return ["DataCube_L8_MS", "DataCube_L8_MS_QA"]
+        return ["DataCube_L7_MS", "DataCube_L7_MS_QA"]
 
     def build(self, itemURI):
      # Make sure that the itemURI dictionary contains items
@@ -354,354 +377,42 @@ class LandsatDataCubeBuilder():
             else:
                 return None
 
-            # for each band in the image generate the path
-            NRT01 = NRT02 = NRT03 = NRT04 = NRT05 = NRT06 = NRT07 = NRT08 = NRT09 = NRT10 = ""
-            yamldir = os.path.dirname(_yamlpath)
+            doc = self.utils.readDocument(_yamlpath)
+            if (
+                    doc is None or 'image' not in doc or 'bands' not in doc['image']):
+                raise Exception('Err. Invalid input format!')
+#                return None
 
-            if (_yamlpath.startswith("http:")):
-                doc = self.utils.readYamlS3(_yamlpath)
-                if (
-                        doc is None or 'image' not in doc or 'bands' not in doc['image']):
-                    raise Exception('Err. Invalid input format!')
-#                    return None
+            refPoints = doc['grid_spatial']['projection']['geo_ref_points']
+            maxX = refPoints['lr']['x']
+            maxY = refPoints['ur']['y']
+            minX = refPoints['ll']['x']
+            minY = refPoints['ll']['y']
 
+            yamldir = os.path.dirname(_yamlpath)
+            protocol = None
+            if (_yamlpath.startswith("http:")):
                 lastIdx = _yamlpath.rfind('/')
-# startIdx= _yamlpath.find('.com')+5  #plus 5 to get the index of the
-# character after .com/
                 inputDir = _yamlpath[7:lastIdx]  # along with the bucket name
-
-                refPoints = doc['grid_spatial']['projection']['geo_ref_points']
-                maxX = refPoints['lr']['x']
-                maxY = refPoints['ur']['y']
-                minX = refPoints['ll']['x']
-                minY = refPoints['ll']['y']
-
-                spatialRef = doc['grid_spatial']['projection']['spatial_reference']
-                spatialIdx = spatialRef.find(':')
-                spatialId = int(spatialRef[spatialIdx + 1:])
-                prjString = arcpy.SpatialReference(spatialId).exportToString()
                 protocol = 'vsicurl/http://'
                 cachePath = _yamlpath.split(
                     "//")[1][0:_yamlpath.split("//")[1].rfind("/")].replace(".s3.amazonaws.com", "")
-
-                NRT01 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['blue']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
-                NRT02 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['green']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
-                NRT03 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['red']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
-                NRT04 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nir']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
-                NRT05 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['swir1']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
-                NRT06 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['swir2']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
-                try:
-                    NRT07 = self.embedMRF(
-                        inputDir,
-                        (doc['image']['bands']['aerosol_qa']['path']),
-                        maxX,
-                        maxY,
-                        minX,
-                        minY,
-                        prjString,
-                        protocol,
-                        cachePath)  # LS8
-                except BaseException:
-                    NRT07 = self.embedMRF(
-                        inputDir,
-                        (doc['image']['bands']['atmos_opacity']['path']),
-                        maxX,
-                        maxY,
-                        minX,
-                        minY,
-                        prjString,
-                        protocol,
-                        cachePath)  # LS7
-                try:
-                    NRT08 = self.embedMRF(
-                        inputDir,
-                        (doc['image']['bands']['coastal_aerosol']['path']),
-                        maxX,
-                        maxY,
-                        minX,
-                        minY,
-                        prjString,
-                        protocol,
-                        cachePath)  # LS8
-                except BaseException:
-                    NRT08 = self.embedMRF(
-                        inputDir,
-                        (doc['image']['bands']['cloud_qa']['path']),
-                        maxX,
-                        maxY,
-                        minX,
-                        minY,
-                        prjString,
-                        protocol,
-                        cachePath)  # LS7
-                NRT09 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['pixel_qa']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
-                NRT10 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['radsat_qa']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
             elif (_yamlpath.startswith("s3:")):
-                # giving a start index of 5 will ensure that the / from s3://
-                # is not returned.
-                index = _yamlpath.find("/", 5)
-                # First 5 letters will always be s3://
-                bucketname = _yamlpath[5:index]
-                key = _yamlpath[index + 1:]
-                doc = self.utils.readYamlS3_boto3(bucketname, key)
-                if (
-                        doc is None or 'image' not in doc or 'bands' not in doc['image']):
-                    raise Exception('Err. Invalid input format!')
-#                    return None
                 lastIdx = _yamlpath.rfind('/')
                 inputDir = _yamlpath[5:lastIdx]  # along with the bucket name
-
-                refPoints = doc['grid_spatial']['projection']['geo_ref_points']
-                maxX = refPoints['lr']['x']
-                maxY = refPoints['ur']['y']
-                minX = refPoints['ll']['x']
-                minY = refPoints['ll']['y']
-
-                spatialRef = doc['grid_spatial']['projection']['spatial_reference']
-                spatialIdx = spatialRef.find(':')
-                spatialId = int(spatialRef[spatialIdx + 1:])
-                prjString = arcpy.SpatialReference(spatialId).exportToString()
                 protocol = 'vsis3/'
                 cachePath = _yamlpath.split(
                     "//")[1][0:_yamlpath.split("//")[1].rfind("/")]
-
-                NRT01 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['blue']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
-                NRT02 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['green']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
-                NRT03 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['red']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
-                NRT04 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nir']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
-                NRT05 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['swir1']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
-                NRT06 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['swir2']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
-                try:
-                    NRT07 = self.embedMRF(
-                        inputDir,
-                        (doc['image']['bands']['aerosol_qa']['path']),
-                        maxX,
-                        maxY,
-                        minX,
-                        minY,
-                        prjString,
-                        protocol,
-                        cachePath)  # LS8
-                except BaseException:
-                    NRT07 = self.embedMRF(
-                        inputDir,
-                        (doc['image']['bands']['atmos_opacity']['path']),
-                        maxX,
-                        maxY,
-                        minX,
-                        minY,
-                        prjString,
-                        protocol,
-                        cachePath)  # LS7
-                try:
-                    NRT08 = self.embedMRF(
-                        inputDir,
-                        (doc['image']['bands']['coastal_aerosol']['path']),
-                        maxX,
-                        maxY,
-                        minX,
-                        minY,
-                        prjString,
-                        protocol,
-                        cachePath)  # LS8
-                except BaseException:
-                    NRT08 = self.embedMRF(
-                        inputDir,
-                        (doc['image']['bands']['cloud_qa']['path']),
-                        maxX,
-                        maxY,
-                        minX,
-                        minY,
-                        prjString,
-                        protocol,
-                        cachePath)  # LS7
-                NRT09 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['pixel_qa']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
-                NRT10 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['radsat_qa']['path']),
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol,
-                    cachePath)
-            else:
-                doc = self.utils.readYaml(_yamlpath)
-                if (
-                        doc is None or 'image' not in doc or 'bands' not in doc['image']):
-                    raise Exception('Err. Invalid input format!')
-#                    return None
-
-                refPoints = doc['grid_spatial']['projection']['geo_ref_points']
-                maxX = refPoints['lr']['x']
-                maxY = refPoints['ur']['y']
-                minX = refPoints['ll']['x']
-                minY = refPoints['ll']['y']
-
-                NRT01 = os.path.join(
-                    yamldir, (doc['image']['bands']['blue']['path']))
-                NRT02 = os.path.join(
-                    yamldir, (doc['image']['bands']['green']['path']))
-                NRT03 = os.path.join(
-                    yamldir, (doc['image']['bands']['red']['path']))
-                NRT04 = os.path.join(
-                    yamldir, (doc['image']['bands']['nir']['path']))
-                NRT05 = os.path.join(
-                    yamldir, (doc['image']['bands']['swir1']['path']))
-                NRT06 = os.path.join(
-                    yamldir, (doc['image']['bands']['swir2']['path']))
-                try:
-                    NRT07 = os.path.join(
-                        yamldir, (doc['image']['bands']['aerosol_qa']['path']))  # LS8
-                except BaseException:
-                    NRT07 = os.path.join(
-                        yamldir, (doc['image']['bands']['atmos_opacity']['path']))  # LS7
-                try:
-                    NRT08 = os.path.join(
-                        yamldir, (doc['image']['bands']['coastal_aerosol']['path']))  # LS8
-                except BaseException:
-                    NRT08 = os.path.join(
-                        yamldir, (doc['image']['bands']['cloud_qa']['path']))  # LS7
-                NRT09 = os.path.join(
-                    yamldir, (doc['image']['bands']['pixel_qa']['path']))
-                NRT10 = os.path.join(
-                    yamldir, (doc['image']['bands']['radsat_qa']['path']))
+            bands = doc['image']['bands']
+            if (protocol is not None):
+                spatialRef = doc['grid_spatial']['projection']['spatial_reference']
+                spatialIdx = spatialRef.find(':')
+                spatialId = int(spatialRef[spatialIdx + 1:])
+                prjString = projectionService.exportToString(spatialId)
+                sceneMRF = landsatMRF.bind(
+                    protocol=protocol, inputDir=inputDir, cachePath=cachePath,
+                    maxX=maxX, maxY=maxY, minX=minX, minY=minY,
+                    projection=prjString)
 
             # Metadata Information
             metadata = {}
@@ -735,353 +446,47 @@ class LandsatDataCubeBuilder():
 # DEFINE A DICTIONARY OF VARIABLES
             variables = {}
 
-# Depending upon the tag name in the itemURI pass the appropriate
-# bandProperties dictionary and RFT
-            builtItem = {}
-            if (itemURI['tag'] == "DataCube_L8_MS" or itemURI['tag']
-                    == "DataCube_L7_MS"):
-                # NBART
-                bandProperties = [{'bandName': 'blue'},
-                                  {'bandName': 'green'},
-                                  {'bandName': 'red'},
-                                  {'bandName': 'nir'},
-                                  {'bandName': 'swir1'},
-                                  {'bandName': 'swir2'}]
-
-                builtItem['raster'] = {
-                    'functionDataset': {
-                        'rasterFunction': "DataCube_MS_Composite.rft.xml",
-                        'rasterFunctionArguments': {
-                            'Raster1': NRT01,
-                            'Raster1_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster2': NRT02,
-                            'Raster2_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster3': NRT03,
-                            'Raster3_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster4': NRT04,
-                            'Raster4_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster5': NRT05,
-                            'Raster5_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster6': NRT06,
-                            'Raster6_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY}}}}
-
-            elif (itemURI['tag'] == "DataCube_L8_MS_QA"):
-                bandProperties = [{'bandName': 'blue'},
-                                  {'bandName': 'green'},
-                                  {'bandName': 'red'},
-                                  {'bandName': 'nir'},
-                                  {'bandName': 'swir1'},
-                                  {'bandName': 'swir2'},
-                                  {'bandName': 'aerosol_qa'},
-                                  {'bandName': 'coastal_aerosol'},
-                                  {'bandName': 'pixel_qa'},
-                                  {'bandName': 'radsat_qa'}]
-
-                builtItem['raster'] = {
-                    'functionDataset': {
-                        'rasterFunction': "DataCube_MS_QA_Composite.rft.xml",
-                        'rasterFunctionArguments': {
-                            'Raster1': NRT01,
-                            'Raster1_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster2': NRT02,
-                            'Raster2_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster3': NRT03,
-                            'Raster3_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster4': NRT04,
-                            'Raster4_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster5': NRT05,
-                            'Raster5_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster6': NRT06,
-                            'Raster6_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster7': NRT07,
-                            'Raster7_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster8': NRT08,
-                            'Raster8_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster9': NRT09,
-                            'Raster9_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster10': NRT10,
-                            'Raster10_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY}}}}
-
-            elif (itemURI['tag'] == "DataCube_L7_MS_QA"):
-                bandProperties = [{'bandName': 'blue'},
-                                  {'bandName': 'green'},
-                                  {'bandName': 'red'},
-                                  {'bandName': 'nir'},
-                                  {'bandName': 'swir1'},
-                                  {'bandName': 'swir2'},
-                                  {'bandName': 'atmos_opacity'},
-                                  {'bandName': 'cloud_qa'},
-                                  {'bandName': 'pixel_qa'},
-                                  {'bandName': 'radsat_qa'}]
-                builtItem['raster'] = {
-                    'functionDataset': {
-                        'rasterFunction': "DataCube_MS_QA_Composite.rft.xml",
-                        'rasterFunctionArguments': {
-                            'Raster1': NRT01,
-                            'Raster1_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster2': NRT02,
-                            'Raster2_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster3': NRT03,
-                            'Raster3_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster4': NRT04,
-                            'Raster4_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster5': NRT05,
-                            'Raster5_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster6': NRT06,
-                            'Raster6_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster7': NRT07,
-                            'Raster7_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster8': NRT08,
-                            'Raster8_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster9': NRT09,
-                            'Raster9_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster10': NRT10,
-                            'Raster10_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 3500,
-                                'nRows': 3500,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY}}}}
-
-# Assemble everything into an outgoing dictionary
+            # a scene URI from the crawler is built into all the items that\
+            # apply to the platform of the document in one pass
+            tags = [itemURI['tag']]
+            if (itemURI['tag'] == SCENE_TAG):
+                tags = self.getSceneTags(doc)
+
+            builtItems = []
             cordsList = doc['grid_spatial']['projection']['valid_data']['coordinates']
-            metadata['bandProperties'] = bandProperties
-            builtItem['spatialReference'] = srsWKT
-            builtItem['variables'] = variables
-            builtItem['itemUri'] = itemURI
-            builtItem['keyProperties'] = metadata
-            builtItem['footprint'] = cordsList[0]
-            builtItemsList = list()
-            builtItemsList.append(builtItem)
+            bandPaths = {}  # resolved once for all the tags of the scene
+            for tag in tags:
+# Depending upon the tag name in the itemURI fill the build plan with the
+# appropriate bandProperties and RFT
+                plan = buildPlans.get(tag)
+                if (plan is None):
+                    raise Exception('Err. Unsupported tag {0}!'.format(tag))
+                rasters = []
+                for sources in plan.sources:
+                    raster = bandPaths.get(sources)
+                    if (raster is None):
+                        source = sources[0]
+                        if (len(sources) > 1 and source not in bands):
+                            source = sources[1]  # named differently by this platform
+                        bandPath = bands[source]['path']
+                        if (protocol is None):
+                            raster = os.path.join(yamldir, bandPath)
+                        else:
+                            raster = self.utils.referenceMRF(
+                                sceneMRF.format(fileName=bandPath, stem=bandPath[0:-4]))
+                        bandPaths[sources] = raster
+                    rasters.append(raster)
+                itemUri = itemURI
+                if (tag != itemURI['tag']):
+                    itemUri = dict(itemURI, tag=tag)
+                builtItems.append(BuiltItem(
+                    itemUri, srsWKT, dict(metadata), cordsList[0],
+                    raster=plan.instantiate(rasters, srsWKT, minX, minY, maxX, maxY),
+                    bandProperties=plan.bandProperties, variables=variables))
+
+# Assemble everything into outgoing dictionaries
+            builtItemsList = [builtItem.toDict() for builtItem in builtItems]
+            self.utils.recordBuild(itemURI)
             return builtItemsList
         except Exception as e:
             raise
@@ -1106,8 +511,80 @@ class LandsatDataCubeCrawler():
             return None
         if (self.filter is (None or "")):
             self.filter = '*.yaml'
+        if (crawlerProperties.get('metadataCachePath')):
+            self.utils.configureMetadataCache(
+                crawlerProperties['metadataCachePath'],
+                crawlerProperties.get('metadataCacheSizeMB', 512))
+        if (crawlerProperties.get('mrfSidecarPath')):
+            self.utils.configureMRFSidecars(crawlerProperties['mrfSidecarPath'])
+        s3ClientPool.configure(
+            crawlerProperties.get('s3MaxPoolConnections'),
+            crawlerProperties.get('s3RetryMode'),
+            crawlerProperties.get('s3MaxAttempts'))
+        httpTransport.configure(
+            crawlerProperties.get('httpPoolSize'),
+            crawlerProperties.get('httpConnectTimeout'),
+            crawlerProperties.get('httpReadTimeout'),
+            crawlerProperties.get('httpMaxRetries'),
+            crawlerProperties.get('httpBackoffFactor'))
+        self.prefetcher = MetadataPrefetcher(
+            self.utils,
+            crawlerProperties.get('prefetchDepth', 0),
+            crawlerProperties.get('prefetchWorkers', 4))
+        self.bulkFetcher = BulkMetadataFetcher(
+            self.utils,
+            crawlerProperties.get('bulkFetch', False),
+            crawlerProperties.get('bulkFetchPerHost', 8),
+            crawlerProperties.get('bulkFetchBatchSize', 256))
+        self.singleUriPerScene = crawlerProperties.get('singleUriPerScene', False)
+        self.walker = DirectoryWalker(
+            self.filter,
+            crawlerProperties.get('walkWorkers', 8),
+            crawlerProperties.get('walkQueueSize', 1024))
+        self.crawlState = None
+        if (crawlerProperties.get('crawlStatePath')):
+            self.crawlState = self.utils.configureCrawlState(
+                crawlerProperties['crawlStatePath'],
+                crawlerProperties.get('crawlStateReportPath'))
+        self.manifestReader = ManifestReader(
+            crawlerProperties.get('manifestDocuments', True))
+        self.shardIndex = int(crawlerProperties.get('shardIndex', 0))
+        self.shardCount = int(crawlerProperties.get('shardCount', 1))
+        if (self.shardCount < 1 or not 0 <= self.shardIndex < self.shardCount):
+            raise Exception('Err. Invalid shard index or count!')
+        self.checkpoint = None
+        if (crawlerProperties.get('checkpointPath')):
+            self.checkpoint = CrawlCheckpoint(
+                crawlerProperties['checkpointPath'],
+                self.paths,
+                crawlerProperties.get('resume', False),
+                crawlerProperties.get('checkpointInterval', 0))
+            self.walker.walkWorkers = 1  # positions need a repeatable walk order
+        self.sceneFilter = SceneFilter(
+            crawlerProperties.get('startDate'),
+            crawlerProperties.get('endDate'),
+            crawlerProperties.get('bbox'),
+            crawlerProperties.get('maxCloudCover'),
+            crawlerProperties.get('platforms'))
+        self.deduplicator = None
+        if (crawlerProperties.get('deduplicate', False)):
+            self.deduplicator = Deduplicator(
+                crawlerProperties.get('dedupExactLimit'),
+                crawlerProperties.get('dedupBloomCapacity', 10000000),
+                crawlerProperties.get('dedupFalsePositiveRate', 0.0001))
+            if (self.checkpoint is not None):
+                self.checkpoint.attach(self.deduplicator)
+        self.listingCache = ListingCache(
+            crawlerProperties.get('listDirectories', False),
+            crawlerProperties.get('listingCacheSize', 4096),
+            crawlerProperties.get('listingBatchSize', 10000),
+            crawlerProperties.get('walkWorkers', 8))
+        # uris skipped by getNextUri, counted per reason
+        reasons = ('checkpoint',)
+        self.skipped = OrderedDict((reason, 0) for reason in reasons)
+        self.skipSeconds = OrderedDict((reason, 0.0) for reason in reasons)
         try:
-            self.pathGenerator = self.createGenerator()
+            self.pathGenerator = self.createPathGenerator()
         except StopIteration:
             return None
 
@@ -1117,6 +594,9 @@ class LandsatDataCubeCrawler():
             return None
 
     def createTagGenerator(self):
+        if (self.singleUriPerScene):
+            yield SCENE_TAG
+            return
         for tag in [
             "DataCube_L8_MS",
             "DataCube_L8_MS_QA",
@@ -1124,9 +604,73 @@ class LandsatDataCubeCrawler():
                 "DataCube_L7_MS_QA"]:  # Landsat8 and Landsat7
             yield tag
 
+    def createPathGenerator(self):
+        # chains the path generator with the optional crawl stages
+        paths = self.createGenerator()
+        if (self.checkpoint is not None):
+            paths = self.checkpoint.track(paths)
+        if (self.deduplicator is not None):
+            paths = self.deduplicator.select(paths, self.deduplicator.normalizePath, 'path')
+        paths = self.prefetcher.prefetch(
+            self.skipUnchanged(self.selectShard(paths)))
+        paths = self.sceneFilter.select(paths, self.utils.getSceneProperties)
+        if (self.deduplicator is not None):
+            paths = self.deduplicator.select(paths, self.utils.getSceneId, 'id')
+        if (self.checkpoint is not None):
+            paths = self.checkpoint.follow(paths)
+        return paths
+
+    def iterInputs(self):
+        if (self.checkpoint is None):
+            return iter(self.paths)
+        return self.checkpoint.iterInputs(self.paths)
+
+    def getCrawlScope(self):
+        # the inputs whose scenes are compared between crawls
+        scope = ';'.join(self.paths)
+        if (self.shardCount > 1):
+            scope += '#{0}/{1}'.format(self.shardIndex, self.shardCount)
+        return scope
+
+    def selectShard(self, paths):
+        # keeps the paths of this crawler's shard. Shards are chosen by a\
+        # stable hash of the scene path, so workers given the same input and\
+        # shardCount ingest disjoint subsets without coordination, and all\
+        # tags of a scene stay on the shard of its path.
+        if (self.shardCount <= 1):
+            return paths
+        return (path for path in paths if self.getShard(path) == self.shardIndex)
+
+    def getShard(self, path):
+        key = path
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        return int(digest, 16) % self.shardCount
+
+    def skipUnchanged(self, paths):
+        # with a crawl state store, only new or changed scenes are yielded
+        if (self.crawlState is None):
+            return paths
+        return self.crawlState.skipUnchanged(
+            paths, self.getCrawlScope(), list(self.createTagGenerator()), self.utils.statScene,
+            self.checkpoint.runId if self.checkpoint is not None else None)
+
+    def countSkip(self, reason, started):
+        self.skipped[reason] += 1
+        self.skipSeconds[reason] += time.time() - started
+
+    def getSkipStats(self):
+        return dict((reason, {'count': self.skipped[reason],
+                              'seconds': round(self.skipSeconds[reason], 3)})
+                    for reason in self.skipped)
+
     def createGenerator(self):
-        for path in self.paths:
-            if (path.startswith("http") or (path.startswith("s3"))):
+        for path in self.iterInputs():
+            if (path.startswith("s3") and path.endswith("/")):
+                # s3://bucket/prefix/ inputs are listed like directories
+                for filename in self.walker.walkS3(path, self.recurse):
+                    yield filename
+
+            elif (path.startswith("http") or (path.startswith("s3"))):
                 yield path
 
             elif (not os.path.exists(path)):
@@ -1134,16 +678,17 @@ class LandsatDataCubeCrawler():
 
             elif (os.path.isdir(path)):
                 if (self.recurse):
-                    for root, dirs, files in (os.walk(path)):
-                        for file in (files):
-                            if (file.endswith(".yaml")):
-                                filename = os.path.join(root, file)
-                                yield filename
+                    for filename in self.walker.walk(path):
+                        yield filename
                 else:
                     filter_to_scan = path + os.path.sep + self.filter
                     for filename in glob.glob(filter_to_scan):
                         yield filename
 
+            elif (self.manifestReader.isManifest(path)):
+                for filename in self.manifestReader.read(path):
+                    yield filename
+
             elif (path.endswith(".csv")):
                 with open(path, 'r') as csvfile:
                     reader = csv.reader(csvfile)
@@ -1158,13 +703,13 @@ class LandsatDataCubeCrawler():
                     if (rasterFieldIndex == -1):
                         csvfile.seek(0)
                         rasterFieldIndex = 0
-                    for row in reader:
-                        filename = row[rasterFieldIndex]
-                        if (filename.startswith("http")or (filename.startswith(
-                                "s3"))):  # if the csv list contains a list of s3 urls
-                            yield filename
-                        elif (filename.endswith(".yaml") and os.path.exists(filename)):
-                            yield filename
+                    rows = self.selectShard(
+                        (row[rasterFieldIndex] for row in reader))
+                    # csv lists of s3 urls are kept, local documents must exist
+                    filenames = (filename for filename in self.bulkFetcher.fetchAll(rows)
+                                 if filename.startswith(("http", "s3")) or filename.endswith(".yaml"))
+                    for filename in self.listingCache.select(filenames):
+                        yield filename
             elif (path.endswith(".yaml")):
                 yield path
 
@@ -1176,32 +721,39 @@ class LandsatDataCubeCrawler():
         return self.getNextUri()
 
     def getNextUri(self):
-        try:
-            if (self.run == 1):  # the path generator should kick in first (for the very first record) before the tag generator kicks in otherwise the number of URIs generated will be one less than the number of tags.
-                try:
-                    self.curPath = next(self.pathGenerator)
-                    self.run = 10
-                except BaseException:
-                    return None
+        # tags emitted before an interrupted crawl are skipped in a loop, so\
+        # a resume can pass any number of them
+        while True:
+            started = time.time()
             try:
-                curTag = next(self.tagGenerator)
-            except StopIteration:
+                if (self.run == 1):  # the path generator should kick in first (for the very first record) before the tag generator kicks in otherwise the number of URIs generated will be one less than the number of tags.
+                    try:
+                        self.curPath = next(self.pathGenerator)
+                        self.run = 10
+                    except StopIteration:
+                        return None
                 try:
-                    self.tagGenerator = self.createTagGenerator()  # reinitialize tag generator
+                    curTag = next(self.tagGenerator)
                 except StopIteration:
-                    return None
-                try:
-                    self.curPath = next(self.pathGenerator)
-                except BaseException:
-                    return None
-                curTag = next(self.tagGenerator)
-        except StopIteration:
-            return None
-        uri = {
-            'path': self.curPath,
-            'displayName': os.path.basename(self.curPath).partition(".")[0],
-            'tag': curTag,
-            'groupName': os.path.basename(self.curPath).partition(".")[0],
-            # 'productName':productName
-        }
-        return uri
+                    try:
+                        self.tagGenerator = self.createTagGenerator()  # reinitialize tag generator
+                    except StopIteration:
+                        return None
+                    try:
+                        self.curPath = next(self.pathGenerator)
+                    except StopIteration:
+                        return None
+                    curTag = next(self.tagGenerator)
+            except StopIteration:
+                return None
+            uri = {
+                'path': self.curPath,
+                'displayName': os.path.basename(self.curPath).partition(".")[0],
+                'tag': curTag,
+                'groupName': os.path.basename(self.curPath).partition(".")[0],
+                # 'productName':productName
+            }
+            if (self.checkpoint is not None and not self.checkpoint.emit(uri['tag'])):
+                self.countSkip('checkpoint', started)
+                continue  # emitted before the crawl was interrupted
+            return uri
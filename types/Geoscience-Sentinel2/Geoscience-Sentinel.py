@@ -23,10 +23,14 @@
 # ------------------------------------------------------------------------------
 
 import os
+import sys
 import arcpy
 import glob
 import csv
+import hashlib
+import time
 import requests
+from collections import OrderedDict
 
 try:
     import yaml
@@ -34,6 +38,19 @@ try:
 except ImportError as e:
     raise
 
+# the crawler and builder infrastructure shared by the raster types lives\
+# in rasterTypeUtils.py, deployed next to the raster type or found in the\
+# types/common folder of the repository
+commonPath = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'common')
+if (os.path.isdir(commonPath) and commonPath not in sys.path):
+    sys.path.append(commonPath)
+from rasterTypeUtils import (
+    BandProperty, BaseUtilities, BuiltItem, BulkMetadataFetcher,
+    CrawlCheckpoint, Deduplicator, DirectoryWalker, ListingCache, MRFTemplate,
+    ManifestReader, MetadataPrefetcher, SceneFilter, documentCache,
+    httpTransport, rasterInfoPool, s3ClientPool)
+
 
 class DataSourceType():
     File = 1
@@ -595,39 +612,51 @@ class RasterTypeFactory():
         ]
 
 # ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
-# Utility functions used by the Builder and Crawler classes
+# Yaml loader used by the Utilities class
 # ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
 
 
-class Utilities():
+# the libyaml C parser when PyYAML was built with it, which parses the ARD\
+# documents several times faster than the pure python one
+yamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
-    def readYaml(self, path):  # to read the yaml file located locally.
-        try:
-            with open(path, 'r') as q:
-                try:
-                    doc = (yaml.load(q))
-                except yaml.YAMLError as exc:
-                    raise
-                return doc
-        except BaseException:
-            raise
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Precompiled MRF templates for the Builder class
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
 
-    def readYamlS3(self, path):  # to read the yaml file located on S3
-        page = requests.get(path, stream=True, timeout=None)
-        try:
-            doc = (yaml.load(page.content))
-        except yaml.YAMLError as exc:
-            raise
-        return doc
 
-    def readYamlS3_boto3(self, bucket, path):  # to read the yaml file located on S3
-        client = boto3.client('s3')
-        try:
-            page = client.get_object(Bucket=bucket, Key=path)
-            doc = (yaml.load(page['Body'].read()))
-        except yaml.YAMLError as exc:
-            raise
-        return doc
+# embedded MRF of the bands of a scene, compiled per band profile by the builder
+sentinelMRF = MRFTemplate.compile(
+    '<MRF_META>\n'
+    '  <CachedSource>\n'
+    '    <Source>/{protocol}{inputDir}/{fileName}</Source>\n'
+    '  </CachedSource>\n'
+    '  <Raster>\n'
+    '    <Size c="1" x="{cols}" y="{rows}"/>\n'
+    '    <PageSize c="1" x="512" y="512"/>\n'
+    '    <Compression>LERC</Compression>\n'
+    '    <DataType>{dataType}</DataType>\n'
+    '  <DataValues NoData="{noData}"/>\n'
+    '  <DataFile>z:/mrfcache/Geoscience/Sentinel2/{inputDir}/{fileName}/{stem}.mrf_cache</DataFile><IndexFile>z:/mrfcache/Geoscience/Sentinel2/{inputDir}/{fileName}/{stem}.mrf_cache</IndexFile></Raster>\n'
+    '  <Rsets model="uniform" scale="2"/>\n'
+    '  <GeoTags>\n'
+    '    <BoundingBox maxx="{maxX}" maxy="{maxY}" minx="{minX}" miny="{minY}"/>\n'
+    '    <Projection>{projection}</Projection>\n'
+    '  </GeoTags>\n'
+    '  <Options>V2=ON</Options>\n'
+    '</MRF_META>\n')
+
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Utility functions used by the Builder and Crawler classes
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class Utilities(BaseUtilities):
+
+    # the ARD documents are parsed with the libyaml loader where available
+    def loadYaml(self, data):
+        return yaml.load(data, Loader=yamlLoader)
 
     def getProductName(self, doc):
         try:
@@ -648,6 +677,123 @@ class Utilities():
         return None
 
 
+# band variables used in the raster function arguments, mapped to the\
+# band name in the metadata document, columns, rows, data type and nodata
+sentinelBands = {
+    'AE': ('azimuthal_exiting', "5490", "5490", "Float32", "-999"),
+    'AI': ('azimuthal_incident', "5490", "5490", "Float32", "-999"),
+    'EX': ('exiting', "5490", "5490", "Float32", "-999"),
+    'FM': ('fmask', "5490", "5490", "", "0"),
+    'IN': ('incident', "5490", "5490", "Float32", "-999"),
+    'L01': ('lambertian_blue', "10980", "10980", "Int16", "-999"),
+    'L02': ('lambertian_coastal_aerosol', "1830", "1830", "Int16", "-999"),
+    'L03': ('lambertian_contiguity', "5490", "5490", "", ""),
+    'L04': ('lambertian_green', "10980", "10980", "Int16", "-999"),
+    'L05': ('lambertian_nir_1', "10980", "10980", "Int16", "-999"),
+    'L06': ('lambertian_nir_2', "5490", "5490", "Int16", "-999"),
+    'L07': ('lambertian_red', "10980", "10980", "Int16", "-999"),
+    'L08': ('lambertian_red_edge_1', "5490", "5490", "Int16", "-999"),
+    'L09': ('lambertian_red_edge_2', "5490", "5490", "Int16", "-999"),
+    'L10': ('lambertian_red_edge_3', "5490", "5490", "Int16", "-999"),
+    'L11': ('lambertian_swir_2', "5490", "5490", "Int16", "-999"),
+    'L12': ('lambertian_swir_3', "5490", "5490", "Int16", "-999"),
+    'NR01': ('nbar_blue', "10980", "10980", "Int16", "-999"),
+    'NR02': ('nbar_coastal_aerosol', "1830", "1830", "Int16", "-999"),
+    'NR03': ('nbar_contiguity', "5490", "5490", "", ""),
+    'NR04': ('nbar_green', "10980", "10980", "Int16", "-999"),
+    'NR05': ('nbar_nir_1', "10980", "10980", "Int16", "-999"),
+    'NR06': ('nbar_nir_2', "5490", "5490", "Int16", "-999"),
+    'NR07': ('nbar_red', "10980", "10980", "Int16", "-999"),
+    'NR08': ('nbar_red_edge_1', "5490", "5490", "Int16", "-999"),
+    'NR09': ('nbar_red_edge_2', "5490", "5490", "Int16", "-999"),
+    'NR10': ('nbar_red_edge_3', "5490", "5490", "Int16", "-999"),
+    'NR11': ('nbar_swir_2', "5490", "5490", "Int16", "-999"),
+    'NR12': ('nbar_swir_3', "5490", "5490", "Int16", "-999"),
+    'NRT01': ('nbart_blue', "10980", "10980", "Int16", "-999"),
+    'NRT02': ('nbart_coastal_aerosol', "1830", "1830", "Int16", "-999"),
+    'NRT03': ('nbart_contiguity', "5490", "5490", "", ""),
+    'NRT04': ('nbart_green', "10980", "10980", "Int16", "-999"),
+    'NRT05': ('nbart_nir_1', "10980", "10980", "Int16", "-999"),
+    'NRT06': ('nbart_nir_2', "5490", "5490", "Int16", "-999"),
+    'NRT07': ('nbart_red', "10980", "10980", "Int16", "-999"),
+    'NRT08': ('nbart_red_edge_1', "5490", "5490", "Int16", "-999"),
+    'NRT09': ('nbart_red_edge_2', "5490", "5490", "Int16", "-999"),
+    'NRT10': ('nbart_red_edge_3', "5490", "5490", "Int16", "-999"),
+    'NRT11': ('nbart_swir_2', "5490", "5490", "Int16", "-999"),
+    'NRT12': ('nbart_swir_3', "5490", "5490", "Int16", "-999"),
+    'RA': ('relative_azimuth', "5490", "5490", "Float32", "-999"),
+    'RS': ('relative_slope', "5490", "5490", "Float32", "-999"),
+    'SA': ('satellite_azimuth', "5490", "5490", "Float32", "-999"),
+    'SV': ('satellite_view', "5490", "5490", "Float32", "-999"),
+    'SZ': ('solar_azimuth', "5490", "5490", "Float32", "-999"),
+    'SZE': ('solar_zenith', "5490", "5490", "Float32", "-999"),
+    'TD': ('timedelta', "5490", "5490", "Float32", "-999"),
+    'TS': ('terrain_shadow', "5490", "5490", "", "")}
+
+# bands referenced by each tag, in the order of the raster function\
+# arguments. Only these bands are resolved when an item is built.
+tagBands = {
+    'MS':
+        ['AE', 'AI', 'EX', 'FM', 'IN', 'L02', 'L01', 'L03', 'L04', 'L07',
+         'L08', 'L09', 'L10', 'L05', 'L06', 'L11', 'L12', 'NR02', 'NR01',
+         'NR03', 'NR04', 'NR07', 'NR08', 'NR09', 'NR10', 'NR05', 'NR06',
+         'NR11', 'NR12', 'NRT02', 'NRT01', 'NRT03', 'NRT04', 'NRT07',
+         'NRT08', 'NRT09', 'NRT10', 'NRT05', 'NRT06', 'NRT11', 'NRT12',
+         'RA', 'RS', 'SA', 'SV', 'SZ', 'SZE', 'TS', 'TD'],
+    'Supplementary':
+        ['AE', 'AI', 'EX', 'IN', 'RA', 'RS', 'SA', 'SV', 'SZ', 'SZE', 'TD'],
+    'QA':
+        ['FM', 'L03', 'NR03', 'NRT03', 'TS'],
+    'Lambertian':
+        ['L02', 'L01', 'L04', 'L07', 'L08', 'L09', 'L10', 'L05', 'L06',
+         'L11', 'L12'],
+    'NBAR':
+        ['NR02', 'NR01', 'NR04', 'NR07', 'NR08', 'NR09', 'NR10', 'NR05',
+         'NR06', 'NR11', 'NR12'],
+    'NBART':
+        ['NRT02', 'NRT01', 'NRT04', 'NRT07', 'NRT08', 'NRT09', 'NRT10',
+         'NRT05', 'NRT06', 'NRT11', 'NRT12']}
+
+# bandProperties of the items of each tag
+tagBandProperties = {
+    'MS': tuple(BandProperty(bandName) for bandName in (
+        'azimuthal_exiting', 'azimuthal_incident', 'exiting', 'fmask',
+        'incident', 'lambertian_blue', 'lambertian_coastal_aerosol',
+        'lambertian_contiguity', 'lambertian_green', 'lambertian_red',
+        'lambertian_red_edge_1', 'lambertian_red_edge_2:',
+        'lambertian_red_edge_3', 'lambertian_nir_1', 'lambertian_nir_2',
+        'lambertian_swir_2', 'lambertian_swir_3', 'nbar_blue',
+        'nbar_coastal_aerosol', 'nbar_contiguity', 'nbar_green', 'nbar_red',
+        'nbar_red_edge_1', 'nbar_red_edge_2', 'nbar_red_edge_3', 'nbar_nir_1',
+        'nbar_nir_2', 'nbar_swir_2', 'nbar_swir_3', 'nbart_blue',
+        'nbart_coastal_aerosol', 'nbart_contiguity', 'nbart_green',
+        'nbart_red', 'nbart_red_edge_1', 'nbart_red_edge_2',
+        'nbart_red_edge_3', 'nbart_nir_1', 'nbart_nir_2', 'nbart_swir_2',
+        'nbart_swir_3', 'relative_azimuth', 'relative_slope',
+        'satellite_azimuth', 'satellite_view', 'solar_azimuth',
+        'solar_zenith', 'terrain_shadow', 'timedelta')),
+    'Supplementary': tuple(BandProperty(bandName) for bandName in (
+        'azimuthal_exiting', 'azimuthal_incident', 'exiting', 'incident',
+        'relative_azimuth', 'relative_slope', 'satellite_azimuth',
+        'satellite_view', 'solar_azimuth', 'solar_zenith', 'timedelta')),
+    'QA': tuple(BandProperty(bandName) for bandName in (
+        'fmask', 'lambertian_contiguity', 'nbar_contiguity',
+        'nbart_contiguity', 'terrain_shadow')),
+    'Lambertian': tuple(BandProperty(bandName) for bandName in (
+        'lambertian_blue', 'lambertian_coastal_aerosol', 'lambertian_green',
+        'lambertian_red', 'lambertian_red_edge_1', 'lambertian_red_edge_2',
+        'lambertian_red_edge_3', 'lambertian_nir_1', 'lambertian_nir_2',
+        'lambertian_swir_2', 'lambertian_swir_3')),
+    'NBAR': tuple(BandProperty(bandName) for bandName in (
+        'nbar_blue', 'nbar_coastal_aerosol', 'nbar_green', 'nbar_red',
+        'nbar_red_edge_1', 'nbar_red_edge_2', 'nbar_red_edge_3', 'nbar_nir_1',
+        'nbar_nir_2', 'nbar_swir_2', 'nbar_swir_3')),
+    'NBART': tuple(BandProperty(bandName) for bandName in (
+        'nbart_blue', 'nbart_coastal_aerosol', 'nbart_green', 'nbart_red',
+        'nbart_red_edge_1', 'nbart_red_edge_2', 'nbart_red_edge_3',
+        'nbart_nir_1', 'nbart_nir_2', 'nbart_swir_1', 'nbart_swir_2'))}
+
+
 # ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
 # Geoscience builder class
 # ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
@@ -661,49 +807,6 @@ class GeoscienceSentinelBuilder():
     def canOpen(self, datasetPath):
         return True
 
-    def embedMRF(
-            self,
-            inputDir,
-            fileName,
-            cols,
-            rows,
-            dtype,
-            nodata,
-            maxX,
-            maxY,
-            minX,
-            minY,
-            prjString,
-            protocol):
-
-        try:
-            # create template for 10m resolution and write to a file
-            cachingMRF = \
-                '<MRF_META>\n'  \
-                '  <CachedSource>\n'  \
-                '    <Source>/{12}{0}/{1}</Source>\n'  \
-                '  </CachedSource>\n'  \
-                '  <Raster>\n'  \
-                '    <Size c="1" x="{2}" y="{3}"/>\n'  \
-                '    <PageSize c="1" x="512" y="512"/>\n'  \
-                '    <Compression>LERC</Compression>\n'  \
-                '    <DataType>{4}</DataType>\n'  \
-                '  <DataValues NoData="{6}"/>\n' \
-                '  <DataFile>z:/mrfcache/Geoscience/Sentinel2/{0}/{1}/{5}.mrf_cache</DataFile><IndexFile>z:/mrfcache/Geoscience/Sentinel2/{0}/{1}/{5}.mrf_cache</IndexFile></Raster>\n'  \
-                '  <Rsets model="uniform" scale="2"/>\n'  \
-                '  <GeoTags>\n'  \
-                '    <BoundingBox maxx="{7}" maxy="{8}" minx="{9}" miny="{10}"/>\n'  \
-                '    <Projection>{11}</Projection>\n'  \
-                '  </GeoTags>\n'  \
-                '  <Options>V2=ON</Options>\n'  \
-                '</MRF_META>\n'.format(inputDir, fileName, cols, rows, dtype, fileName[0:-4], nodata, maxX, maxY, minX, minY, prjString, protocol)
-
-        except Exception as exp:
-#            log.Message(str(exp), log.const_critical_text)
-            raise Exception(str(exp))
-
-        return cachingMRF
-
     def build(self, itemURI):
      # Make sure that the itemURI dictionary contains items
         if (len(itemURI) <= 0):
@@ -717,1461 +820,50 @@ class GeoscienceSentinelBuilder():
             else:
                 return None
 
-             # for each band in the image generate the path
-            L01 = L02 = L03 = L04 = L05 = L06 = L07 = L08 = L09 = L10 = L11 = L12 = NR01 = NR02 = NR03 = NR04 = NR05 = NR06 = NR07 = NR08 = NR09 = NR10 = NR11 = NR12 = NRT01 = NRT02 = NRT03 = NRT04 = NRT05 = NRT06 = NRT07 = NRT08 = NRT09 = NRT10 = NRT11 = NRT12 = IN = FM = TD = EX = AI = AE = RA = RS = SA = SV = SZ = SZE = TS = ""
-            yamldir = os.path.dirname(_yamlpath)
+            doc = self.utils.readDocument(_yamlpath)
 
-            if (_yamlpath.startswith("http:")):
-                doc = self.utils.readYamlS3(_yamlpath)
+            if (
+                    doc is None or 'image' not in doc or 'bands' not in doc['image']):
+                raise Exception('Err. Invalid input format!')
+#                return None
 
-                if (
-                        doc is None or 'image' not in doc or 'bands' not in doc['image']):
-                    raise Exception('Err. Invalid input format!')
-#                    return None
+            refPoints = doc['grid_spatial']['projection']['geo_ref_points']
+            maxX = refPoints['lr']['x']
+            maxY = refPoints['ur']['y']
+            minX = refPoints['ll']['x']
+            minY = refPoints['ll']['y']
 
+            yamldir = os.path.dirname(_yamlpath)
+            protocol = None
+            if (_yamlpath.startswith("http:")):
                 lastIdx = _yamlpath.rfind('/')
-# startIdx= _yamlpath.find('.com')+5  #plus 5 to get the index of the
-# character after .com/
                 inputDir = _yamlpath[7:lastIdx]  # along with the bucket name
                 protocol = 'vsicurl/http://'
-
-                refPoints = doc['grid_spatial']['projection']['geo_ref_points']
-                maxX = refPoints['lr']['x']
-                maxY = refPoints['ur']['y']
-                minX = refPoints['ll']['x']
-                minY = refPoints['ll']['y']
-
-                prjString = doc['grid_spatial']['projection']['spatial_reference']
-
-                AE = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['azimuthal_exiting']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                AI = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['azimuthal_incident']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                EX = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['exiting']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                FM = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['fmask']['path']),
-                    "5490",
-                    "5490",
-                    "",
-                    "0",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                IN = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['incident']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-
-                L01 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_blue']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L02 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_coastal_aerosol']['path']),
-                    "1830",
-                    "1830",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L03 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_contiguity']['path']),
-                    "5490",
-                    "5490",
-                    "",
-                    "",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L04 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_green']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L05 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_nir_1']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L06 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_nir_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L07 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_red']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L08 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_red_edge_1']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L09 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_red_edge_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L10 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_red_edge_3']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L11 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_swir_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L12 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_swir_3']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-
-                NR01 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_blue']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR02 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_coastal_aerosol']['path']),
-                    "1830",
-                    "1830",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR03 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_contiguity']['path']),
-                    "5490",
-                    "5490",
-                    "",
-                    "",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR04 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_green']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR05 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_nir_1']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR06 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_nir_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR07 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_red']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR08 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_red_edge_1']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR09 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_red_edge_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR10 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_red_edge_3']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR11 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_swir_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR12 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_swir_3']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-
-                NRT01 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_blue']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT02 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_coastal_aerosol']['path']),
-                    "1830",
-                    "1830",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT03 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_contiguity']['path']),
-                    "5490",
-                    "5490",
-                    "",
-                    "",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT04 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_green']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT05 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_nir_1']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT06 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_nir_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT07 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_red']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT08 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_red_edge_1']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT09 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_red_edge_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT10 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_red_edge_3']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT11 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_swir_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT12 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_swir_3']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-
-                RA = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['relative_azimuth']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                RS = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['relative_slope']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                SA = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['satellite_azimuth']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                SV = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['satellite_view']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-
-                SZ = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['solar_azimuth']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                SZE = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['solar_zenith']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                TS = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['terrain_shadow']['path']),
-                    "5490",
-                    "5490",
-                    "",
-                    "",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                TD = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['timedelta']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-
             elif (_yamlpath.startswith("s3:")):
-                # giving a start index of 5 will ensure that the / from s3://
-                # is not returned.
-                index = _yamlpath.find("/", 5)
-                # First 5 letters will always be s3://
-                bucketname = _yamlpath[5:index]
-                key = _yamlpath[index + 1:]
-                doc = self.utils.readYamlS3_boto3(bucketname, key)
-
-                if (
-                        doc is None or 'image' not in doc or 'bands' not in doc['image']):
-                    raise Exception('Err. Invalid input format!')
-#                    return None
-
                 lastIdx = _yamlpath.rfind('/')
                 inputDir = _yamlpath[5:lastIdx]  # along with the bucket name
                 protocol = 'vsis3/'
-
-                refPoints = doc['grid_spatial']['projection']['geo_ref_points']
-                maxX = refPoints['lr']['x']
-                maxY = refPoints['ur']['y']
-                minX = refPoints['ll']['x']
-                minY = refPoints['ll']['y']
-
+            if (protocol is not None):
                 prjString = doc['grid_spatial']['projection']['spatial_reference']
-
-                AE = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['azimuthal_exiting']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                AI = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['azimuthal_incident']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                EX = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['exiting']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                FM = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['fmask']['path']),
-                    "5490",
-                    "5490",
-                    "",
-                    "0",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                IN = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['incident']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-
-                L01 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_blue']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L02 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_coastal_aerosol']['path']),
-                    "1830",
-                    "1830",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L03 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_contiguity']['path']),
-                    "5490",
-                    "5490",
-                    "",
-                    "",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L04 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_green']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L05 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_nir_1']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L06 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_nir_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L07 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_red']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L08 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_red_edge_1']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L09 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_red_edge_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L10 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_red_edge_3']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L11 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_swir_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                L12 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['lambertian_swir_3']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-
-                NR01 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_blue']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR02 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_coastal_aerosol']['path']),
-                    "1830",
-                    "1830",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR03 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_contiguity']['path']),
-                    "5490",
-                    "5490",
-                    "",
-                    "",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR04 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_green']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR05 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_nir_1']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR06 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_nir_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR07 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_red']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR08 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_red_edge_1']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR09 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_red_edge_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR10 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_red_edge_3']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR11 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_swir_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NR12 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbar_swir_3']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-
-                NRT01 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_blue']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT02 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_coastal_aerosol']['path']),
-                    "1830",
-                    "1830",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT03 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_contiguity']['path']),
-                    "5490",
-                    "5490",
-                    "",
-                    "",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT04 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_green']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT05 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_nir_1']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT06 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_nir_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT07 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_red']['path']),
-                    "10980",
-                    "10980",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT08 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_red_edge_1']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT09 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_red_edge_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT10 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_red_edge_3']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT11 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_swir_2']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                NRT12 = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['nbart_swir_3']['path']),
-                    "5490",
-                    "5490",
-                    "Int16",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-
-                RA = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['relative_azimuth']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                RS = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['relative_slope']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                SA = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['satellite_azimuth']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                SV = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['satellite_view']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-
-                SZ = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['solar_azimuth']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                SZE = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['solar_zenith']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                TS = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['terrain_shadow']['path']),
-                    "5490",
-                    "5490",
-                    "",
-                    "",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-                TD = self.embedMRF(
-                    inputDir,
-                    (doc['image']['bands']['timedelta']['path']),
-                    "5490",
-                    "5490",
-                    "Float32",
-                    "-999",
-                    maxX,
-                    maxY,
-                    minX,
-                    minY,
-                    prjString,
-                    protocol)
-
-            else:
-                doc = self.utils.readYaml(_yamlpath)
-
-                if (
-                        doc is None or 'image' not in doc or 'bands' not in doc['image']):
-                    raise Exception('Err. Invalid input format!')
-#                    return None
-
-                refPoints = doc['grid_spatial']['projection']['geo_ref_points']
-                maxX = refPoints['lr']['x']
-                maxY = refPoints['ur']['y']
-                minX = refPoints['ll']['x']
-                minY = refPoints['ll']['y']
-
-                AE = os.path.join(
-                    yamldir, (doc['image']['bands']['azimuthal_exiting']['path']))
-                AI = os.path.join(
-                    yamldir, (doc['image']['bands']['azimuthal_incident']['path']))
-                EX = os.path.join(
-                    yamldir, (doc['image']['bands']['exiting']['path']))
-                FM = os.path.join(
-                    yamldir, (doc['image']['bands']['fmask']['path']))
-                IN = os.path.join(
-                    yamldir, (doc['image']['bands']['incident']['path']))
-
-                L01 = os.path.join(
-                    yamldir, (doc['image']['bands']['lambertian_blue']['path']))
-                L02 = os.path.join(
-                    yamldir, (doc['image']['bands']['lambertian_coastal_aerosol']['path']))
-                L03 = os.path.join(
-                    yamldir, (doc['image']['bands']['lambertian_contiguity']['path']))
-                L04 = os.path.join(
-                    yamldir, (doc['image']['bands']['lambertian_green']['path']))
-                L05 = os.path.join(
-                    yamldir, (doc['image']['bands']['lambertian_nir_1']['path']))
-                L06 = os.path.join(
-                    yamldir, (doc['image']['bands']['lambertian_nir_2']['path']))
-                L07 = os.path.join(
-                    yamldir, (doc['image']['bands']['lambertian_red']['path']))
-                L08 = os.path.join(
-                    yamldir, (doc['image']['bands']['lambertian_red_edge_1']['path']))
-                L09 = os.path.join(
-                    yamldir, (doc['image']['bands']['lambertian_red_edge_2']['path']))
-                L10 = os.path.join(
-                    yamldir, (doc['image']['bands']['lambertian_red_edge_3']['path']))
-                L11 = os.path.join(
-                    yamldir, (doc['image']['bands']['lambertian_swir_2']['path']))
-                L12 = os.path.join(
-                    yamldir, (doc['image']['bands']['lambertian_swir_3']['path']))
-
-                NR01 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbar_blue']['path']))
-                NR02 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbar_coastal_aerosol']['path']))
-                NR03 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbar_contiguity']['path']))
-                NR04 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbar_green']['path']))
-                NR05 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbar_nir_1']['path']))
-                NR06 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbar_nir_2']['path']))
-                NR07 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbar_red']['path']))
-                NR08 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbar_red_edge_1']['path']))
-                NR09 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbar_red_edge_2']['path']))
-                NR10 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbar_red_edge_3']['path']))
-                NR11 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbar_swir_2']['path']))
-                NR12 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbar_swir_3']['path']))
-
-                NRT01 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbart_blue']['path']))
-                NRT02 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbart_coastal_aerosol']['path']))
-                NRT03 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbart_contiguity']['path']))
-                NRT04 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbart_green']['path']))
-                NRT05 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbart_nir_1']['path']))
-                NRT06 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbart_nir_2']['path']))
-                NRT07 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbart_red']['path']))
-                NRT08 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbart_red_edge_1']['path']))
-                NRT09 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbart_red_edge_2']['path']))
-                NRT10 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbart_red_edge_3']['path']))
-                NRT11 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbart_swir_2']['path']))
-                NRT12 = os.path.join(
-                    yamldir, (doc['image']['bands']['nbart_swir_3']['path']))
-
-                RA = os.path.join(
-                    yamldir, (doc['image']['bands']['relative_azimuth']['path']))
-                RS = os.path.join(
-                    yamldir, (doc['image']['bands']['relative_slope']['path']))
-                SA = os.path.join(
-                    yamldir, (doc['image']['bands']['satellite_azimuth']['path']))
-                SV = os.path.join(
-                    yamldir, (doc['image']['bands']['satellite_view']['path']))
-
-                SZ = os.path.join(
-                    yamldir, (doc['image']['bands']['solar_azimuth']['path']))
-                SZE = os.path.join(
-                    yamldir, (doc['image']['bands']['solar_zenith']['path']))
-                TS = os.path.join(
-                    yamldir, (doc['image']['bands']['terrain_shadow']['path']))
-                TD = os.path.join(
-                    yamldir, (doc['image']['bands']['timedelta']['path']))
+                sceneFields = dict(
+                    protocol=protocol, inputDir=inputDir,
+                    maxX=maxX, maxY=maxY, minX=minX, minY=minY,
+                    projection=prjString)
+
+            # generate the path only for the bands referenced by the tag
+            bands = {}
+            for band in tagBands.get(itemURI['tag'], []):
+                (bandName, cols, rows, dtype, nodata) = sentinelBands[band]
+                bandPath = doc['image']['bands'][bandName]['path']
+                if (protocol is None):
+                    bands[band] = os.path.join(yamldir, bandPath)
+                else:
+                    # the band profiles are bound once, and each of them to\
+                    # the fields of the scene once for the tags of a scene
+                    bands[band] = self.utils.referenceMRF(sentinelMRF.profile(
+                        cols=cols, rows=rows, dataType=dtype, noData=nodata).latest(
+                        **sceneFields).format(
+                        fileName=bandPath, stem=bandPath[0:-4]))
 
             # Metadata Information
             #bandProperties = [{'bandName':'azimuthal_exiting'},{'bandName':'azimuthal_incident'},{'bandName':'exiting'},{'bandName':'fmask'},{'bandName':'incident'},{'bandName':'lambertian_blue'},{'bandName':'lambertian_contiguity'},{'bandName':'lambertian_green'},{'bandName':'lambertian_nir'},{'bandName':'lambertian_red'},{'bandName':'lambertian_swir_1'},{'bandName':'lambertian_swir_2'},{'bandName':'nbar_blue'},{'bandName':'nbar_contiguity'},{'bandName':'nbar_green'},{'bandName':'nbar_nir'},{'bandName':'nbar_red'},{'bandName':'nbar_swir_1'},{'bandName':'nbar_swir_2'},{'bandName':'nbart_blue'},{'bandName':'nbart_contiguity'},{'bandName':'nbart_green'},{'bandName':'nbart_nir'},{'bandName':'nbart_red'},{'bandName':'nbart_swir_1'},{'bandName':'nbart_swir_2'},{'bandName':'relative_azimuth'},{'bandName':'relative_slope'},{'bandName':'satellite_azimuth'},{'bandName':'satellite_view'},{'bandName':'sbt_contiguity'},{'bandName':'sbt_thermal_infrared'},{'bandName':'solar_azimuth'},{'bandName':'solar_zenith'},{'bandName':'terrain_shadow'},{'bandName':'timedelta'}]
@@ -2296,6 +988,7 @@ class GeoscienceSentinelBuilder():
             projectionNode = doc['grid_spatial']['projection']['spatial_reference']
             if (projectionNode is not None):
                 srsWKT = projectionNode
+            extent = (srsWKT, minX, minY, maxX, maxY)
 
 ##                sr = arcpy.SpatialReference()
 # sr.loadFromString(srsWKT)
@@ -2311,802 +1004,250 @@ class GeoscienceSentinelBuilder():
 # DEFINE A DICTIONARY OF VARIABLES
             variables = {}
 
-            builtItem = {}
+            raster = None
             # Depending upon the tag name in the itemURI pass the appropriate
-            # bandProperties dictionary and RFT
+            # RFT, the bandProperties are taken from tagBandProperties
             if (itemURI['tag'] == "MS"):
-                bandProperties = [{'bandName': 'azimuthal_exiting'},
-                                  {'bandName': 'azimuthal_incident'},
-                                  {'bandName': 'exiting'},
-                                  {'bandName': 'fmask'},
-                                  {'bandName': 'incident'},
-                                  {'bandName': 'lambertian_blue'},
-                                  {'bandName': 'lambertian_coastal_aerosol'},
-                                  {'bandName': 'lambertian_contiguity'},
-                                  {'bandName': 'lambertian_green'},
-                                  {'bandName': 'lambertian_red'},
-                                  {'bandName': 'lambertian_red_edge_1'},
-                                  {'bandName': 'lambertian_red_edge_2:'},
-                                  {'bandName': 'lambertian_red_edge_3'},
-                                  {'bandName': 'lambertian_nir_1'},
-                                  {'bandName': 'lambertian_nir_2'},
-                                  {'bandName': 'lambertian_swir_2'},
-                                  {'bandName': 'lambertian_swir_3'},
-                                  {'bandName': 'nbar_blue'},
-                                  {'bandName': 'nbar_coastal_aerosol'},
-                                  {'bandName': 'nbar_contiguity'},
-                                  {'bandName': 'nbar_green'},
-                                  {'bandName': 'nbar_red'},
-                                  {'bandName': 'nbar_red_edge_1'},
-                                  {'bandName': 'nbar_red_edge_2'},
-                                  {'bandName': 'nbar_red_edge_3'},
-                                  {'bandName': 'nbar_nir_1'},
-                                  {'bandName': 'nbar_nir_2'},
-                                  {'bandName': 'nbar_swir_2'},
-                                  {'bandName': 'nbar_swir_3'},
-                                  {'bandName': 'nbart_blue'},
-                                  {'bandName': 'nbart_coastal_aerosol'},
-                                  {'bandName': 'nbart_contiguity'},
-                                  {'bandName': 'nbart_green'},
-                                  {'bandName': 'nbart_red'},
-                                  {'bandName': 'nbart_red_edge_1'},
-                                  {'bandName': 'nbart_red_edge_2'},
-                                  {'bandName': 'nbart_red_edge_3'},
-                                  {'bandName': 'nbart_nir_1'},
-                                  {'bandName': 'nbart_nir_2'},
-                                  {'bandName': 'nbart_swir_2'},
-                                  {'bandName': 'nbart_swir_3'},
-                                  {'bandName': 'relative_azimuth'},
-                                  {'bandName': 'relative_slope'},
-                                  {'bandName': 'satellite_azimuth'},
-                                  {'bandName': 'satellite_view'},
-                                  {'bandName': 'solar_azimuth'},
-                                  {'bandName': 'solar_zenith'},
-                                  {'bandName': 'terrain_shadow'},
-                                  {'bandName': 'timedelta'}]
-
-                builtItem['raster'] = {'functionDataset': {
+                raster = {'functionDataset': {
                     'rasterFunction': "Geoscience_ALL_Composite.rft.xml",
                     'rasterFunctionArguments': {
-                        'Raster1': AE,
-                        'Raster1_rasterInfo': {'pixelType': 10, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster2': AI,
-                        'Raster2_rasterInfo': {'pixelType': 10, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster3': EX,
-                        'Raster3_rasterInfo': {'pixelType': 10, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster4': FM,
-                        'Raster4_rasterInfo': {'pixelType': 3, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster5': IN,
-                        'Raster5_rasterInfo': {'pixelType': 10, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster6': L02,
-                        'Raster6_rasterInfo': {'pixelType': 6, 'ncols': 1830, 'nRows': 1830, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster7': L01,
-                        'Raster7_rasterInfo': {'pixelType': 6, 'ncols': 10980, 'nRows': 10980, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster8': L03,
-                        'Raster8_rasterInfo': {'pixelType': 3, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster9': L04,
-                        'Raster9_rasterInfo': {'pixelType': 6, 'ncols': 10980, 'nRows': 10980, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster10': L07,
-                        'Raster10_rasterInfo': {'pixelType': 6, 'ncols': 10980, 'nRows': 10980, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster11': L08,
-                        'Raster11_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster12': L09,
-                        'Raster12_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster13': L10,
-                        'Raster13_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster14': L05,
-                        'Raster14_rasterInfo': {'pixelType': 6, 'ncols': 10980, 'nRows': 10980, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster15': L06,
-                        'Raster15_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster16': L11,
-                        'Raster16_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster17': L12,
-                        'Raster17_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster18': NR02,
-                        'Raster18_rasterInfo': {'pixelType': 6, 'ncols': 1830, 'nRows': 1830, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster19': NR01,
-                        'Raster19_rasterInfo': {'pixelType': 6, 'ncols': 10980, 'nRows': 10980, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster20': NR03,
-                        'Raster20_rasterInfo': {'pixelType': 3, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster21': NR04,
-                        'Raster21_rasterInfo': {'pixelType': 6, 'ncols': 10980, 'nRows': 10980, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster22': NR07,
-                        'Raster22_rasterInfo': {'pixelType': 6, 'ncols': 10980, 'nRows': 10980, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster23': NR08,
-                        'Raster23_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster24': NR09,
-                        'Raster24_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster25': NR10,
-                        'Raster25_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster26': NR05,
-                        'Raster26_rasterInfo': {'pixelType': 6, 'ncols': 10980, 'nRows': 10980, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster27': NR06,
-                        'Raster27_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster28': NR11,
-                        'Raster28_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster29': NR12,
-                        'Raster29_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster30': NRT02,
-                        'Raster30_rasterInfo': {'pixelType': 6, 'ncols': 1830, 'nRows': 1830, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster31': NRT01,
-                        'Raster31_rasterInfo': {'pixelType': 6, 'ncols': 10980, 'nRows': 10980, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster32': NRT03,
-                        'Raster32_rasterInfo': {'pixelType': 3, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster33': NRT04,
-                        'Raster33_rasterInfo': {'pixelType': 6, 'ncols': 10980, 'nRows': 10980, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster34': NRT07,
-                        'Raster34_rasterInfo': {'pixelType': 6, 'ncols': 10980, 'nRows': 10980, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster35': NRT08,
-                        'Raster35_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster36': NRT09,
-                        'Raster36_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster37': NRT10,
-                        'Raster37_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster38': NRT05,
-                        'Raster38_rasterInfo': {'pixelType': 6, 'ncols': 10980, 'nRows': 10980, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster39': NRT06,
-                        'Raster39_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster40': NRT11,
-                        'Raster40_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster41': NRT12,
-                        'Raster41_rasterInfo': {'pixelType': 6, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster42': RA,
-                        'Raster42_rasterInfo': {'pixelType': 10, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster43': RS,
-                        'Raster43_rasterInfo': {'pixelType': 10, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster44': SA,
-                        'Raster44_rasterInfo': {'pixelType': 10, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster45': SV,
-                        'Raster45_rasterInfo': {'pixelType': 10, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster46': SZ,
-                        'Raster46_rasterInfo': {'pixelType': 10, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster47': SZE,
-                        'Raster47_rasterInfo': {'pixelType': 10, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster48': TS,
-                        'Raster48_rasterInfo': {'pixelType': 3, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY},
-                        'Raster49': TD,
-                        'Raster49_rasterInfo': {'pixelType': 10, 'ncols': 5490, 'nRows': 5490, 'nBands': 1, 'spatialReference': srsWKT, 'xMin': minX, 'yMin': minY, 'xMax': maxX, 'yMax': maxY}
+                        'Raster1': bands['AE'],
+                        'Raster1_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                        'Raster2': bands['AI'],
+                        'Raster2_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                        'Raster3': bands['EX'],
+                        'Raster3_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                        'Raster4': bands['FM'],
+                        'Raster4_rasterInfo': rasterInfoPool.get(3, 5490, extent),
+                        'Raster5': bands['IN'],
+                        'Raster5_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                        'Raster6': bands['L02'],
+                        'Raster6_rasterInfo': rasterInfoPool.get(6, 1830, extent),
+                        'Raster7': bands['L01'],
+                        'Raster7_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                        'Raster8': bands['L03'],
+                        'Raster8_rasterInfo': rasterInfoPool.get(3, 5490, extent),
+                        'Raster9': bands['L04'],
+                        'Raster9_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                        'Raster10': bands['L07'],
+                        'Raster10_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                        'Raster11': bands['L08'],
+                        'Raster11_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster12': bands['L09'],
+                        'Raster12_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster13': bands['L10'],
+                        'Raster13_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster14': bands['L05'],
+                        'Raster14_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                        'Raster15': bands['L06'],
+                        'Raster15_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster16': bands['L11'],
+                        'Raster16_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster17': bands['L12'],
+                        'Raster17_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster18': bands['NR02'],
+                        'Raster18_rasterInfo': rasterInfoPool.get(6, 1830, extent),
+                        'Raster19': bands['NR01'],
+                        'Raster19_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                        'Raster20': bands['NR03'],
+                        'Raster20_rasterInfo': rasterInfoPool.get(3, 5490, extent),
+                        'Raster21': bands['NR04'],
+                        'Raster21_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                        'Raster22': bands['NR07'],
+                        'Raster22_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                        'Raster23': bands['NR08'],
+                        'Raster23_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster24': bands['NR09'],
+                        'Raster24_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster25': bands['NR10'],
+                        'Raster25_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster26': bands['NR05'],
+                        'Raster26_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                        'Raster27': bands['NR06'],
+                        'Raster27_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster28': bands['NR11'],
+                        'Raster28_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster29': bands['NR12'],
+                        'Raster29_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster30': bands['NRT02'],
+                        'Raster30_rasterInfo': rasterInfoPool.get(6, 1830, extent),
+                        'Raster31': bands['NRT01'],
+                        'Raster31_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                        'Raster32': bands['NRT03'],
+                        'Raster32_rasterInfo': rasterInfoPool.get(3, 5490, extent),
+                        'Raster33': bands['NRT04'],
+                        'Raster33_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                        'Raster34': bands['NRT07'],
+                        'Raster34_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                        'Raster35': bands['NRT08'],
+                        'Raster35_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster36': bands['NRT09'],
+                        'Raster36_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster37': bands['NRT10'],
+                        'Raster37_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster38': bands['NRT05'],
+                        'Raster38_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                        'Raster39': bands['NRT06'],
+                        'Raster39_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster40': bands['NRT11'],
+                        'Raster40_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster41': bands['NRT12'],
+                        'Raster41_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                        'Raster42': bands['RA'],
+                        'Raster42_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                        'Raster43': bands['RS'],
+                        'Raster43_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                        'Raster44': bands['SA'],
+                        'Raster44_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                        'Raster45': bands['SV'],
+                        'Raster45_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                        'Raster46': bands['SZ'],
+                        'Raster46_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                        'Raster47': bands['SZE'],
+                        'Raster47_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                        'Raster48': bands['TS'],
+                        'Raster48_rasterInfo': rasterInfoPool.get(3, 5490, extent),
+                        'Raster49': bands['TD'],
+                        'Raster49_rasterInfo': rasterInfoPool.get(10, 5490, extent)
                     }
                 }
                 }
 
             elif (itemURI['tag'] == "Supplementary"):
-                # Supplementary
-                bandProperties = [{'bandName': 'azimuthal_exiting'},
-                                  {'bandName': 'azimuthal_incident'},
-                                  {'bandName': 'exiting'},
-                                  {'bandName': 'incident'},
-                                  {'bandName': 'relative_azimuth'},
-                                  {'bandName': 'relative_slope'},
-                                  {'bandName': 'satellite_azimuth'},
-                                  {'bandName': 'satellite_view'},
-                                  {'bandName': 'solar_azimuth'},
-                                  {'bandName': 'solar_zenith'},
-                                  {'bandName': 'timedelta'}]
-
-                builtItem['raster'] = {
+                raster = {
                     'functionDataset': {
                         'rasterFunction': "GS_Composite.rft.xml",
                         'rasterFunctionArguments': {
-                            'Raster1': AE,
-                            'Raster1_rasterInfo': {
-                                'pixelType': 10,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster2': AI,
-                            'Raster2_rasterInfo': {
-                                'pixelType': 10,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster3': EX,
-                            'Raster3_rasterInfo': {
-                                'pixelType': 10,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster4': IN,
-                            'Raster4_rasterInfo': {
-                                'pixelType': 10,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster5': RA,
-                            'Raster5_rasterInfo': {
-                                'pixelType': 10,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster6': RS,
-                            'Raster6_rasterInfo': {
-                                'pixelType': 10,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster7': SA,
-                            'Raster7_rasterInfo': {
-                                'pixelType': 10,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster8': SV,
-                            'Raster8_rasterInfo': {
-                                'pixelType': 10,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster9': SZ,
-                            'Raster9_rasterInfo': {
-                                'pixelType': 10,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster10': SZE,
-                            'Raster10_rasterInfo': {
-                                'pixelType': 10,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster11': TD,
-                            'Raster11_rasterInfo': {
-                                'pixelType': 10,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY}}}}
+                            'Raster1': bands['AE'],
+                            'Raster1_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                            'Raster2': bands['AI'],
+                            'Raster2_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                            'Raster3': bands['EX'],
+                            'Raster3_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                            'Raster4': bands['IN'],
+                            'Raster4_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                            'Raster5': bands['RA'],
+                            'Raster5_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                            'Raster6': bands['RS'],
+                            'Raster6_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                            'Raster7': bands['SA'],
+                            'Raster7_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                            'Raster8': bands['SV'],
+                            'Raster8_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                            'Raster9': bands['SZ'],
+                            'Raster9_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                            'Raster10': bands['SZE'],
+                            'Raster10_rasterInfo': rasterInfoPool.get(10, 5490, extent),
+                            'Raster11': bands['TD'],
+                            'Raster11_rasterInfo': rasterInfoPool.get(10, 5490, extent)}}}
             elif (itemURI['tag'] == "QA"):
-                # QA
-                bandProperties = [{'bandName': 'fmask'},
-                                  {'bandName': 'lambertian_contiguity'},
-                                  {'bandName': 'nbar_contiguity'},
-                                  {'bandName': 'nbart_contiguity'},
-                                  {'bandName': 'terrain_shadow'}]
-
-                builtItem['raster'] = {
+                raster = {
                     'functionDataset': {
                         'rasterFunction': "GS_QA_Composite.rft.xml",
                         'rasterFunctionArguments': {
-                            'Raster1': FM,
-                            'Raster1_rasterInfo': {
-                                'pixelType': 3,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster2': L03,
-                            'Raster2_rasterInfo': {
-                                'pixelType': 3,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster3': NR03,
-                            'Raster3_rasterInfo': {
-                                'pixelType': 3,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster4': NRT03,
-                            'Raster4_rasterInfo': {
-                                'pixelType': 3,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster5': TS,
-                            'Raster5_rasterInfo': {
-                                'pixelType': 3,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY}}}}
+                            'Raster1': bands['FM'],
+                            'Raster1_rasterInfo': rasterInfoPool.get(3, 5490, extent),
+                            'Raster2': bands['L03'],
+                            'Raster2_rasterInfo': rasterInfoPool.get(3, 5490, extent),
+                            'Raster3': bands['NR03'],
+                            'Raster3_rasterInfo': rasterInfoPool.get(3, 5490, extent),
+                            'Raster4': bands['NRT03'],
+                            'Raster4_rasterInfo': rasterInfoPool.get(3, 5490, extent),
+                            'Raster5': bands['TS'],
+                            'Raster5_rasterInfo': rasterInfoPool.get(3, 5490, extent)}}}
 
             elif (itemURI['tag'] == "Lambertian"):
-                # Lambertian
-                bandProperties = [{'bandName': 'lambertian_blue'},
-                                  {'bandName': 'lambertian_coastal_aerosol'},
-                                  {'bandName': 'lambertian_green'},
-                                  {'bandName': 'lambertian_red'},
-                                  {'bandName': 'lambertian_red_edge_1'},
-                                  {'bandName': 'lambertian_red_edge_2'},
-                                  {'bandName': 'lambertian_red_edge_3'},
-                                  {'bandName': 'lambertian_nir_1'},
-                                  {'bandName': 'lambertian_nir_2'},
-                                  {'bandName': 'lambertian_swir_2'},
-                                  {'bandName': 'lambertian_swir_3'}]
-
-                builtItem['raster'] = {
+                raster = {
                     'functionDataset': {
                         'rasterFunction': "GS_Composite.rft.xml",
                         'rasterFunctionArguments': {
-                            'Raster1': L02,
-                            'Raster1_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 1830,
-                                'nRows': 1830,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster2': L01,
-                            'Raster2_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 10980,
-                                'nRows': 10980,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster3': L04,
-                            'Raster3_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 10980,
-                                'nRows': 10980,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster4': L07,
-                            'Raster4_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 10980,
-                                'nRows': 10980,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster5': L08,
-                            'Raster5_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster6': L09,
-                            'Raster6_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster7': L10,
-                            'Raster7_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster8': L05,
-                            'Raster8_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 10980,
-                                'nRows': 10980,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster9': L06,
-                            'Raster9_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster10': L11,
-                            'Raster10_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster11': L12,
-                            'Raster11_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY}}}}
+                            'Raster1': bands['L02'],
+                            'Raster1_rasterInfo': rasterInfoPool.get(6, 1830, extent),
+                            'Raster2': bands['L01'],
+                            'Raster2_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                            'Raster3': bands['L04'],
+                            'Raster3_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                            'Raster4': bands['L07'],
+                            'Raster4_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                            'Raster5': bands['L08'],
+                            'Raster5_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                            'Raster6': bands['L09'],
+                            'Raster6_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                            'Raster7': bands['L10'],
+                            'Raster7_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                            'Raster8': bands['L05'],
+                            'Raster8_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                            'Raster9': bands['L06'],
+                            'Raster9_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                            'Raster10': bands['L11'],
+                            'Raster10_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                            'Raster11': bands['L12'],
+                            'Raster11_rasterInfo': rasterInfoPool.get(6, 5490, extent)}}}
 
             elif (itemURI['tag'] == "NBAR"):
-                # NBAR
-                bandProperties = [{'bandName': 'nbar_blue'},
-                                  {'bandName': 'nbar_coastal_aerosol'},
-                                  {'bandName': 'nbar_green'},
-                                  {'bandName': 'nbar_red'},
-                                  {'bandName': 'nbar_red_edge_1'},
-                                  {'bandName': 'nbar_red_edge_2'},
-                                  {'bandName': 'nbar_red_edge_3'},
-                                  {'bandName': 'nbar_nir_1'},
-                                  {'bandName': 'nbar_nir_2'},
-                                  {'bandName': 'nbar_swir_2'},
-                                  {'bandName': 'nbar_swir_3'}]
-
-                builtItem['raster'] = {
+                raster = {
                     'functionDataset': {
                         'rasterFunction': "GS_Composite.rft.xml",
                         'rasterFunctionArguments': {
-                            'Raster1': NR02,
-                            'Raster1_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 1830,
-                                'nRows': 1830,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster2': NR01,
-                            'Raster2_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 10980,
-                                'nRows': 10980,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster3': NR04,
-                            'Raster3_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 10980,
-                                'nRows': 10980,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster4': NR07,
-                            'Raster4_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 10980,
-                                'nRows': 10980,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster5': NR08,
-                            'Raster5_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster6': NR09,
-                            'Raster6_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster7': NR10,
-                            'Raster7_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster8': NR05,
-                            'Raster8_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 10980,
-                                'nRows': 10980,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster9': NR06,
-                            'Raster9_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster10': NR11,
-                            'Raster10_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster11': NR12,
-                            'Raster11_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY}}}}
+                            'Raster1': bands['NR02'],
+                            'Raster1_rasterInfo': rasterInfoPool.get(6, 1830, extent),
+                            'Raster2': bands['NR01'],
+                            'Raster2_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                            'Raster3': bands['NR04'],
+                            'Raster3_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                            'Raster4': bands['NR07'],
+                            'Raster4_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                            'Raster5': bands['NR08'],
+                            'Raster5_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                            'Raster6': bands['NR09'],
+                            'Raster6_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                            'Raster7': bands['NR10'],
+                            'Raster7_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                            'Raster8': bands['NR05'],
+                            'Raster8_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                            'Raster9': bands['NR06'],
+                            'Raster9_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                            'Raster10': bands['NR11'],
+                            'Raster10_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                            'Raster11': bands['NR12'],
+                            'Raster11_rasterInfo': rasterInfoPool.get(6, 5490, extent)}}}
 
             elif (itemURI['tag'] == "NBART"):
-                # NBART
-                bandProperties = [{'bandName': 'nbart_blue'},
-                                  {'bandName': 'nbart_coastal_aerosol'},
-                                  {'bandName': 'nbart_green'},
-                                  {'bandName': 'nbart_red'},
-                                  {'bandName': 'nbart_red_edge_1'},
-                                  {'bandName': 'nbart_red_edge_2'},
-                                  {'bandName': 'nbart_red_edge_3'},
-                                  {'bandName': 'nbart_nir_1'},
-                                  {'bandName': 'nbart_nir_2'},
-                                  {'bandName': 'nbart_swir_1'},
-                                  {'bandName': 'nbart_swir_2'}]
-
-                builtItem['raster'] = {
+                raster = {
                     'functionDataset': {
                         'rasterFunction': "GS_Composite.rft.xml",
                         'rasterFunctionArguments': {
-                            'Raster1': NRT02,
-                            'Raster1_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 1830,
-                                'nRows': 1830,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster2': NRT01,
-                            'Raster2_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 10980,
-                                'nRows': 10980,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster3': NRT04,
-                            'Raster3_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 10980,
-                                'nRows': 10980,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster4': NRT07,
-                            'Raster4_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 10980,
-                                'nRows': 10980,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster5': NRT08,
-                            'Raster5_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster6': NRT09,
-                            'Raster6_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster7': NRT10,
-                            'Raster7_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster8': NRT05,
-                            'Raster8_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 10980,
-                                'nRows': 10980,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster9': NRT06,
-                            'Raster9_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster10': NRT11,
-                            'Raster10_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY},
-                            'Raster11': NRT12,
-                            'Raster11_rasterInfo': {
-                                'pixelType': 6,
-                                'ncols': 5490,
-                                'nRows': 5490,
-                                'nBands': 1,
-                                'spatialReference': srsWKT,
-                                'xMin': minX,
-                                'yMin': minY,
-                                'xMax': maxX,
-                                'yMax': maxY}}}}
+                            'Raster1': bands['NRT02'],
+                            'Raster1_rasterInfo': rasterInfoPool.get(6, 1830, extent),
+                            'Raster2': bands['NRT01'],
+                            'Raster2_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                            'Raster3': bands['NRT04'],
+                            'Raster3_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                            'Raster4': bands['NRT07'],
+                            'Raster4_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                            'Raster5': bands['NRT08'],
+                            'Raster5_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                            'Raster6': bands['NRT09'],
+                            'Raster6_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                            'Raster7': bands['NRT10'],
+                            'Raster7_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                            'Raster8': bands['NRT05'],
+                            'Raster8_rasterInfo': rasterInfoPool.get(6, 10980, extent),
+                            'Raster9': bands['NRT06'],
+                            'Raster9_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                            'Raster10': bands['NRT11'],
+                            'Raster10_rasterInfo': rasterInfoPool.get(6, 5490, extent),
+                            'Raster11': bands['NRT12'],
+                            'Raster11_rasterInfo': rasterInfoPool.get(6, 5490, extent)}}}
 
             cordsList = doc['grid_spatial']['projection']['valid_data']['coordinates']
 # Assemble everything into an outgoing dictionary
-            metadata['bandProperties'] = bandProperties
-            builtItem['spatialReference'] = srsWKT
-            builtItem['variables'] = variables
-            builtItem['itemUri'] = itemURI
-            builtItem['keyProperties'] = metadata
-            builtItem['footprint'] = cordsList[0]
-            builtItemsList = list()
-            builtItemsList.append(builtItem)
+            builtItem = BuiltItem(
+                itemURI, srsWKT, metadata, cordsList[0], raster=raster,
+                bandProperties=tagBandProperties[itemURI['tag']],
+                variables=variables)
+            builtItemsList = [builtItem.toDict()]
+            self.utils.recordBuild(itemURI)
             return builtItemsList
         except Exception as e:
             raise
@@ -3128,11 +1269,84 @@ class GeoscienceSentinelCrawler():
         except BaseException:
             ##            print ('Error in crawler properties')
             return None
+        if (crawlerProperties.get('documentCacheSize')):
+            documentCache.resize(crawlerProperties['documentCacheSize'])
         self.run = 1
         if (self.filter is (None or "")):
             self.filter = 'L2*METADATA.yaml'
+        if (crawlerProperties.get('metadataCachePath')):
+            self.utils.configureMetadataCache(
+                crawlerProperties['metadataCachePath'],
+                crawlerProperties.get('metadataCacheSizeMB', 512))
+        if (crawlerProperties.get('mrfSidecarPath')):
+            self.utils.configureMRFSidecars(crawlerProperties['mrfSidecarPath'])
+        s3ClientPool.configure(
+            crawlerProperties.get('s3MaxPoolConnections'),
+            crawlerProperties.get('s3RetryMode'),
+            crawlerProperties.get('s3MaxAttempts'))
+        httpTransport.configure(
+            crawlerProperties.get('httpPoolSize'),
+            crawlerProperties.get('httpConnectTimeout'),
+            crawlerProperties.get('httpReadTimeout'),
+            crawlerProperties.get('httpMaxRetries'),
+            crawlerProperties.get('httpBackoffFactor'))
+        self.prefetcher = MetadataPrefetcher(
+            self.utils,
+            crawlerProperties.get('prefetchDepth', 0),
+            crawlerProperties.get('prefetchWorkers', 4))
+        self.bulkFetcher = BulkMetadataFetcher(
+            self.utils,
+            crawlerProperties.get('bulkFetch', False),
+            crawlerProperties.get('bulkFetchPerHost', 8),
+            crawlerProperties.get('bulkFetchBatchSize', 256))
+        self.walker = DirectoryWalker(
+            self.filter,
+            crawlerProperties.get('walkWorkers', 8),
+            crawlerProperties.get('walkQueueSize', 1024))
+        self.crawlState = None
+        if (crawlerProperties.get('crawlStatePath')):
+            self.crawlState = self.utils.configureCrawlState(
+                crawlerProperties['crawlStatePath'],
+                crawlerProperties.get('crawlStateReportPath'))
+        self.manifestReader = ManifestReader(
+            crawlerProperties.get('manifestDocuments', False))
+        self.shardIndex = int(crawlerProperties.get('shardIndex', 0))
+        self.shardCount = int(crawlerProperties.get('shardCount', 1))
+        if (self.shardCount < 1 or not 0 <= self.shardIndex < self.shardCount):
+            raise Exception('Err. Invalid shard index or count!')
+        self.checkpoint = None
+        if (crawlerProperties.get('checkpointPath')):
+            self.checkpoint = CrawlCheckpoint(
+                crawlerProperties['checkpointPath'],
+                self.paths,
+                crawlerProperties.get('resume', False),
+                crawlerProperties.get('checkpointInterval', 0))
+            self.walker.walkWorkers = 1  # positions need a repeatable walk order
+        self.sceneFilter = SceneFilter(
+            crawlerProperties.get('startDate'),
+            crawlerProperties.get('endDate'),
+            crawlerProperties.get('bbox'),
+            crawlerProperties.get('maxCloudCover'),
+            crawlerProperties.get('platforms'))
+        self.deduplicator = None
+        if (crawlerProperties.get('deduplicate', False)):
+            self.deduplicator = Deduplicator(
+                crawlerProperties.get('dedupExactLimit'),
+                crawlerProperties.get('dedupBloomCapacity', 10000000),
+                crawlerProperties.get('dedupFalsePositiveRate', 0.0001))
+            if (self.checkpoint is not None):
+                self.checkpoint.attach(self.deduplicator)
+        self.listingCache = ListingCache(
+            crawlerProperties.get('listDirectories', False),
+            crawlerProperties.get('listingCacheSize', 4096),
+            crawlerProperties.get('listingBatchSize', 10000),
+            crawlerProperties.get('walkWorkers', 8))
+        # uris skipped by getNextUri, counted per reason
+        reasons = ('checkpoint',)
+        self.skipped = OrderedDict((reason, 0) for reason in reasons)
+        self.skipSeconds = OrderedDict((reason, 0.0) for reason in reasons)
         try:
-            self.pathGenerator = self.createGenerator()
+            self.pathGenerator = self.createPathGenerator()
         except StopIteration:
             return None
 
@@ -3151,9 +1365,84 @@ class GeoscienceSentinelCrawler():
                 "NBAR"]:  # Landsat8 L2 product have 5 types of sub-products
             yield tag
 
+    def createPathGenerator(self):
+        # chains the path generator with the optional crawl stages
+        paths = self.createGenerator()
+        if (self.checkpoint is not None):
+            paths = self.checkpoint.track(paths)
+        if (self.deduplicator is not None):
+            paths = self.deduplicator.select(paths, self.deduplicator.normalizePath, 'path')
+        paths = self.prefetcher.prefetch(
+            self.skipUnchanged(self.selectShard(paths)))
+        paths = self.sceneFilter.select(paths, self.utils.getSceneProperties)
+        if (self.deduplicator is not None):
+            paths = self.deduplicator.select(paths, self.utils.getSceneId, 'id')
+        if (self.checkpoint is not None):
+            paths = self.checkpoint.follow(paths)
+        return paths
+
+    def iterInputs(self):
+        if (self.checkpoint is None):
+            return iter(self.paths)
+        return self.checkpoint.iterInputs(self.paths)
+
+    def getCrawlScope(self):
+        # the inputs whose scenes are compared between crawls
+        scope = ';'.join(self.paths)
+        if (self.shardCount > 1):
+            scope += '#{0}/{1}'.format(self.shardIndex, self.shardCount)
+        return scope
+
+    def selectShard(self, paths):
+        # keeps the paths of this crawler's shard. Shards are chosen by a\
+        # stable hash of the scene path, so workers given the same input and\
+        # shardCount ingest disjoint subsets without coordination, and all\
+        # tags of a scene stay on the shard of its path.
+        if (self.shardCount <= 1):
+            return paths
+        return (path for path in paths if self.getShard(path) == self.shardIndex)
+
+    def getShard(self, path):
+        key = path
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        return int(digest, 16) % self.shardCount
+
+    def skipUnchanged(self, paths):
+        # with a crawl state store, only new or changed scenes are yielded
+        if (self.crawlState is None):
+            return paths
+        return self.crawlState.skipUnchanged(
+            paths, self.getCrawlScope(), self.getSceneTags, self.utils.statScene,
+            self.checkpoint.runId if self.checkpoint is not None else None)
+
+    def countSkip(self, reason, started):
+        self.skipped[reason] += 1
+        self.skipSeconds[reason] += time.time() - started
+
+    def getSkipStats(self):
+        return dict((reason, {'count': self.skipped[reason],
+                              'seconds': round(self.skipSeconds[reason], 3)})
+                    for reason in self.skipped)
+
+    def getSceneTags(self, path):
+        # the tags getNextUri emits for a scene, all the sub-products of a\
+        # Level-2 document and only MS otherwise
+        try:
+            doc = self.utils.readDocument(path)
+        except BaseException:
+            return None  # the builder reads the document again and reports the error
+        if (self.utils.getProcessingLevel(doc) == "Level-2"):
+            return list(self.createTagGenerator())
+        return ["MS"]
+
     def createGenerator(self):
-        for path in self.paths:
-            if (path.startswith("http") or (path.startswith("s3"))):
+        for path in self.iterInputs():
+            if (path.startswith("s3") and path.endswith("/")):
+                # s3://bucket/prefix/ inputs are listed like directories
+                for filename in self.walker.walkS3(path, self.recurse):
+                    yield filename
+
+            elif (path.startswith("http") or (path.startswith("s3"))):
                 yield path
 
             elif (not os.path.exists(path)):
@@ -3161,16 +1450,17 @@ class GeoscienceSentinelCrawler():
 
             elif (os.path.isdir(path)):
                 if (self.recurse):
-                    for root, dirs, files in (os.walk(path)):
-                        for file in (files):
-                            if (file.endswith(".yaml")):
-                                filename = os.path.join(root, file)
-                                yield filename
+                    for filename in self.walker.walk(path):
+                        yield filename
                 else:
                     filter_to_scan = path + os.path.sep + self.filter
                     for filename in glob.glob(filter_to_scan):
                         yield filename
 
+            elif (self.manifestReader.isManifest(path)):
+                for filename in self.manifestReader.read(path):
+                    yield filename
+
             elif (path.endswith(".csv")):
                 with open(path, 'r') as csvfile:
                     reader = csv.reader(csvfile)
@@ -3185,13 +1475,13 @@ class GeoscienceSentinelCrawler():
                     if (rasterFieldIndex == -1):
                         csvfile.seek(0)
                         rasterFieldIndex = 0
-                    for row in reader:
-                        filename = row[rasterFieldIndex]
-                        if (filename.startswith("http")or (filename.startswith(
-                                "s3"))):  # if the csv list contains a list of s3 urls
-                            yield filename
-                        elif (filename.endswith(".yaml") and os.path.exists(filename)):
-                            yield filename
+                    rows = self.selectShard(
+                        (row[rasterFieldIndex] for row in reader))
+                    # csv lists of s3 urls are kept, local documents must exist
+                    filenames = (filename for filename in self.bulkFetcher.fetchAll(rows)
+                                 if filename.startswith(("http", "s3")) or filename.endswith(".yaml"))
+                    for filename in self.listingCache.select(filenames):
+                        yield filename
             elif (path.endswith(".yaml")):
                 yield path
 
@@ -3203,58 +1493,50 @@ class GeoscienceSentinelCrawler():
         return self.getNextUri()
 
     def getNextUri(self):
-        try:
-            if (self.run == 1):
-                try:
-                    self.curPath = next(self.pathGenerator)
-                    self.run = 10
-                except BaseException:
-                    return None
-            if ((self.curPath).startswith("http:")):
-                doc = self.utils.readYamlS3(self.curPath)
-            elif ((self.curPath).startswith("s3:")):
-                _yamlpath = self.curPath
-                # giving a start index of 5 will ensure that the / from s3://
-                # is not returned.
-                index = _yamlpath.find("/", 5)
-                # First 5 letters will always be s3://
-                bucketname = _yamlpath[5:index]
-                key = _yamlpath[index + 1:]
-                doc = self.utils.readYamlS3_boto3(bucketname, key)
-            else:
-                doc = self.utils.readYaml(self.curPath)
-            productName = self.utils.getProductName(doc)
-            processingLevel = self.utils.getProcessingLevel(doc)
-            if (processingLevel == "Level-2"):
-                try:
-                    curTag = next(self.tagGenerator)
-                except StopIteration:
+        # tags emitted before an interrupted crawl are skipped in a loop, so\
+        # a resume can pass any number of them
+        while True:
+            started = time.time()
+            try:
+                if (self.run == 1):
                     try:
-                        self.tagGenerator = self.createTagGenerator()  # reinitialize tag generator
+                        self.curPath = next(self.pathGenerator)
+                        self.run = 10
                     except StopIteration:
                         return None
+                doc = self.utils.readDocument(self.curPath)
+                productName = self.utils.getProductName(doc)
+                processingLevel = self.utils.getProcessingLevel(doc)
+                if (processingLevel == "Level-2"):
                     try:
-                        self.curPath = next(self.pathGenerator)
-                    except BaseException:
-                        return None
-                    curTag = next(self.tagGenerator)
-                    if ((self.curPath).startswith(
-                            "http:")):  # this is needed to get the product name from the new path
-                        doc = self.utils.readYamlS3(self.curPath)
-                    else:
-                        doc = self.utils.readYaml(self.curPath)
-                    productName = self.utils.getProductName(doc)
+                        curTag = next(self.tagGenerator)
+                    except StopIteration:
+                        try:
+                            self.tagGenerator = self.createTagGenerator()  # reinitialize tag generator
+                        except StopIteration:
+                            return None
+                        try:
+                            self.curPath = next(self.pathGenerator)
+                        except StopIteration:
+                            return None
+                        curTag = next(self.tagGenerator)
+                        # this is needed to get the product name from the new path
+                        doc = self.utils.readDocument(self.curPath)
+                        productName = self.utils.getProductName(doc)
 
-            else:
-                self.curPath = next(self.pathGenerator)
-                curTag = "MS"
-        except StopIteration:
-            return None
-        uri = {
-            'path': self.curPath,
-            'displayName': os.path.split(os.path.dirname(self.curPath))[1],
-            'tag': curTag,
-            'groupName': os.path.split(os.path.dirname(self.curPath))[1],
-            'productName': productName
-        }
-        return uri
+                else:
+                    self.curPath = next(self.pathGenerator)
+                    curTag = "MS"
+            except StopIteration:
+                return None
+            uri = {
+                'path': self.curPath,
+                'displayName': os.path.split(os.path.dirname(self.curPath))[1],
+                'tag': curTag,
+                'groupName': os.path.split(os.path.dirname(self.curPath))[1],
+                'productName': productName
+            }
+            if (self.checkpoint is not None and not self.checkpoint.emit(uri['tag'])):
+                self.countSkip('checkpoint', started)
+                continue  # emitted before the crawl was interrupted
+            return uri
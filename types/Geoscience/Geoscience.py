@@ -23,11 +23,15 @@
 # ------------------------------------------------------------------------------
 
 import os
+import sys
 import arcpy
 import glob
 import csv
+import hashlib
+import time
 ##import urllib.request
 import requests
+from collections import OrderedDict
 from osgeo import gdal
 
 try:
@@ -36,6 +40,19 @@ try:
 except ImportError as e:
     raise
 
+# the crawler and builder infrastructure shared by the raster types lives\
+# in rasterTypeUtils.py, deployed next to the raster type or found in the\
+# types/common folder of the repository
+commonPath = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'common')
+if (os.path.isdir(commonPath) and commonPath not in sys.path):
+    sys.path.append(commonPath)
+from rasterTypeUtils import (
+    BaseUtilities, BulkMetadataFetcher, CrawlCheckpoint, Deduplicator,
+    DirectoryWalker, ListingCache, MRFTemplate, ManifestReader,
+    MetadataPrefetcher, SceneFilter, httpTransport, projectionService,
+    s3ClientPool)
+
 
 class DataSourceType():
     File = 1
@@ -252,53 +269,59 @@ class RasterTypeFactory():
 
 
 # ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
-# Utility functions used by the Builder and Crawler classes
+# Precompiled MRF templates for the Builder class
 # ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
 
-class Utilities():
 
-    def readYaml(self, path):  # to read the yaml file located locally.
-        try:
-            with open(path, 'r') as q:
-                try:
-                    doc = (yaml.load(q))
-                except yaml.YAMLError as exc:
-                    raise
-                return doc
-        except BaseException:
-            raise
+# embedded MRF of a band, compiled per band profile
+geoscienceMRF = MRFTemplate.compile(
+    '<MRF_META>\n'
+    '  <CachedSource>\n'
+    '    <Source>/{protocol}{inputDir}/{fileName}</Source>\n'
+    '  </CachedSource>\n'
+    '  <Raster>\n'
+    '    <Size c="{nBands}" x="{cols}" y="{rows}"/>\n'
+    '    <PageSize c="1" x="512" y="512"/>\n'
+    '    <Compression>LERC</Compression>\n'
+    '    <DataType>{dataType}</DataType>\n'
+    '  <DataFile>z:/mrfcache/Geoscience/{cachePath}/{stem}.mrf_cache</DataFile><IndexFile>z:/mrfcache/Geoscience/{cachePath}/{stem}.mrf_cache</IndexFile></Raster>\n'
+    '  <Rsets model="uniform" scale="2"/>\n'
+    '  <GeoTags>\n'
+    '    <BoundingBox maxx="{maxX}" maxy="{maxY}" minx="{minX}" miny="{minY}"/>\n'
+    '    <Projection>{projection}</Projection>\n'
+    '  </GeoTags>\n'
+    '  <Options>V2=ON</Options>\n'
+    '</MRF_META>')
+
+# embedded MRF of a fractional cover band, which has no DataType
+fractionalCoverMRF = MRFTemplate.compile(
+    '<MRF_META>\n'
+    '  <CachedSource>\n'
+    '    <Source>/{protocol}{inputDir}/{fileName}</Source>\n'
+    '  </CachedSource>\n'
+    '  <Raster>\n'
+    '    <Size c="{nBands}" x="{cols}" y="{rows}"/>\n'
+    '    <PageSize c="1" x="512" y="512"/>\n'
+    '    <Compression>LERC</Compression>\n'
+    '  <DataFile>z:/mrfcache/Geoscience/{cachePath}/{stem}.mrf_cache</DataFile><IndexFile>z:/mrfcache/Geoscience/{cachePath}/{stem}.mrf_cache</IndexFile></Raster>\n'
+    '  <Rsets model="uniform" scale="2"/>\n'
+    '  <GeoTags>\n'
+    '    <BoundingBox maxx="{maxX}" maxy="{maxY}" minx="{minX}" miny="{minY}"/>\n'
+    '    <Projection>{projection}</Projection>\n'
+    '  </GeoTags>\n'
+    '  <Options>V2=ON</Options>\n'
+    '</MRF_META>')
 
-# def readYamlS3(self,path):          #to read the yaml file located on S3
-##        page= urllib.request.urlopen(path)
-# try:
-##            doc= (yaml.load(page))
-# except yaml.YAMLError as exc:
-# print(exc)
-# return None
-# return doc
-
-    # to read the yaml file located on S3 over s3:// protocol
-    def readYamlS3_boto3(self, bucket, path):
-        client = boto3.client('s3')
-        try:
-            page = client.get_object(
-                Bucket=bucket, Key=path, RequestPayer='requester')
-            page = client.get_object(Bucket=bucket, Key=path)
-            doc = (yaml.load(page['Body'].read()))
-        except yaml.YAMLError as exc:
-            raise
-        return doc
 
-    def readYamlS3(self, path):  # to read the yaml file located on S3 over https:// protocol
-        page = requests.get(path, stream=True, timeout=None)
-        try:
-            doc = (yaml.load(page.content))
-        except yaml.YAMLError as exc:
-            raise
-        return doc
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Utility functions used by the Builder and Crawler classes
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+class Utilities(BaseUtilities):
 
     def getProductName(self, path):
         path = os.path.basename(path)
+        productName = None
         if (path.startswith('be')):
             productName = 'landsat8_barest_earth_mosaic'
         elif ('FC' in path):
@@ -316,6 +339,7 @@ class Utilities():
         return None
 
     def getTag(self, productName):
+        tag = None
         if productName == 'landsat8_barest_earth_mosaic':
             tag = 'be'
         elif productName == 'fractional_cover':
@@ -362,32 +386,11 @@ class GeoscienceBuilder():
             nBands,
             protocol,
             cachePath):
-
-        try:
-            # create template for 10m resolution and write to a file
-            cachingMRF = \
-                '<MRF_META>\n'  \
-                '  <CachedSource>\n'  \
-                '    <Source>/{13}{0}/{1}</Source>\n'  \
-                '  </CachedSource>\n'  \
-                '  <Raster>\n'  \
-                '    <Size c="{12}" x="{8}" y="{9}"/>\n'  \
-                '    <PageSize c="1" x="512" y="512"/>\n'  \
-                '    <Compression>LERC</Compression>\n'  \
-                '    <DataType>{10}</DataType>\n'  \
-                '  <DataFile>z:/mrfcache/Geoscience/{14}/{7}.mrf_cache</DataFile><IndexFile>z:/mrfcache/Geoscience/{14}/{7}.mrf_cache</IndexFile></Raster>\n'  \
-                '  <Rsets model="uniform" scale="2"/>\n'  \
-                '  <GeoTags>\n'  \
-                '    <BoundingBox maxx="{2}" maxy="{3}" minx="{4}" miny="{5}"/>\n'  \
-                '    <Projection>{6}</Projection>\n'  \
-                '  </GeoTags>\n'  \
-                '  <Options>V2=ON</Options>\n'  \
-                '</MRF_META>'.format(inputDir, fileName, maxX, maxY, minX, minY, prjString, fileName[0:-4], nCols, nRows, dataType, tag, nBands, protocol, cachePath)
-
-        except Exception as exp:
-#            arcpy.AddMessage(str(exp))
-            raise Exception(str(exp))
-        return cachingMRF
+        return self.utils.referenceMRF(geoscienceMRF.profile(
+            cols=nCols, rows=nRows, dataType=dataType, nBands=nBands).latest(
+            protocol=protocol, inputDir=inputDir, cachePath=cachePath,
+            maxX=maxX, maxY=maxY, minX=minX, minY=minY,
+            projection=prjString).format(fileName=fileName, stem=fileName[0:-4]))
 
     # Fractional_cover embedded mrf should not have <data_type> line, hence a
     # separate method
@@ -406,30 +409,11 @@ class GeoscienceBuilder():
             nBands,
             protocol,
             cachePath):
-        try:
-            # create template for 10m resolution and write to a file
-            cachingMRF = \
-                '<MRF_META>\n'  \
-                '  <CachedSource>\n'  \
-                '    <Source>/{12}{0}/{1}</Source>\n'  \
-                '  </CachedSource>\n'  \
-                '  <Raster>\n'  \
-                '    <Size c="{11}" x="{8}" y="{9}"/>\n'  \
-                '    <PageSize c="1" x="512" y="512"/>\n'  \
-                '    <Compression>LERC</Compression>\n'  \
-                '  <DataFile>z:/mrfcache/Geoscience/{13}/{7}.mrf_cache</DataFile><IndexFile>z:/mrfcache/Geoscience/{13}/{7}.mrf_cache</IndexFile></Raster>\n'  \
-                '  <Rsets model="uniform" scale="2"/>\n'  \
-                '  <GeoTags>\n'  \
-                '    <BoundingBox maxx="{2}" maxy="{3}" minx="{4}" miny="{5}"/>\n'  \
-                '    <Projection>{6}</Projection>\n'  \
-                '  </GeoTags>\n'  \
-                '  <Options>V2=ON</Options>\n'  \
-                '</MRF_META>'.format(inputDir, fileName, maxX, maxY, minX, minY, prjString, fileName[0:-4], nCols, nRows, tag, nBands, protocol, cachePath)
-
-        except Exception as exp:
-#            arcpy.AddMessage(str(exp))
-            raise Exception(str(exp))
-        return cachingMRF
+        return self.utils.referenceMRF(fractionalCoverMRF.profile(
+            cols=nCols, rows=nRows, nBands=nBands).latest(
+            protocol=protocol, inputDir=inputDir, cachePath=cachePath,
+            maxX=maxX, maxY=maxY, minX=minX, minY=minY,
+            projection=prjString).format(fileName=fileName, stem=fileName[0:-4]))
 
     # Fetch the rows,cols
     def returnVals(self, path):
@@ -479,7 +463,7 @@ class GeoscienceBuilder():
                 yamldir = os.path.dirname(_yamlpath)
 
                 if (_yamlpath.startswith("http")):
-                    doc = self.utils.readYamlS3(_yamlpath)
+                    doc = self.utils.readDocument(_yamlpath)
                     if (
                             doc is None or 'image' not in doc or 'bands' not in doc['image']):
                         raise Exception('Err. Invalid input format!')
@@ -527,8 +511,7 @@ class GeoscienceBuilder():
                         spatialRef = doc['grid_spatial']['projection']['spatial_reference']
                         spatialIdx = spatialRef.find(':')
                         spatialId = int(spatialRef[spatialIdx + 1:])
-                        prjString = arcpy.SpatialReference(
-                            spatialId).exportToString()
+                        prjString = projectionService.exportToString(spatialId)
                         srsEPSG = spatialId
 
                         BE1 = self.embedMRF(
@@ -623,13 +606,7 @@ class GeoscienceBuilder():
                             cachePath)
 
                 elif (_yamlpath.startswith("s3:")):
-                    # giving a start index of 5 will ensure that the / from
-                    # s3:// is not returned.
-                    index = _yamlpath.find("/", 5)
-                    # First 5 letters will always be s3://
-                    bucketname = _yamlpath[5:index]
-                    key = _yamlpath[index + 1:]
-                    doc = self.utils.readYamlS3_boto3(bucketname, key)
+                    doc = self.utils.readDocument(_yamlpath)
                     if (
                             doc is None or 'image' not in doc or 'bands' not in doc['image']):
                         raise Exception('Err. Invalid input format!')
@@ -676,8 +653,7 @@ class GeoscienceBuilder():
                         spatialRef = doc['grid_spatial']['projection']['spatial_reference']
                         spatialIdx = spatialRef.find(':')
                         spatialId = int(spatialRef[spatialIdx + 1:])
-                        prjString = arcpy.SpatialReference(
-                            spatialId).exportToString()
+                        prjString = projectionService.exportToString(spatialId)
                         srsEPSG = spatialId
 
                         BE1 = self.embedMRF(
@@ -772,7 +748,7 @@ class GeoscienceBuilder():
                             cachePath)
 
                 else:
-                    doc = self.utils.readYaml(_yamlpath)
+                    doc = self.utils.readDocument(_yamlpath)
                     if (
                             doc is None or 'image' not in doc or 'bands' not in doc['image']):
                         raise Exception('Err. Invalid input format!')
@@ -799,8 +775,7 @@ class GeoscienceBuilder():
                         spatialRef = doc['grid_spatial']['projection']['spatial_reference']
                         spatialIdx = spatialRef.find(':')
                         spatialId = int(spatialRef[spatialIdx + 1:])
-                        prjString = arcpy.SpatialReference(
-                            spatialId).exportToString()
+                        prjString = projectionService.exportToString(spatialId)
                         srsEPSG = spatialId
 
                         BE1 = os.path.join(
@@ -877,7 +852,7 @@ class GeoscienceBuilder():
                 yamldir = os.path.dirname(_yamlpath)
 
                 if (_yamlpath.startswith("http")):
-                    doc = self.utils.readYamlS3(_yamlpath)
+                    doc = self.utils.readDocument(_yamlpath)
                     if (
                             doc is None or 'image' not in doc or 'bands' not in doc['image']):
                         raise Exception('Err. Invalid input format!')
@@ -900,8 +875,7 @@ class GeoscienceBuilder():
                     spatialRef = doc['grid_spatial']['projection']['spatial_reference']
                     spatialIdx = spatialRef.find(':')
                     spatialId = int(spatialRef[spatialIdx + 1:])
-                    prjString = arcpy.SpatialReference(
-                        spatialId).exportToString()
+                    prjString = projectionService.exportToString(spatialId)
                     srsEPSG = spatialId
 
                     if tag == 'fc':
@@ -1092,13 +1066,7 @@ class GeoscienceBuilder():
                         fileName = doc['image']['bands']['water']['path'][0:endIndex]
 
                 elif (_yamlpath.startswith("s3:")):
-                    # giving a start index of 5 will ensure that the / from
-                    # s3:// is not returned.
-                    index = _yamlpath.find("/", 5)
-                    # First 5 letters will always be s3://
-                    bucketname = _yamlpath[5:index]
-                    key = _yamlpath[index + 1:]
-                    doc = self.utils.readYamlS3_boto3(bucketname, key)
+                    doc = self.utils.readDocument(_yamlpath)
                     if (
                             doc is None or 'image' not in doc or 'bands' not in doc['image']):
                         raise Exception('Err. Invalid input format!')
@@ -1120,8 +1088,7 @@ class GeoscienceBuilder():
                     spatialRef = doc['grid_spatial']['projection']['spatial_reference']
                     spatialIdx = spatialRef.find(':')
                     spatialId = int(spatialRef[spatialIdx + 1:])
-                    prjString = arcpy.SpatialReference(
-                        spatialId).exportToString()
+                    prjString = projectionService.exportToString(spatialId)
                     srsEPSG = spatialId
 
                     if tag == 'fc':
@@ -1313,7 +1280,7 @@ class GeoscienceBuilder():
 
                 else:
 
-                    doc = self.utils.readYaml(_yamlpath)
+                    doc = self.utils.readDocument(_yamlpath)
                     if (
                             doc is None or 'image' not in doc or 'bands' not in doc['image']):
                         raise Exception('Err. Invalid input format!')
@@ -1329,8 +1296,7 @@ class GeoscienceBuilder():
                     spatialRef = doc['grid_spatial']['projection']['spatial_reference']
                     spatialIdx = spatialRef.find(':')
                     spatialId = int(spatialRef[spatialIdx + 1:])
-                    prjString = arcpy.SpatialReference(
-                        spatialId).exportToString()
+                    prjString = projectionService.exportToString(spatialId)
                     srsEPSG = spatialId
 
                     if tag == 'fc':
@@ -1771,6 +1737,7 @@ class GeoscienceBuilder():
             builtItem['keyProperties'] = metadata
             builtItemsList = list()
             builtItemsList.append(builtItem)
+            self.utils.recordBuild(itemURI)
             return builtItemsList
 
         except Exception as e:
@@ -1796,15 +1763,150 @@ class GeoscienceCrawler():
         if not self.filter:
             self.filter = '*.yaml'
 
+        if (crawlerProperties.get('metadataCachePath')):
+            self.utils.configureMetadataCache(
+                crawlerProperties['metadataCachePath'],
+                crawlerProperties.get('metadataCacheSizeMB', 512))
+        if (crawlerProperties.get('mrfSidecarPath')):
+            self.utils.configureMRFSidecars(crawlerProperties['mrfSidecarPath'])
+        s3ClientPool.configure(
+            crawlerProperties.get('s3MaxPoolConnections'),
+            crawlerProperties.get('s3RetryMode'),
+            crawlerProperties.get('s3MaxAttempts'))
+        httpTransport.configure(
+            crawlerProperties.get('httpPoolSize'),
+            crawlerProperties.get('httpConnectTimeout'),
+            crawlerProperties.get('httpReadTimeout'),
+            crawlerProperties.get('httpMaxRetries'),
+            crawlerProperties.get('httpBackoffFactor'))
+        self.prefetcher = MetadataPrefetcher(
+            self.utils,
+            crawlerProperties.get('prefetchDepth', 0),
+            crawlerProperties.get('prefetchWorkers', 4))
+        self.bulkFetcher = BulkMetadataFetcher(
+            self.utils,
+            crawlerProperties.get('bulkFetch', False),
+            crawlerProperties.get('bulkFetchPerHost', 8),
+            crawlerProperties.get('bulkFetchBatchSize', 256))
+        self.walker = DirectoryWalker(
+            self.filter,
+            crawlerProperties.get('walkWorkers', 8),
+            crawlerProperties.get('walkQueueSize', 1024))
+        self.crawlState = None
+        if (crawlerProperties.get('crawlStatePath')):
+            self.crawlState = self.utils.configureCrawlState(
+                crawlerProperties['crawlStatePath'],
+                crawlerProperties.get('crawlStateReportPath'))
+        self.manifestReader = ManifestReader(
+            crawlerProperties.get('manifestDocuments', True))
+        self.shardIndex = int(crawlerProperties.get('shardIndex', 0))
+        self.shardCount = int(crawlerProperties.get('shardCount', 1))
+        if (self.shardCount < 1 or not 0 <= self.shardIndex < self.shardCount):
+            raise Exception('Err. Invalid shard index or count!')
+        self.checkpoint = None
+        if (crawlerProperties.get('checkpointPath')):
+            self.checkpoint = CrawlCheckpoint(
+                crawlerProperties['checkpointPath'],
+                self.paths,
+                crawlerProperties.get('resume', False),
+                crawlerProperties.get('checkpointInterval', 0))
+            self.walker.walkWorkers = 1  # positions need a repeatable walk order
+        self.sceneFilter = SceneFilter(
+            crawlerProperties.get('startDate'),
+            crawlerProperties.get('endDate'),
+            crawlerProperties.get('bbox'),
+            crawlerProperties.get('maxCloudCover'),
+            crawlerProperties.get('platforms'))
+        self.deduplicator = None
+        if (crawlerProperties.get('deduplicate', False)):
+            self.deduplicator = Deduplicator(
+                crawlerProperties.get('dedupExactLimit'),
+                crawlerProperties.get('dedupBloomCapacity', 10000000),
+                crawlerProperties.get('dedupFalsePositiveRate', 0.0001))
+            if (self.checkpoint is not None):
+                self.checkpoint.attach(self.deduplicator)
+        self.listingCache = ListingCache(
+            crawlerProperties.get('listDirectories', False),
+            crawlerProperties.get('listingCacheSize', 4096),
+            crawlerProperties.get('listingBatchSize', 10000),
+            crawlerProperties.get('walkWorkers', 8))
+        # files rejected by getNextUri, counted per reason
+        reasons = ('unknownTag', 'noProductName', 'checkpoint')
+        self.skipped = OrderedDict((reason, 0) for reason in reasons)
+        self.skipSeconds = OrderedDict((reason, 0.0) for reason in reasons)
         try:
-            self.pathGenerator = self.createGenerator()
+            self.pathGenerator = self.createPathGenerator()
 
         except StopIteration:
             return None
 
+    def createPathGenerator(self):
+        # chains the path generator with the optional crawl stages
+        paths = self.createGenerator()
+        if (self.checkpoint is not None):
+            paths = self.checkpoint.track(paths)
+        if (self.deduplicator is not None):
+            paths = self.deduplicator.select(paths, self.deduplicator.normalizePath, 'path')
+        paths = self.prefetcher.prefetch(
+            self.skipUnchanged(self.selectShard(paths)))
+        paths = self.sceneFilter.select(paths, self.utils.getSceneProperties)
+        if (self.deduplicator is not None):
+            paths = self.deduplicator.select(paths, self.utils.getSceneId, 'id')
+        if (self.checkpoint is not None):
+            paths = self.checkpoint.follow(paths)
+        return paths
+
+    def iterInputs(self):
+        if (self.checkpoint is None):
+            return iter(self.paths)
+        return self.checkpoint.iterInputs(self.paths)
+
+    def getCrawlScope(self):
+        # the inputs whose scenes are compared between crawls
+        scope = ';'.join(self.paths)
+        if (self.shardCount > 1):
+            scope += '#{0}/{1}'.format(self.shardIndex, self.shardCount)
+        return scope
+
+    def selectShard(self, paths):
+        # keeps the paths of this crawler's shard. Shards are chosen by a\
+        # stable hash of the scene path, so workers given the same input and\
+        # shardCount ingest disjoint subsets without coordination, and all\
+        # tags of a scene stay on the shard of its path.
+        if (self.shardCount <= 1):
+            return paths
+        return (path for path in paths if self.getShard(path) == self.shardIndex)
+
+    def getShard(self, path):
+        key = path
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        return int(digest, 16) % self.shardCount
+
+    def skipUnchanged(self, paths):
+        # with a crawl state store, only new or changed scenes are yielded
+        if (self.crawlState is None):
+            return paths
+        return self.crawlState.skipUnchanged(
+            paths, self.getCrawlScope(), list(self.createTagGenerator()), self.utils.statScene,
+            self.checkpoint.runId if self.checkpoint is not None else None)
+
+    def countSkip(self, reason, started):
+        self.skipped[reason] += 1
+        self.skipSeconds[reason] += time.time() - started
+
+    def getSkipStats(self):
+        return dict((reason, {'count': self.skipped[reason],
+                              'seconds': round(self.skipSeconds[reason], 3)})
+                    for reason in self.skipped)
+
     def createGenerator(self):
-        for path in self.paths:
-            if (path.startswith("http") or (path.startswith("s3"))):
+        for path in self.iterInputs():
+            if (path.startswith("s3") and path.endswith("/")):
+                # s3://bucket/prefix/ inputs are listed like directories
+                for filename in self.walker.walkS3(path, self.recurse, 'http://{0}.s3.amazonaws.com/{1}'):
+                    yield filename
+
+            elif (path.startswith("http") or (path.startswith("s3"))):
                 yield path
 
             elif (not os.path.exists(path)):
@@ -1812,16 +1914,17 @@ class GeoscienceCrawler():
 
             elif (os.path.isdir(path)):
                 if (self.recurse):
-                    for root, dirs, files in (os.walk(path)):
-                        for file in (files):
-                            if (file.endswith(".yaml")):
-                                filename = os.path.join(root, file)
-                                yield filename
+                    for filename in self.walker.walk(path):
+                        yield filename
                 else:
                     filter_to_scan = path + os.path.sep + self.filter
                     for filename in glob.glob(filter_to_scan):
                         yield filename
 
+            elif (self.manifestReader.isManifest(path)):
+                for filename in self.manifestReader.read(path):
+                    yield filename
+
             elif (path.endswith(".csv")):
                 with open(path, 'r') as csvfile:
                     reader = csv.reader(csvfile)
@@ -1836,14 +1939,14 @@ class GeoscienceCrawler():
                     if (rasterFieldIndex == -1):
                         csvfile.seek(0)
                         rasterFieldIndex = 0
-                    for row in reader:
-                        filename = row[rasterFieldIndex]
-                        filename = filename.rstrip()
-                        if (filename.startswith("http")
-                                ):  # if the csv list contains a list of s3 urls
-                            yield filename
-                        elif (filename.endswith(".yaml") and os.path.exists(filename)):
-                            yield filename
+                    rows = self.selectShard(
+                        (row[rasterFieldIndex].rstrip() for row in reader))
+                    # csv lists of http urls are kept, local documents must exist
+                    filenames = (filename for filename in self.bulkFetcher.fetchAll(rows)
+                                 if filename.startswith("http") or
+                                 (filename.endswith(".yaml") and not filename.startswith("s3")))
+                    for filename in self.listingCache.select(filenames):
+                        yield filename
             elif (path.endswith(".yaml")):
                 yield path
 
@@ -1855,27 +1958,37 @@ class GeoscienceCrawler():
         return self.getNextUri()
 
     def getNextUri(self):
+        # unusable files are skipped in a loop, so any number of them in a\
+        # row can be crawled
+        while True:
+            try:
+                self.curPath = next(self.pathGenerator)
+            except StopIteration:
+                return None
 
-        try:
-            self.curPath = next(self.pathGenerator)
+            # If the productName or tag was not found for the file, we move\
+            # on to the next item
+            started = time.time()
             productName = self.utils.getProductName(self.curPath)
-            curTag = self.utils.getTag(productName)
-
-            # If the tag or productName was not found in the metadata file or\
-            # there was some exception raised, we move on to the next item
-            if curTag is None or productName is None:
-                return self.getNextUri()
+            if productName is None:
+                self.countSkip('noProductName', started)
+                continue
 
-        except StopIteration:
-            return None
+            curTag = self.utils.getTag(productName)
+            if curTag is None:
+                self.countSkip('unknownTag', started)
+                continue
 
-        uri = {
-            'path': self.curPath,
-            'displayName': os.path.splitext(os.path.basename(self.curPath))[0],
-            'tag': curTag,
-            'groupName': os.path.split(os.path.dirname(self.curPath))[1],
-            'productName': productName,
-            'uriProperties': {'rpflag': self.rpFlag}
-        }
+            uri = {
+                'path': self.curPath,
+                'displayName': os.path.splitext(os.path.basename(self.curPath))[0],
+                'tag': curTag,
+                'groupName': os.path.split(os.path.dirname(self.curPath))[1],
+                'productName': productName,
+                'uriProperties': {'rpflag': self.rpFlag}
+            }
 
-        return uri
+            if (self.checkpoint is not None and not self.checkpoint.emit(uri['tag'])):
+                self.countSkip('checkpoint', started)
+                continue  # emitted before the crawl was interrupted
+            return uri
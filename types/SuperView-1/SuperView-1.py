@@ -24,16 +24,31 @@
 # !/usr/bin/env python
 
 import os
+import sys
 import arcpy
 import glob
 import csv
+import hashlib
 import math
+import time
+from collections import OrderedDict
 
 try:
     import xml.etree.cElementTree as ET
 except ImportError:
     import xml.etree.ElementTree as ET
 
+# the crawler and builder infrastructure shared by the raster types lives\
+# in rasterTypeUtils.py, deployed next to the raster type or found in the\
+# types/common folder of the repository
+commonPath = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'common')
+if (os.path.isdir(commonPath) and commonPath not in sys.path):
+    sys.path.append(commonPath)
+from rasterTypeUtils import (
+    BaseUtilities, CrawlCheckpoint, Deduplicator, DirectoryWalker,
+    ListingCache, SceneFilter, projectionService)
+
 
 class DataSourceType():
     Unknown = 0
@@ -179,7 +194,7 @@ class RasterTypeFactory():
 # Utility functions used by the Builder and Crawler classes
 # ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
 
-class Utilities():
+class Utilities(BaseUtilities):
 
     # checks if input data is from SuperView
     def isSuperView1(self, path):
@@ -208,7 +223,7 @@ class Utilities():
         dataFile.close()
         return isSV1
 
-    def __getTagFromTree(self, tree):
+    def getTagFromTree(self, tree):
         # metadata has one parent root with all relevant metadata under it, hence\
         # taking the root
         try:
@@ -228,15 +243,20 @@ class Utilities():
             return None
         return None
 
-    def getTag(self, path):
-        # get tag by parsing the data tree
+    def parseMetadata(self, path):
         try:
-            tree = ET.parse(path)
+            return ET.parse(path)
         except ET.ParseError as e:
             print("Exception while parsing {0}\n{1}".format(path, e))
             return None
 
-        return self.__getTagFromTree(tree)
+    def getTag(self, path):
+        # get tag by parsing the data tree
+        tree = self.parseMetadata(path)
+        if tree is None:
+            return None
+
+        return self.getTagFromTree(tree)
 
     def getProductName(self, tree):
          # returns product level- 1B/2A/3A
@@ -252,14 +272,35 @@ class Utilities():
 
     def getProductNameFromFile(self, path):
         # Get product name (level)
-        try:
-            tree = ET.parse(path)
-        except ET.ParseError as e:
-            print("Exception while parsing {0}\n{1}".format(path, e))
+        tree = self.parseMetadata(path)
+        if tree is None:
             return None
 
         return self.getProductName(tree)
 
+    # acquisition date, WGS84 bounding box, cloud cover and platform of a\
+    # scene for the crawler filters, None where the metadata has no value
+    def getSceneProperties(self, path):
+        root = ET.parse(path).getroot()
+
+        def value(name):
+            node = root.find(name)
+            return node.text if node is not None else None
+
+        corners = ('TopLeft', 'TopRight', 'BottomRight', 'BottomLeft')
+        lats = [value(corner + 'Latitude') for corner in corners]
+        lons = [value(corner + 'Longitude') for corner in corners]
+        bbox = None
+        if (None not in lats and None not in lons):
+            lats = [float(lat) for lat in lats]
+            lons = [float(lon) for lon in lons]
+            bbox = (min(lons), min(lats), max(lons), max(lats))
+        return {
+            'date': value('CenterTime'),
+            'platform': value('SatelliteID'),
+            'bbox': bbox,
+            'cloudCover': value('CloudPercent')}
+
 
 # ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
 # SuperView builder class
@@ -333,7 +374,7 @@ class SuperView1Builder():
                 fileName = os.path.splitext(path)[0] + '.tiff'
                 fullPath = os.path.join(os.path.dirname(path), fileName)
 
-                wgsSrs = arcpy.SpatialReference(4326)
+                wgsSrs = projectionService.getSpatialReference(4326)
                 # Dataset frame - footprint; this is a list of Vertex
                 # coordinates
                 vertex_array = arcpy.Array()
@@ -418,8 +459,7 @@ class SuperView1Builder():
 
                         # eg. WGS 1984 UTM 39N
                         prjStr = 'WGS 1984 UTM zone ' + utmZone
-                        utmSpatialRef = arcpy.SpatialReference(prjStr)
-                        srsEPSG = utmSpatialRef.PCSCode
+                        srsEPSG = projectionService.getPCSCode(prjStr)
 
                         # rasterInfo footprint for L2A
                         minX = root.find('TopLeftMapX')
@@ -799,6 +839,7 @@ class SuperView1Builder():
 
             builtItemsList = list()
             builtItemsList.append(builtItem)
+            self.utilities.recordBuild(itemURI)
             return builtItemsList
 
         except BaseException:
@@ -819,29 +860,127 @@ class SuperView1Crawler():
         self.filter = crawlerProperties['filter']
         if not self.filter:
             self.filter = 'SV*.xml;SW*.dim'
+        self.walker = DirectoryWalker(
+            self.filter,
+            crawlerProperties.get('walkWorkers', 8),
+            crawlerProperties.get('walkQueueSize', 1024))
+        self.crawlState = None
+        if (crawlerProperties.get('crawlStatePath')):
+            self.crawlState = self.utils.configureCrawlState(
+                crawlerProperties['crawlStatePath'],
+                crawlerProperties.get('crawlStateReportPath'))
+        self.shardIndex = int(crawlerProperties.get('shardIndex', 0))
+        self.shardCount = int(crawlerProperties.get('shardCount', 1))
+        if (self.shardCount < 1 or not 0 <= self.shardIndex < self.shardCount):
+            raise Exception('Err. Invalid shard index or count!')
+        self.checkpoint = None
+        if (crawlerProperties.get('checkpointPath')):
+            self.checkpoint = CrawlCheckpoint(
+                crawlerProperties['checkpointPath'],
+                self.paths,
+                crawlerProperties.get('resume', False),
+                crawlerProperties.get('checkpointInterval', 0))
+            self.walker.walkWorkers = 1  # positions need a repeatable walk order
+        self.sceneFilter = SceneFilter(
+            crawlerProperties.get('startDate'),
+            crawlerProperties.get('endDate'),
+            crawlerProperties.get('bbox'),
+            crawlerProperties.get('maxCloudCover'),
+            crawlerProperties.get('platforms'))
+        self.deduplicator = None
+        if (crawlerProperties.get('deduplicate', False)):
+            self.deduplicator = Deduplicator(
+                crawlerProperties.get('dedupExactLimit'),
+                crawlerProperties.get('dedupBloomCapacity', 10000000),
+                crawlerProperties.get('dedupFalsePositiveRate', 0.0001))
+            if (self.checkpoint is not None):
+                self.checkpoint.attach(self.deduplicator)
+        self.listingCache = ListingCache(
+            crawlerProperties.get('listDirectories', False),
+            crawlerProperties.get('listingCacheSize', 4096),
+            crawlerProperties.get('listingBatchSize', 10000),
+            crawlerProperties.get('walkWorkers', 8))
+        # files rejected by getNextUri, counted per reason
+        reasons = ('parseError', 'unknownTag', 'noProductName', 'checkpoint')
+        self.skipped = OrderedDict((reason, 0) for reason in reasons)
+        self.skipSeconds = OrderedDict((reason, 0.0) for reason in reasons)
         try:
-            self.pathGenerator = self.createGenerator()
+            self.pathGenerator = self.createPathGenerator()
 
         except StopIteration:
             return None
 
+    def createPathGenerator(self):
+        # chains the path generator with the optional crawl stages
+        paths = self.createGenerator()
+        if (self.checkpoint is not None):
+            paths = self.checkpoint.track(paths)
+        if (self.deduplicator is not None):
+            paths = self.deduplicator.select(paths, self.deduplicator.normalizePath, 'path')
+        paths = self.skipUnchanged(self.selectShard(paths))
+        paths = self.sceneFilter.select(paths, self.utils.getSceneProperties)
+        if (self.checkpoint is not None):
+            paths = self.checkpoint.follow(paths)
+        return paths
+
+    def iterInputs(self):
+        if (self.checkpoint is None):
+            return iter(self.paths)
+        return self.checkpoint.iterInputs(self.paths)
+
+    def getCrawlScope(self):
+        # the inputs whose scenes are compared between crawls
+        scope = ';'.join(self.paths)
+        if (self.shardCount > 1):
+            scope += '#{0}/{1}'.format(self.shardIndex, self.shardCount)
+        return scope
+
+    def selectShard(self, paths):
+        # keeps the paths of this crawler's shard. Shards are chosen by a\
+        # stable hash of the scene path, so workers given the same input and\
+        # shardCount ingest disjoint subsets without coordination, and all\
+        # tags of a scene stay on the shard of its path.
+        if (self.shardCount <= 1):
+            return paths
+        return (path for path in paths if self.getShard(path) == self.shardIndex)
+
+    def getShard(self, path):
+        # MUX and PAN files of a scene are hashed alike so that the pair used\
+        # for pansharpening lands on the same shard
+        key = path.replace('PAN', 'MUX')
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        return int(digest, 16) % self.shardCount
+
+    def skipUnchanged(self, paths):
+        # with a crawl state store, only new or changed scenes are yielded
+        if (self.crawlState is None):
+            return paths
+        return self.crawlState.skipUnchanged(
+            paths, self.getCrawlScope(), None, self.utils.statScene,
+            self.checkpoint.runId if self.checkpoint is not None else None)
+
+    def countSkip(self, reason, started):
+        self.skipped[reason] += 1
+        self.skipSeconds[reason] += time.time() - started
+
+    def getSkipStats(self):
+        return dict((reason, {'count': self.skipped[reason],
+                              'seconds': round(self.skipSeconds[reason], 3)})
+                    for reason in self.skipped)
+
     def createGenerator(self):
         fileFilter = self.filter.split(';')
         fileFilter = list(filter(None, fileFilter))
 
-        for path in self.paths:
+        for path in self.iterInputs():
             if not os.path.exists(path):
                 continue
 
             # handles paths with different folder levels
             if os.path.isdir(path):
                 if self.recurse:
-                    for root, dirs, files in (os.walk(path)):
-                        for file in (files):
-                            if file.endswith(fileFilter[0][1:]) or file.endswith(
-                                    fileFilter[1][1:]):
-                                filename = os.path.join(root, file)
-                                yield filename
+                    for filename in self.walker.walk(path):
+                        yield filename
                 else:
                     for filterToScan in fileFilter:
                         filter_to_scan = path + os.path.sep + filterToScan
@@ -865,11 +1004,11 @@ class SuperView1Crawler():
                         csvfile.seek(0)
                         rasterFieldIndex = 0
 
-                    for row in reader:
-                        filename = row[rasterFieldIndex]
-                        if (filename.endswith(fileFilter[0][1:]) or file.endswith(
-                                fileFilter[1][1:])) and os.path.exists(filename):
-                            yield filename
+                    rows = (row[rasterFieldIndex] for row in reader)
+                    for filename in self.listingCache.select(
+                            filename for filename in rows
+                            if self.walker.matches(os.path.basename(filename))):
+                        yield filename
 
             elif path.endswith(fileFilter[0][1:]) or path.endswith(fileFilter[1][1:]):
                 paths = [path]
@@ -896,26 +1035,41 @@ class SuperView1Crawler():
         return self.getNextUri()
 
     def getNextUri(self):
+        # unusable files are skipped in a loop, so any number of them in a\
+        # row can be crawled
+        while True:
+            try:
+                self.curPath = next(self.pathGenerator)
+            except StopIteration:
+                return None
 
-        try:
-            self.curPath = next(self.pathGenerator)
-            curTag = self.utils.getTag(self.curPath)
-            productName = self.utils.getProductNameFromFile(self.curPath)
+            started = time.time()
+            tree = self.utils.parseMetadata(self.curPath)
+            if tree is None:
+                self.countSkip('parseError', started)
+                continue
 
-            # If the tag or productName was not found in the metadata file or\
-            # there was some exception raised, we move on to the next item
-            if curTag is None or productName is None:
-                return self.getNextUri()
+            # If the tag or productName was not found in the metadata file, we\
+            # move on to the next item
+            curTag = self.utils.getTagFromTree(tree)
+            if curTag is None:
+                self.countSkip('unknownTag', started)
+                continue
 
-        except StopIteration:
-            return None
+            productName = self.utils.getProductName(tree)
+            if productName is None:
+                self.countSkip('noProductName', started)
+                continue
 
-        uri = {
-            'path': self.curPath,
-            'displayName': os.path.splitext(os.path.basename(self.curPath))[0],
-            'tag': curTag,
-            'groupName': os.path.split(os.path.dirname(self.curPath))[1],
-            'productName': productName
-        }
+            uri = {
+                'path': self.curPath,
+                'displayName': os.path.splitext(os.path.basename(self.curPath))[0],
+                'tag': curTag,
+                'groupName': os.path.split(os.path.dirname(self.curPath))[1],
+                'productName': productName
+            }
 
-        return uri
+            if (self.checkpoint is not None and not self.checkpoint.emit(uri['tag'])):
+                self.countSkip('checkpoint', started)
+                continue  # emitted before the crawl was interrupted
+            return uri
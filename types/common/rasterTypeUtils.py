@@ -0,0 +1,1756 @@
+# ------------------------------------------------------------------------------
+# Copyright 2018 Esri
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+# Name: rasterTypeUtils
+# Description: Crawler and builder infrastructure shared by the python raster types.
+# Version: 20190925
+# Requirements: python.exe v2.7 and above, standard python libraries, python yaml library(https://pyyaml.org/wiki/PyYAMLDocumentation), ArcMap , python requests module , python boto3 module
+# Required Arguments:  N/A
+# Optional Arguments: N/A
+# Usage: Imported by the python raster types. Deploy it next to a raster type,\
+# or keep the types/common folder beside the raster type folders.
+# Author: Esri Imagery Workflows Team
+# ------------------------------------------------------------------------------
+
+import os
+import arcpy
+import gzip
+import fnmatch
+import hashlib
+import json
+import math
+import pickle
+import re
+import sqlite3
+import threading
+import time
+import requests
+from collections import OrderedDict, deque
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+try:
+    import yaml
+    import boto3
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+except ImportError as e:
+    raise
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue  # python 2.7
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir  # python 2.7 backport
+    except ImportError:
+        scandir = None
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Persistent metadata cache shared by the Builder and Crawler classes
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class MetadataCache():
+
+    # Optional on-disk cache of parsed yaml documents backed by sqlite. Local\
+    # documents are validated against their mtime and size, remote ones\
+    # against the ETag/Last-Modified returned by the server, so a re-crawl only\
+    # downloads and parses metadata that changed. Least recently used entries\
+    # are evicted once the size budget is exceeded. The total size is kept\
+    # up to date in memory and the access times of cache hits are committed\
+    # in batches, so neither costs a query or a disk sync per document.
+    def __init__(self, path, maxSizeMB=512):
+        self.path = path
+        self.maxBytes = int(float(maxSizeMB) * 1024 * 1024)
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS docs (key TEXT PRIMARY KEY, validator TEXT, doc BLOB, size INTEGER, accessed REAL)')
+        self._db.execute(
+            'CREATE INDEX IF NOT EXISTS docs_accessed ON docs (accessed)')
+        self._db.commit()
+        self.totalBytes = self._db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM docs').fetchone()[0]
+
+    def localValidator(self, path):
+        stat = os.stat(path)
+        return '{0}:{1}'.format(repr(stat.st_mtime), stat.st_size)
+
+    def remoteValidator(self, etag, lastModified):
+        if (etag):
+            return 'etag:' + etag
+        if (lastModified):
+            return 'lm:' + lastModified
+        return None
+
+    def conditionalHeaders(self, validator):
+        if (validator.startswith('etag:')):
+            return {'If-None-Match': validator[5:]}
+        if (validator.startswith('lm:')):
+            return {'If-Modified-Since': validator[3:]}
+        return {}
+
+    def getEntry(self, key):
+        with self._lock:
+            row = self._db.execute(
+                'SELECT validator, doc FROM docs WHERE key = ?', (key,)).fetchone()
+        if (row is None):
+            return None
+        try:
+            return row[0], pickle.loads(bytes(row[1]))
+        except BaseException:
+            return None  # written by an incompatible python, refetch it
+
+    def get(self, key, validator):
+        entry = self.getEntry(key)
+        if (entry is None or entry[0] != validator):
+            return None
+        self.touch(key)
+        return entry[1]
+
+    def touch(self, key):
+        with self._lock:
+            self._db.execute(
+                'UPDATE docs SET accessed = ? WHERE key = ?', (time.time(), key))
+            self.commit(False)
+
+    def put(self, key, validator, doc):
+        if (doc is None or validator is None):
+            return
+        data = pickle.dumps(doc, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            row = self._db.execute(
+                'SELECT size FROM docs WHERE key = ?', (key,)).fetchone()
+            if (row is not None):
+                self.totalBytes -= row[0]  # replaced
+            self._db.execute('INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?)',
+                             (key, validator, sqlite3.Binary(data), len(data), time.time()))
+            self.totalBytes += len(data)
+            while (self.totalBytes > self.maxBytes):
+                row = self._db.execute(
+                    'SELECT key, size FROM docs ORDER BY accessed LIMIT 1').fetchone()
+                if (row is None):
+                    break
+                self._db.execute('DELETE FROM docs WHERE key = ?', (row[0],))
+                self.totalBytes -= row[1]
+            self.commit(True)
+
+    def commit(self, force):
+        # batches the access time updates of cache hits, callers hold the lock
+        self._writes += 1
+        if (force or self._writes >= 256):
+            self._db.commit()
+            self._writes = 0
+
+
+metadataCache = None
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Parsed metadata cache shared by the Builder and Crawler classes
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class DocumentCache():
+
+    # Bounded LRU of parsed yaml documents keyed by path. It hands documents\
+    # read ahead by the crawler to the builder and keeps a scene from being\
+    # fetched and parsed again for each of its tags.
+    def __init__(self, maxSize=64):
+        self.maxSize = maxSize
+        self._docs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        with self._lock:
+            doc = self._docs.pop(path, None)
+            if (doc is not None):
+                self._docs[path] = doc  # move to the most recently used end
+            return doc
+
+    def put(self, path, doc):
+        if (doc is None):
+            return
+        with self._lock:
+            self._docs.pop(path, None)
+            self._docs[path] = doc
+            while (len(self._docs) > self.maxSize):
+                self._docs.popitem(last=False)
+
+    def resize(self, maxSize):
+        with self._lock:
+            self.maxSize = max(1, int(maxSize))
+            while (len(self._docs) > self.maxSize):
+                self._docs.popitem(last=False)
+
+
+documentCache = DocumentCache()
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Pooled S3 client shared by the Builder and Crawler classes
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class S3ClientPool():
+
+    # Lazily creates one thread-safe boto3 client per process. Creating a\
+    # client resolves credentials, loads the endpoint model and sets up a new\
+    # connection pool, which used to be paid again for every document.
+    def __init__(self, maxPoolConnections=10, retryMode='standard', maxAttempts=3):
+        self.maxPoolConnections = maxPoolConnections
+        self.retryMode = retryMode
+        self.maxAttempts = maxAttempts
+        self._client = None
+        self._lock = threading.Lock()
+
+    def configure(self, maxPoolConnections=None, retryMode=None, maxAttempts=None):
+        with self._lock:
+            settings = (self.maxPoolConnections, self.retryMode, self.maxAttempts)
+            if (maxPoolConnections):
+                self.maxPoolConnections = int(maxPoolConnections)
+            if (retryMode):
+                self.retryMode = retryMode
+            if (maxAttempts):
+                self.maxAttempts = int(maxAttempts)
+            if (settings != (self.maxPoolConnections, self.retryMode, self.maxAttempts)):
+                self._client = None  # recreated with the new settings on next use
+
+    def getClient(self):
+        client = self._client
+        if (client is None):
+            with self._lock:
+                if (self._client is None):
+                    config = Config(
+                        max_pool_connections=self.maxPoolConnections,
+                        retries={'mode': self.retryMode, 'max_attempts': self.maxAttempts})
+                    self._client = boto3.client('s3', config=config)
+                client = self._client
+        return client
+
+
+s3ClientPool = S3ClientPool()
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Pooled HTTP transport shared by the Builder and Crawler classes
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class HttpTransport():
+
+    # Lazily creates one keep-alive requests.Session per process with a\
+    # bounded connection pool per host, connect/read timeouts and retries with\
+    # exponential backoff, so a stalled request can no longer hang the ingest.
+    def __init__(self, poolSize=10, connectTimeout=10, readTimeout=60, maxRetries=3, backoffFactor=0.5):
+        self.poolSize = poolSize
+        self.connectTimeout = connectTimeout
+        self.readTimeout = readTimeout
+        self.maxRetries = maxRetries
+        self.backoffFactor = backoffFactor
+        self._session = None
+        self._lock = threading.Lock()
+
+    def configure(self, poolSize=None, connectTimeout=None, readTimeout=None, maxRetries=None, backoffFactor=None):
+        with self._lock:
+            settings = (self.poolSize, self.connectTimeout, self.readTimeout,
+                        self.maxRetries, self.backoffFactor)
+            if (poolSize):
+                self.poolSize = int(poolSize)
+            if (connectTimeout):
+                self.connectTimeout = float(connectTimeout)
+            if (readTimeout):
+                self.readTimeout = float(readTimeout)
+            if (maxRetries is not None):
+                self.maxRetries = int(maxRetries)
+            if (backoffFactor is not None):
+                self.backoffFactor = float(backoffFactor)
+            if (settings != (self.poolSize, self.connectTimeout, self.readTimeout,
+                             self.maxRetries, self.backoffFactor)):
+                self._session = None  # recreated with the new settings on next use
+
+    def getSession(self):
+        session = self._session
+        if (session is None):
+            with self._lock:
+                if (self._session is None):
+                    retries = Retry(
+                        total=self.maxRetries,
+                        backoff_factor=self.backoffFactor,
+                        status_forcelist=(429, 500, 502, 503, 504))
+                    adapter = HTTPAdapter(
+                        pool_connections=self.poolSize,
+                        pool_maxsize=self.poolSize,
+                        max_retries=retries)
+                    self._session = requests.Session()
+                    self._session.mount('http://', adapter)
+                    self._session.mount('https://', adapter)
+                session = self._session
+        return session
+
+    def head(self, url):
+        page = self.getSession().head(
+            url, allow_redirects=True, timeout=(self.connectTimeout, self.readTimeout))
+        if (page.status_code >= 400):
+            page.raise_for_status()
+        return page
+
+    def get(self, url, headers=None):
+        page = self.getSession().get(
+            url, headers=headers, timeout=(self.connectTimeout, self.readTimeout))
+        if (page.status_code >= 400):
+            page.raise_for_status()
+        return page
+
+
+httpTransport = HttpTransport()
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Metadata read-ahead between the Crawler and Builder classes
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class MetadataPrefetcher():
+
+    # Fetches and parses the documents of the next paths yielded by a path\
+    # generator on a bounded thread pool while earlier items are being built.\
+    # Paths are handed on in their original order once their document is in\
+    # the document cache. 'depth' is the number of documents read ahead of\
+    # the path handed on, so a depth of 1 fetches the next document while\
+    # the current one is built, and it gives backpressure on the generator.
+    def __init__(self, utils, depth=0, workers=4):
+        self.utils = utils
+        self.depth = int(depth or 0)
+        self.workers = max(1, int(workers or 1))
+        if (self.depth > 0):
+            documentCache.resize(max(documentCache.maxSize, (self.depth + 1) * 2))
+
+    def fetch(self, path):
+        try:
+            self.utils.readDocument(path)
+        except BaseException:
+            pass  # the builder reads the document again and reports the error
+
+    def prefetch(self, paths):
+        if (self.depth <= 0 or ThreadPoolExecutor is None):
+            for path in paths:
+                yield path
+            return
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for path in paths:
+                pending.append((path, executor.submit(self.fetch, path)))
+                if (len(pending) > self.depth):
+                    path, future = pending.popleft()
+                    future.result()
+                    yield path
+            while (pending):
+                path, future = pending.popleft()
+                future.result()
+                yield path
+        finally:
+            executor.shutdown(wait=False)
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Bulk metadata fetch for CSV manifests
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class BulkMetadataFetcher():
+
+    # Fetches the remote metadata documents listed in a CSV manifest\
+    # concurrently, driven by an asyncio event loop over one bounded thread\
+    # pool per host, which caps the requests in flight against each host.\
+    # Rows are taken in batches so memory stays bounded on very large\
+    # manifests, and every batch is handed on in manifest order once its\
+    # documents are in the document cache.
+    def __init__(self, utils, enabled=False, perHostConcurrency=8, batchSize=256):
+        self.utils = utils
+        self.enabled = bool(enabled) and asyncio is not None and ThreadPoolExecutor is not None
+        self.perHostConcurrency = max(1, int(perHostConcurrency or 1))
+        self.batchSize = max(1, int(batchSize or 1))
+        if (self.enabled):
+            documentCache.resize(max(documentCache.maxSize, self.batchSize * 2))
+
+    def getHost(self, path):
+        if (path.startswith("s3:")):
+            return path[5:path.find("/", 5)]  # one pool per bucket
+        return path.split("/")[2]
+
+    def fetch(self, path):
+        try:
+            self.utils.readDocument(path)
+        except BaseException:
+            pass  # the builder reads the document again and reports the error
+
+    def fetchBatch(self, batch):
+        remote = [path for path in batch if path.startswith("http") or path.startswith("s3")]
+        if (not remote):
+            return
+        executors = {}
+        loop = asyncio.new_event_loop()
+        try:
+            futures = []
+            for path in remote:
+                host = self.getHost(path)
+                if (host not in executors):
+                    executors[host] = ThreadPoolExecutor(
+                        max_workers=self.perHostConcurrency)
+                futures.append(loop.run_in_executor(executors[host], self.fetch, path))
+            loop.run_until_complete(asyncio.gather(*futures))
+        finally:
+            loop.close()
+            for executor in executors.values():
+                executor.shutdown(wait=True)
+
+    def fetchAll(self, paths):
+        if (not self.enabled):
+            for path in paths:
+                yield path
+            return
+        batch = []
+        for path in paths:
+            batch.append(path)
+            if (len(batch) >= self.batchSize):
+                self.fetchBatch(batch)
+                for path in batch:
+                    yield path
+                batch = []
+        self.fetchBatch(batch)
+        for path in batch:
+            yield path
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Memoized spatial references shared by the Builder classes
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class ProjectionService():
+
+    # Bounded LRU of spatial references keyed by EPSG code or name. A\
+    # collection spans only a handful of UTM zones, so the WKT string and\
+    # PCS code of a zone are resolved through arcpy once and reused for\
+    # every scene and tag. spatialReference can be replaced by a stand-in\
+    # with the arcpy.SpatialReference interface.
+    def __init__(self, maxSize=64, spatialReference=None):
+        self.maxSize = maxSize
+        self.spatialReference = spatialReference
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, maxSize=None, spatialReference=None):
+        with self._lock:
+            if (spatialReference is not None):
+                self.spatialReference = spatialReference
+                self._entries.clear()
+            if (maxSize is not None):
+                self.maxSize = max(1, int(maxSize))
+                while (len(self._entries) > self.maxSize):
+                    self._entries.popitem(last=False)
+
+    def lookup(self, key, attribute):
+        entryKey = (key, attribute)
+        with self._lock:
+            if (entryKey in self._entries):
+                value = self._entries.pop(entryKey)
+                self._entries[entryKey] = value  # move to the most recently used end
+                self.hits += 1
+                return value
+            self.misses += 1
+        if (attribute == 'spatialReference'):
+            value = self.createSpatialReference(key)
+        elif (attribute == 'wkt'):
+            value = self.getSpatialReference(key).exportToString()
+        else:
+            value = self.getSpatialReference(key).PCSCode
+        with self._lock:
+            self._entries[entryKey] = value
+            while (len(self._entries) > self.maxSize):
+                self._entries.popitem(last=False)
+        return value
+
+    def createSpatialReference(self, key):
+        if (self.spatialReference is not None):
+            return self.spatialReference(key)
+        return arcpy.SpatialReference(key)
+
+    def getSpatialReference(self, key):
+        return self.lookup(key, 'spatialReference')
+
+    def exportToString(self, key):
+        return self.lookup(key, 'wkt')
+
+    def getPCSCode(self, key):
+        return self.lookup(key, 'pcs')
+
+    def getStats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self._entries)}
+
+
+projectionService = ProjectionService()
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Parallel directory walk for recursive crawls
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class DirectoryWalker():
+
+    # Recursive directory walk for the crawler. Local directories are listed\
+    # with scandir, s3://bucket/prefix/ inputs with paginated list_objects_v2\
+    # split on their common prefixes. Directories are fanned out across a\
+    # thread pool, names are matched against the compiled crawler filter\
+    # (using the DirEntry type info, no stat per file), and matches are\
+    # streamed through a bounded queue so the walk never runs far ahead of\
+    # the builder. Local walks fall back to a serial os.walk when scandir or\
+    # concurrent.futures is unavailable.
+    def __init__(self, fileFilter, walkWorkers=8, walkQueueSize=1024):
+        patterns = [p for p in (fileFilter or '*').split(';') if p]
+        self.patterns = [re.compile(fnmatch.translate(os.path.normcase(p)))
+                         for p in patterns]
+        self.walkWorkers = max(1, int(walkWorkers))
+        self.walkQueueSize = max(1, int(walkQueueSize))
+
+    def matches(self, name):
+        name = os.path.normcase(name)
+        for pattern in self.patterns:
+            if (pattern.match(name)):
+                return True
+        return False
+
+    def walk(self, top):
+        if (scandir is None or ThreadPoolExecutor is None or self.walkWorkers == 1):
+            return self.walkSerial(top)
+        return self.walkParallel(top, self.listLocal)
+
+    def walkSerial(self, top):
+        for root, dirs, files in (os.walk(top)):
+            dirs.sort()  # a repeatable order for checkpointed crawls
+            for file in sorted(files):
+                if (self.matches(file)):
+                    yield os.path.join(root, file)
+
+    def listLocal(self, directory, emit):
+        try:
+            entries = list(scandir(directory))
+        except OSError:
+            return []  # unreadable directories are skipped like os.walk
+        subdirs = []
+        for entry in entries:
+            try:
+                isDir = entry.is_dir()
+            except OSError:
+                isDir = False
+            if (isDir):
+                # symlinked directories are not followed, as in os.walk
+                if (not entry.is_symlink()):
+                    subdirs.append(entry.path)
+            elif (self.matches(entry.name)):
+                emit(entry.path)
+        return subdirs
+
+    def walkS3(self, uri, recurse=True, urlFormat='s3://{0}/{1}'):
+        # uri is s3://bucket/prefix/, matching keys are yielded as urlFormat
+        index = uri.find("/", 5)
+        if (index == -1):
+            index = len(uri)
+        top = (uri[5:index], uri[index + 1:])
+
+        def listPrefix(location, emit):
+            (bucket, prefix) = location
+            subdirs = []
+            paginator = s3ClientPool.getClient().get_paginator('list_objects_v2')
+            for page in paginator.paginate(
+                    Bucket=bucket, Prefix=prefix, Delimiter='/', RequestPayer='requester'):
+                for obj in page.get('Contents', []):
+                    if (self.matches(obj['Key'][len(prefix):])):
+                        emit(urlFormat.format(bucket, obj['Key']))
+                if (recurse):
+                    for common in page.get('CommonPrefixes', []):
+                        subdirs.append((bucket, common['Prefix']))
+            return subdirs
+
+        if (ThreadPoolExecutor is None or self.walkWorkers == 1):
+            return self.walkSerialWith(top, listPrefix)
+        return self.walkParallel(top, listPrefix)
+
+    def walkSerialWith(self, top, listDirectory):
+        pending = [top]
+        while (pending):
+            found = []
+            subdirs = listDirectory(pending.pop(), found.append)
+            pending.extend(reversed(subdirs))
+            for filename in found:
+                yield filename
+
+    def walkParallel(self, top, listDirectory):
+        results = queue.Queue(self.walkQueueSize)
+        lock = threading.Lock()
+        stopped = threading.Event()
+        pending = [1]  # directories submitted but not yet listed
+        done = object()
+        executor = ThreadPoolExecutor(max_workers=self.walkWorkers)
+
+        def put(item):
+            while (not stopped.is_set()):
+                try:
+                    results.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def scan(directory):
+            try:
+                if (stopped.is_set()):
+                    return
+                subdirs = listDirectory(directory, put)
+                with lock:
+                    pending[0] += len(subdirs)
+                for subdir in subdirs:
+                    if (stopped.is_set()):
+                        with lock:
+                            pending[0] -= 1
+                        continue
+                    executor.submit(scan, subdir)
+            finally:
+                with lock:
+                    pending[0] -= 1
+                    finished = (pending[0] == 0)
+                if (finished):
+                    put(done)
+
+        executor.submit(scan, top)
+        try:
+            while True:
+                item = results.get()
+                if (item is done):
+                    break
+                yield item
+        finally:
+            stopped.set()
+            executor.shutdown(wait=True)
+
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Incremental crawl state shared by the Builder and Crawler classes
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class CrawlState():
+
+    # Optional sqlite store of what earlier crawls saw, so a re-crawl only\
+    # yields new or changed scenes. Each scene keeps its size, mtime/ETag\
+    # validator and tag set, and the tags built since it last changed.\
+    # A scene is skipped when its validator is unchanged and all its tags\
+    # were built since. Scenes of the same crawl inputs that are not seen\
+    # again are reported as removed once the crawl completes.
+    def __init__(self, path, reportPath=None):
+        self.path = path
+        self.reportPath = reportPath
+        self.removed = []
+        self._scope = None
+        self._runId = None
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS scenes (path TEXT PRIMARY KEY, scope TEXT, size INTEGER, validator TEXT, tags TEXT, seen REAL)')
+        self._db.execute(
+            'CREATE INDEX IF NOT EXISTS scenes_scope ON scenes (scope, seen)')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS builds (path TEXT, tag TEXT, built REAL, PRIMARY KEY (path, tag))')
+        self._db.commit()
+
+    def beginRun(self, scope, runId=None):
+        self._scope = scope
+        self._runId = runId or time.time()
+        self.removed = []
+
+    def observe(self, path, size, validator, tags=None):
+        # returns True when the scene is unchanged since its last build.\
+        # 'tags' may be a function of the path, it is only called for new or\
+        # changed scenes, unchanged ones keep the tags stored when last seen.
+        with self._lock:
+            row = self._db.execute(
+                'SELECT size, validator, tags FROM scenes WHERE path = ?', (path,)).fetchone()
+        unchanged = (row is not None and validator is not None and
+                     row[0] == size and row[1] == validator)
+        if (callable(tags)):
+            tags = row[2].split(';') if (unchanged and row[2]) else tags(path)
+        tagSet = ';'.join(tags) if tags else None
+        with self._lock:
+            if (unchanged):
+                built = set(r[0] for r in self._db.execute(
+                    'SELECT tag FROM builds WHERE path = ?', (path,)))
+                if (tags):
+                    unchanged = set(tags).issubset(built)
+                else:
+                    unchanged = (len(built) > 0)
+                self._db.execute('UPDATE scenes SET scope = ?, tags = ?, seen = ? WHERE path = ?',
+                                 (self._scope, tagSet, self._runId, path))
+            else:
+                # new or changed, builds of the previous version no longer count
+                self._db.execute('DELETE FROM builds WHERE path = ?', (path,))
+                self._db.execute('INSERT OR REPLACE INTO scenes VALUES (?, ?, ?, ?, ?, ?)',
+                                 (path, self._scope, size, validator, tagSet, self._runId))
+            self.commit(False)
+        return unchanged
+
+    def recordBuild(self, path, tag):
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO builds (path, tag, built) VALUES (?, ?, ?)',
+                             (path, tag, time.time()))
+            self.commit(False)
+
+    def finishRun(self):
+        # removes and returns the scenes of this crawl's inputs not seen again
+        with self._lock:
+            rows = self._db.execute('SELECT path FROM scenes WHERE scope = ? AND seen < ?',
+                                    (self._scope, self._runId)).fetchall()
+            self.removed = [row[0] for row in rows]
+            for path in self.removed:
+                self._db.execute('DELETE FROM scenes WHERE path = ?', (path,))
+                self._db.execute('DELETE FROM builds WHERE path = ?', (path,))
+            self.commit(True)
+        if (self.reportPath):
+            with open(self.reportPath, 'w') as report:
+                for path in self.removed:
+                    report.write(path + '\n')
+        return self.removed
+
+    def commit(self, force):
+        # batches the writes of a crawl, callers hold the lock
+        self._writes += 1
+        if (force or self._writes >= 256):
+            self._db.commit()
+            self._writes = 0
+
+    def skipUnchanged(self, paths, scope, tags, statScene, runId=None):
+        self.beginRun(scope, runId)
+        for path in paths:
+            (size, validator) = statScene(path)
+            if (not self.observe(path, size, validator, tags)):
+                yield path
+        self.finishRun()
+
+
+crawlState = None
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# JSON-lines manifests for the Crawler class
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class ManifestReader():
+
+    # Streams newline-delimited JSON manifests (.jsonl or .ndjson, optionally\
+    # gzip compressed) as crawler input. A line is either a STAC item, whose\
+    # metadata document is its odc_yaml link, or a record naming the document\
+    # in a 'path' or 'raster' field like the csv manifests. When the line\
+    # already carries the fields the builder reads, an inline 'document' or a\
+    # STAC item with projection info and band assets, the document is put in\
+    # the document cache and the builder does not fetch the yaml.
+    def __init__(self, synthesizeDocuments=True):
+        self.synthesizeDocuments = synthesizeDocuments
+
+    def isManifest(self, path):
+        return path.lower().endswith(('.jsonl', '.ndjson', '.jsonl.gz', '.ndjson.gz'))
+
+    def read(self, path):
+        if (path.lower().endswith('.gz')):
+            manifest = gzip.open(path, 'rb')
+        else:
+            manifest = open(path, 'rb')
+        with manifest:
+            for line in manifest:
+                line = line.strip()
+                if (not line):
+                    continue
+                record = json.loads(line.decode('utf-8'))
+                uri = self.getDocumentPath(record)
+                if (uri is None):
+                    continue
+                doc = self.getDocument(record, uri)
+                if (doc is not None):
+                    documentCache.put(uri, doc)
+                elif (not uri.startswith(("http", "s3")) and not os.path.exists(uri)):
+                    continue  # as for csv manifests, missing local documents are skipped
+                yield uri
+
+    def getDocumentPath(self, record):
+        if (record.get('type') != 'Feature'):
+            return record.get('path') or record.get('raster')
+        for link in record.get('links', []):
+            if (link.get('rel') == 'odc_yaml'):
+                return link.get('href')
+        for asset in record.get('assets', {}).values():
+            if (asset.get('href', '').endswith('.yaml')):
+                return asset['href']
+        return None
+
+    def getDocument(self, record, uri):
+        if ('document' in record):
+            return record['document']
+        if (record.get('type') != 'Feature' or not self.synthesizeDocuments):
+            return None
+        return self.documentFromStac(record, uri)
+
+    def documentFromStac(self, item, uri):
+        # maps a STAC item onto the eo document fields the builder reads, or\
+        # returns None when the item lacks any of them
+        props = item.get('properties', {})
+        epsg = props.get('proj:epsg')
+        bbox = props.get('proj:bbox')
+        geometry = props.get('proj:geometry')
+        if (epsg is None or bbox is None or geometry is None or not props.get('datetime')):
+            return None
+        baseDir = uri[0:max(uri.rfind('/'), uri.rfind('\\')) + 1]
+        bands = {}
+        for name, asset in item.get('assets', {}).items():
+            href = asset.get('href', '')
+            if (baseDir and href.startswith(baseDir)):
+                href = href[len(baseDir):]  # band paths are relative to the document
+            elif ('://' in href):
+                return None  # the builder can not address a band outside the scene
+            bands[name] = {'path': href}
+        (minX, minY, maxX, maxY) = bbox[0:4]
+        instruments = props.get('instruments') or [None]
+        coord = None
+        if (item.get('bbox')):
+            (west, south, east, north) = item['bbox'][0:4]
+            coord = {
+                'll': {'lat': south, 'lon': west},
+                'lr': {'lat': south, 'lon': east},
+                'ul': {'lat': north, 'lon': west},
+                'ur': {'lat': north, 'lon': east}}
+        platform = props.get('platform')
+        return {
+            'id': item.get('id'),
+            'product_type': props.get('odc:product', item.get('collection')),
+            'processing_level': props.get('odc:processing_level'),
+            'platform': {'code': platform.upper().replace('-', '_') if platform else None},
+            'instrument': {'name': instruments[0].upper() if instruments[0] else None},
+            'extent': {'center_dt': props['datetime'], 'coord': coord},
+            'grid_spatial': {'projection': {
+                'spatial_reference': 'EPSG:{0}'.format(epsg),
+                'geo_ref_points': {
+                    'll': {'x': minX, 'y': minY},
+                    'lr': {'x': maxX, 'y': minY},
+                    'ul': {'x': minX, 'y': maxY},
+                    'ur': {'x': maxX, 'y': maxY}},
+                'valid_data': geometry}},
+            'image': {'bands': bands, 'cloud_cover_percentage': props.get('eo:cloud_cover')}}
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Crawl checkpoint and resume for the Crawler class
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class CrawlCheckpoint():
+
+    # Saves the crawler position to a local json file so an interrupted\
+    # crawl can be resumed. The position is the index of the crawler input\
+    # and the count of paths generated from it up to the last scene whose\
+    # tags were all emitted, plus the tags already emitted for the scene in\
+    # progress. Paths read ahead or filtered out after generation are\
+    # tracked in order, so the position never passes a scene that was not\
+    # emitted. The file is rewritten at most every 'interval' seconds, the\
+    # default of 0 saves after every item so a resume never emits an item\
+    # twice. The inputs must not change between the crawl and its resume.\
+    # The de-duplication keys of completed positions are appended to a\
+    # journal next to the file and replayed on resume, so scenes yielded\
+    # before the interruption are still dropped when the inputs overlap.
+    def __init__(self, path, inputs, resume=False, interval=0):
+        self.path = path
+        self.keysPath = path + '.keys'
+        self.inputs = list(inputs)
+        self.interval = float(interval or 0)
+        self.runId = time.time()
+        self.inputIndex = 0
+        self.position = 0
+        self.done = [0, 0]
+        self.donePath = None
+        self.current = None
+        self.currentPosition = None
+        self.currentTags = []
+        self.skipTo = [0, 0]
+        self.skipToPath = None
+        self.skipTags = []
+        self.resumePosition = None
+        self.resumeTags = []
+        self._inFlight = deque()
+        self._pendingKeys = {}
+        self._doneKeys = []
+        self._saved = 0
+        self.resumed = False
+        if (resume and os.path.exists(path)):
+            with open(path, 'r') as checkpoint:
+                state = json.load(checkpoint)
+            if (state['inputs'] != self.inputs):
+                raise Exception('Err. Checkpoint does not match the crawler inputs!')
+            self.runId = state['runId']
+            self.done = self.skipTo = state['done']
+            self.donePath = self.skipToPath = state['donePath']
+            self.resumePosition = state['position']
+            self.resumeTags = state['tags']
+            self.resumed = True
+        elif (os.path.exists(self.keysPath)):
+            os.remove(self.keysPath)  # left by a crawl that is not resumed
+
+    def attach(self, deduplicator):
+        # journals the keys the deduplicator sees from now on and restores\
+        # the keys of the positions completed before the interruption
+        deduplicator.listener = self.recordKey
+        if (not self.resumed or not os.path.exists(self.keysPath)):
+            return
+        with open(self.keysPath, 'r') as journal:
+            for line in journal:
+                try:
+                    (inputIndex, position, key) = json.loads(line)
+                except ValueError:
+                    continue  # cut short by the interruption
+                # keys written ahead of a checkpoint that was not saved are\
+                # seen again when their paths are crawled again
+                if ([inputIndex, position] <= self.done):
+                    deduplicator.add(key)
+
+    def recordKey(self, path, key):
+        self._pendingKeys.setdefault(path, []).append(key)
+
+    def complete(self, path, position):
+        self.done = position
+        self.donePath = path
+        for key in self._pendingKeys.pop(path, ()):
+            self._doneKeys.append([position[0], position[1], key])
+
+    def iterInputs(self, paths):
+        for index, path in enumerate(paths):
+            if (index < self.skipTo[0]):
+                continue  # completed before the crawl was interrupted
+            self.inputIndex = index
+            self.position = 0
+            yield path
+
+    def track(self, paths):
+        for path in paths:
+            self.position += 1
+            position = [self.inputIndex, self.position]
+            if (position <= self.skipTo):
+                if (position == self.skipTo and path != self.skipToPath):
+                    raise Exception('Err. Crawler input changed since the checkpoint!')
+                continue
+            self._inFlight.append((path, position))
+            yield path
+
+    def follow(self, paths):
+        # the crawler pulls a path once all tags of the previous one were\
+        # emitted, so each pull completes the scene before it
+        for path in paths:
+            if (self.currentPosition is not None):
+                self.complete(self.current, self.currentPosition)
+            self.currentPosition = None
+            while (self._inFlight):
+                (inFlightPath, position) = self._inFlight.popleft()
+                if (inFlightPath == path):
+                    self.currentPosition = position
+                    break
+                self.complete(inFlightPath, position)  # filtered out, nothing left to emit
+            self.current = path
+            self.currentTags = []
+            self.skipTags = []
+            if (self.currentPosition == self.resumePosition):
+                self.currentTags = list(self.resumeTags)
+                self.skipTags = self.resumeTags
+            yield path
+        # the crawl completed, the next crawl starts from the beginning
+        for completed in (self.path, self.keysPath):
+            if (os.path.exists(completed)):
+                os.remove(completed)
+
+    def emit(self, tag):
+        # returns False for an item emitted before the crawl was interrupted
+        if (tag in self.skipTags):
+            return False
+        self.currentTags.append(tag)
+        if (time.time() - self._saved >= self.interval):
+            self.save()
+        return True
+
+    def save(self):
+        if (self._doneKeys):
+            # appended before the position that covers them is saved
+            with open(self.keysPath, 'a') as journal:
+                for entry in self._doneKeys:
+                    journal.write(json.dumps(entry) + '\n')
+            self._doneKeys = []
+        state = {'inputs': self.inputs, 'runId': self.runId, 'done': self.done,
+                 'donePath': self.donePath, 'position': self.currentPosition,
+                 'tags': self.currentTags}
+        temp = self.path + '.tmp'
+        with open(temp, 'w') as checkpoint:
+            json.dump(state, checkpoint)
+        if (hasattr(os, 'replace')):
+            os.replace(temp, self.path)
+        else:  # python 2.7
+            if (os.path.exists(self.path)):
+                os.remove(self.path)
+            os.rename(temp, self.path)
+        self._saved = time.time()
+
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Metadata predicates evaluated by the Crawler class
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class SceneFilter():
+
+    # Crawler-side predicates on scene metadata: acquisition date range,\
+    # WGS84 bounding box intersection, maximum cloud cover and platform.\
+    # Scenes failing a predicate are dropped before a URI reaches the\
+    # builder. A value missing from the metadata does not exclude a scene.
+    def __init__(self, startDate=None, endDate=None, bbox=None, maxCloudCover=None, platforms=None):
+        self.startDate = str(startDate)[0:10] if startDate else None
+        self.endDate = str(endDate)[0:10] if endDate else None
+        if (isinstance(bbox, str)):
+            bbox = bbox.split(',')
+        self.bbox = [float(v) for v in bbox] if bbox else None
+        self.maxCloudCover = float(maxCloudCover) if maxCloudCover is not None else None
+        if (isinstance(platforms, str)):
+            platforms = re.split('[;,]', platforms)
+        self.platforms = [self.normalizePlatform(p) for p in (platforms or []) if p.strip()]
+        self.active = (self.startDate is not None or self.endDate is not None or
+                       self.bbox is not None or self.maxCloudCover is not None or
+                       len(self.platforms) > 0)
+        self.dropped = 0
+
+    def normalizePlatform(self, platform):
+        return str(platform).strip().upper().replace('-', '_')
+
+    def matches(self, scene):
+        date = scene.get('date')
+        if (date is not None):
+            date = str(date)[0:10]
+            if (self.startDate is not None and date < self.startDate):
+                return False
+            if (self.endDate is not None and date > self.endDate):
+                return False
+        box = scene.get('bbox')
+        if (self.bbox is not None and box is not None):
+            if (box[2] < self.bbox[0] or box[0] > self.bbox[2] or
+                    box[3] < self.bbox[1] or box[1] > self.bbox[3]):
+                return False
+        cloudCover = scene.get('cloudCover')
+        if (self.maxCloudCover is not None and cloudCover is not None):
+            if (float(cloudCover) > self.maxCloudCover):
+                return False
+        platform = scene.get('platform')
+        if (self.platforms and platform is not None):
+            platform = self.normalizePlatform(platform)
+            if (not any(platform.startswith(p) for p in self.platforms)):
+                return False
+        return True
+
+    def select(self, paths, getSceneProperties):
+        if (not self.active):
+            for path in paths:
+                yield path
+            return
+        for path in paths:
+            try:
+                scene = getSceneProperties(path)
+            except BaseException:
+                scene = {}  # unreadable metadata is reported by the builder
+            if (self.matches(scene)):
+                yield path
+            else:
+                self.dropped += 1
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# De-duplication of overlapping crawler inputs
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class BloomFilter():
+
+    # Fixed-size probabilistic set sized for 'capacity' keys at the given\
+    # false positive rate. Membership is never missed, but a key that was\
+    # not added is reported as present with about that probability.
+    def __init__(self, capacity, falsePositiveRate):
+        bits = -capacity * math.log(falsePositiveRate) / (math.log(2) ** 2)
+        self.size = max(64, int(math.ceil(bits)))
+        self.hashes = max(1, int(round(self.size / float(capacity) * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add(self, key):
+        # adds the key and returns True when it was (probably) present before
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        first = int(digest[0:16], 16)
+        second = int(digest[16:32], 16) | 1
+        present = True
+        for i in range(self.hashes):
+            position = (first + i * second) % self.size
+            mask = 1 << (position & 7)
+            if (not self.bits[position >> 3] & mask):
+                present = False
+                self.bits[position >> 3] |= mask
+        return present
+
+
+class Deduplicator():
+
+    # Drops paths, and scene ids where the raster type has them, that the\
+    # crawler already yielded when its inputs overlap. Keys are held in an\
+    # exact set. Only when an 'exactLimit' is given are they moved to a Bloom\
+    # filter past that many entries, so memory stays bounded for very large\
+    # manifests at the cost of rarely dropping a scene that was not a\
+    # duplicate. 'listener' is called with the path and key of every key seen\
+    # for the first time.
+    def __init__(self, exactLimit=None, bloomCapacity=10000000, falsePositiveRate=0.0001):
+        self.exactLimit = int(exactLimit) if exactLimit else None
+        self.bloomCapacity = int(bloomCapacity)
+        self.falsePositiveRate = float(falsePositiveRate)
+        self.keys = set()
+        self.bloom = None
+        self.dropped = {'path': 0, 'id': 0}
+        self.listener = None
+
+    def add(self, key):
+        # returns True for a key not seen before
+        if (self.bloom is not None):
+            return not self.bloom.add(key)
+        if (key in self.keys):
+            return False
+        self.keys.add(key)
+        if (self.exactLimit is not None and len(self.keys) > self.exactLimit):
+            self.bloom = BloomFilter(
+                max(self.bloomCapacity, len(self.keys) * 2), self.falsePositiveRate)
+            for exactKey in self.keys:
+                self.bloom.add(exactKey)
+            self.keys = set()
+        return True
+
+    def normalizePath(self, path):
+        path = path.strip()
+        # virtual-hosted S3 urls and s3:// uris of an object are the same scene
+        match = re.match(r'^https?://(.+?)\.s3[\w.-]*\.amazonaws\.com/(.*)$', path)
+        if (match):
+            return 's3://{0}/{1}'.format(match.group(1), match.group(2))
+        if (path.startswith(("http", "s3"))):
+            return path
+        return os.path.normcase(os.path.abspath(path))
+
+    def select(self, paths, getKey, kind):
+        for path in paths:
+            try:
+                key = getKey(path)
+            except BaseException:
+                key = None  # the builder reads the metadata again and reports the error
+            if (key is None):
+                yield path
+            elif (self.add(kind + ':' + key)):
+                if (self.listener is not None):
+                    self.listener(path, kind + ':' + key)
+                yield path
+            else:
+                self.dropped[kind] += 1
+
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Stat-free existence checks for csv manifests
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class ListingCache():
+
+    # Answers whether local files exist from one listing of each parent\
+    # directory instead of a stat call per path, which dominates crawls of\
+    # large csv manifests on network shares. Paths are checked in batches so\
+    # the distinct directories of a batch are listed once, in parallel, and\
+    # the listings of the most recently used directories are kept. It is off\
+    # unless enabled, a listing can miss files created after it was taken.
+    def __init__(self, enabled=False, maxDirectories=4096, batchSize=10000, listWorkers=8):
+        self.enabled = enabled
+        self.maxDirectories = max(1, int(maxDirectories))
+        self.batchSize = max(1, int(batchSize))
+        self.listWorkers = max(1, int(listWorkers))
+        self.listings = OrderedDict()
+        self.statCalls = 0
+        self.listCalls = 0
+        self.lookups = 0
+
+    def listDirectory(self, directory):
+        try:
+            return set(os.path.normcase(name) for name in os.listdir(directory))
+        except OSError:
+            return set()  # a missing or unreadable directory holds no files
+
+    def load(self, directories):
+        missing = []
+        for directory in directories:
+            if (directory in self.listings):
+                self.listings[directory] = self.listings.pop(directory)  # most recently used
+            else:
+                missing.append(directory)
+        if (len(missing) > 1 and self.listWorkers > 1 and ThreadPoolExecutor is not None):
+            with ThreadPoolExecutor(max_workers=min(self.listWorkers, len(missing))) as executor:
+                listings = list(executor.map(self.listDirectory, missing))
+        else:
+            listings = [self.listDirectory(directory) for directory in missing]
+        self.listCalls += len(missing)
+        for directory, names in zip(missing, listings):
+            self.listings[directory] = names
+        while (len(self.listings) > self.maxDirectories):
+            self.listings.popitem(last=False)
+
+    def exists(self, path):
+        if (not self.enabled):
+            self.statCalls += 1
+            return os.path.exists(path)
+        directory, name = os.path.split(os.path.abspath(path))
+        if (directory not in self.listings):
+            self.load([directory])  # evicted while its batch was checked
+        self.lookups += 1
+        return os.path.normcase(name) in self.listings[directory]
+
+    def select(self, paths):
+        # yields remote paths and the local paths that exist, in input order
+        batch = []
+        for path in paths:
+            batch.append(path)
+            if (len(batch) >= self.batchSize):
+                for selected in self.selectBatch(batch):
+                    yield selected
+                batch = []
+        for selected in self.selectBatch(batch):
+            yield selected
+
+    def selectBatch(self, batch):
+        local = [path for path in batch if not path.startswith(("http", "s3"))]
+        if (self.enabled and local):
+            directories = OrderedDict()
+            for path in local:
+                directories[os.path.dirname(os.path.abspath(path))] = True
+            self.load(list(directories))
+        for path in batch:
+            if (path.startswith(("http", "s3")) or self.exists(path)):
+                yield path
+
+    def getStats(self):
+        return {'statCalls': self.statCalls, 'listCalls': self.listCalls,
+                'lookups': self.lookups, 'directories': len(self.listings)}
+
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Built item records shared by the Builder classes
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class BandProperty(object):
+
+    # A band of the bandProperties list of an item. The band tables of the\
+    # module hold these records, so the dict of a band is created once and\
+    # shared by every item listing it, and must not be modified.
+    __slots__ = ('bandName', '_dict')
+
+    def __init__(self, bandName):
+        self.bandName = bandName
+        self._dict = None
+
+    def toDict(self):
+        if (self._dict is None):
+            self._dict = {'bandName': self.bandName}
+        return self._dict
+
+
+class RasterInfo(object):
+
+    # The rasterInfo block of a raster function argument, interned by\
+    # rasterInfoPool. Its dict is created once and shared by the items\
+    # referring to the record, and must not be modified.
+    __slots__ = ('pixelType', 'size', 'spatialReference',
+                 'xMin', 'yMin', 'xMax', 'yMax', '_dict')
+
+    def __init__(self, pixelType, size, extent):
+        self.pixelType = pixelType
+        self.size = size
+        (self.spatialReference, self.xMin, self.yMin,
+         self.xMax, self.yMax) = extent
+        self._dict = None
+
+    def toDict(self):
+        if (self._dict is None):
+            self._dict = {
+                'pixelType': self.pixelType,
+                'ncols': self.size,
+                'nRows': self.size,
+                'nBands': 1,
+                'spatialReference': self.spatialReference,
+                'xMin': self.xMin,
+                'yMin': self.yMin,
+                'xMax': self.xMax,
+                'yMax': self.yMax}
+        return self._dict
+
+
+class BuiltItem(object):
+
+    # An item of the builder, assembled as a record and converted to the\
+    # dict form expected by the framework by toDict when the builder\
+    # returns. The raster arguments and keyProperties belong to the item\
+    # and are completed in place, the rasterInfo and bandProperties\
+    # records are serialized to their shared dicts.
+    __slots__ = ('raster', 'spatialReference', 'variables', 'itemUri',
+                 'keyProperties', 'bandProperties', 'footprint')
+
+    def __init__(self, itemUri, spatialReference, keyProperties, footprint,
+                 raster=None, bandProperties=None, variables=None):
+        self.raster = raster
+        self.spatialReference = spatialReference
+        self.variables = variables if variables is not None else {}
+        self.itemUri = itemUri
+        self.keyProperties = keyProperties
+        self.bandProperties = bandProperties
+        self.footprint = footprint
+
+    def toDict(self):
+        builtItem = {}
+        if (self.raster is not None):
+            arguments = self.raster['functionDataset']['rasterFunctionArguments']
+            for name in arguments:
+                value = arguments[name]
+                if (isinstance(value, RasterInfo)):
+                    arguments[name] = value.toDict()
+            builtItem['raster'] = self.raster
+        builtItem['spatialReference'] = self.spatialReference
+        builtItem['variables'] = self.variables
+        builtItem['itemUri'] = self.itemUri
+        if (self.bandProperties is not None):
+            self.keyProperties['bandProperties'] = [
+                band.toDict() for band in self.bandProperties]
+        builtItem['keyProperties'] = self.keyProperties
+        builtItem['footprint'] = self.footprint
+        return builtItem
+
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Interned rasterInfo blocks shared by the Builder classes
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class RasterInfoPool():
+
+    # Interns the rasterInfo records of the raster function arguments per\
+    # pixel type, size, spatial reference and extent. The bands of an item\
+    # that agree on these, and the other items built from the same scene,\
+    # share one record and so one serialized dict. The most recently\
+    # created 'maxSize' records are kept.
+    def __init__(self, maxSize=64):
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, pixelType, size, extent):
+        # extent is (spatialReference, xMin, yMin, xMax, yMax)
+        key = (pixelType, size) + extent
+        with self._lock:
+            rasterInfo = self._entries.get(key)
+            if (rasterInfo is not None):
+                self.hits += 1
+                return rasterInfo
+            self.misses += 1
+            rasterInfo = RasterInfo(pixelType, size, extent)
+            self._entries[key] = rasterInfo
+            if (len(self._entries) > self.maxSize):
+                self._entries.popitem(last=False)
+            return rasterInfo
+
+    def getStats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self._entries)}
+
+
+rasterInfoPool = RasterInfoPool()
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Precompiled MRF templates for the Builder classes
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class MRFTemplate(object):
+
+    # An embedded MRF document with {field} placeholders, split once into\
+    # its static parts and the fields left to fill. bind fills some of the\
+    # fields and returns the template of the remaining ones, so the fields\
+    # of a band profile and those shared by the bands of a scene are each\
+    # formatted once and a band only fills in its own file name.
+    __slots__ = ('parts', 'fields', '_format', '_profiles', '_latest')
+
+    def __init__(self, parts, fields):
+        self.parts = parts  # static text around the fields
+        self.fields = fields
+        self._format = parts[0].replace('%', '%%') + ''.join([
+            '%({0})s'.format(field) + part.replace('%', '%%')
+            for (field, part) in zip(fields, parts[1:])])
+        self._profiles = {}
+        self._latest = (None, None)
+
+    @classmethod
+    def compile(cls, template):
+        pieces = re.split(r'\{(\w+)\}', template)
+        return cls(tuple(pieces[0::2]), tuple(pieces[1::2]))
+
+    def bind(self, **values):
+        parts = []
+        fields = []
+        pieces = [self.parts[0]]  # text of the part being joined
+        for (field, part) in zip(self.fields, self.parts[1:]):
+            if (field in values):
+                pieces.append('{0}'.format(values[field]))
+            else:
+                parts.append(''.join(pieces))
+                fields.append(field)
+                pieces = []
+            pieces.append(part)
+        parts.append(''.join(pieces))
+        return MRFTemplate(tuple(parts), tuple(fields))
+
+    def profile(self, **values):
+        # bind memoized per set of values, the few band profiles of a\
+        # product are compiled once and shared. Callers pass the fields of\
+        # a profile in the same order.
+        key = tuple(values.items())
+        template = self._profiles.get(key)
+        if (template is None):
+            template = self.bind(**values)
+            self._profiles[key] = template
+        return template
+
+    def latest(self, **values):
+        # bind memoized for the most recent set of values only, for the\
+        # fields shared by consecutive calls such as the bands of a scene
+        key = tuple(values.items())
+        (latestKey, template) = self._latest
+        if (key != latestKey):
+            template = self.bind(**values)
+            self._latest = (key, template)
+        return template
+
+    def format(self, **values):
+        try:
+            return self._format % values
+        except KeyError as exp:
+            raise Exception('Err. MRF field {0} is not set!'.format(exp))
+
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Content-addressed MRF sidecars for the Builder classes
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class MRFSidecarStore():
+
+    # Writes each embedded MRF document once to a sidecar directory, named\
+    # by the sha1 of its content, so that items reference the file instead\
+    # of carrying the XML. Identical documents share one file and a file\
+    # never changes once written. The digests written or found by this\
+    # process, up to 'maxKnown', are remembered to skip the check for the\
+    # file.
+    def __init__(self, path, maxKnown=65536):
+        self.path = path
+        self.maxKnown = maxKnown
+        self._lock = threading.Lock()
+        self._known = set()
+
+    def reference(self, mrf):
+        data = mrf.encode('utf-8')
+        digest = hashlib.sha1(data).hexdigest()
+        sidecar = os.path.join(self.path, digest[0:2], digest + '.mrf')
+        with self._lock:
+            if (digest in self._known):
+                return sidecar
+        if (not os.path.exists(sidecar)):
+            self.write(sidecar, data)
+        with self._lock:
+            if (len(self._known) >= self.maxKnown):
+                self._known.clear()
+            self._known.add(digest)
+        return sidecar
+
+    def write(self, sidecar, data):
+        directory = os.path.dirname(sidecar)
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if (not os.path.isdir(directory)):
+                raise
+        # written under a temporary name and renamed, so that a reader never\
+        # sees a partial file
+        temp = '{0}.{1}.{2}.tmp'.format(
+            sidecar, os.getpid(), threading.current_thread().ident)
+        with open(temp, 'wb') as f:
+            f.write(data)
+        try:
+            os.rename(temp, sidecar)
+        except OSError:
+            # another builder wrote the same document first
+            os.remove(temp)
+            if (not os.path.exists(sidecar)):
+                raise
+
+
+mrfSidecars = None
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Compiled build plans for the Builder classes
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class BuildPlan():
+
+    # The raster function dataset of one tag compiled once into a skeleton\
+    # with slots for the band paths, spatial reference and extent of a\
+    # scene. Items are built by filling the slots instead of spelling out\
+    # every RasterN and RasterN_rasterInfo argument.
+    def __init__(self, rasterFunction, bandNames, pixelType, size, sources=None):
+        self.rasterFunction = rasterFunction
+        self.bandNames = tuple(bandNames)
+        # document bands read for each slot, alternatives are tried in turn
+        self.sources = tuple(sources) if sources is not None else tuple(
+            (bandName,) for bandName in self.bandNames)
+        self.rasterSlots = tuple(
+            'Raster{0}'.format(i) for i in range(1, len(self.sources) + 1))
+        self.infoSlots = tuple(slot + '_rasterInfo' for slot in self.rasterSlots)
+        self.pixelType = pixelType
+        self.size = size
+        self.bandProperties = tuple(
+            BandProperty(bandName) for bandName in self.bandNames)
+
+    def instantiate(self, rasters, spatialReference, minX, minY, maxX, maxY):
+        rasterInfo = rasterInfoPool.get(
+            self.pixelType, self.size, (spatialReference, minX, minY, maxX, maxY))
+        arguments = dict(zip(self.rasterSlots, rasters))
+        arguments.update(zip(self.infoSlots, [rasterInfo] * len(self.infoSlots)))
+        return {
+            'functionDataset': {
+                'rasterFunction': self.rasterFunction,
+                'rasterFunctionArguments': arguments}}
+
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+# Utility functions shared by the Utilities classes of the raster types
+# ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ## ----- ##
+
+
+class BaseUtilities():
+
+    # The metadata readers, caches and crawl state helpers common to the\
+    # raster types. Each raster type derives its Utilities class from it\
+    # and adds the product specific lookups.
+
+    # parses a yaml document, raster types may use another loader
+    def loadYaml(self, data):
+        return yaml.load(data)
+
+    def readYaml(self, path):  # to read the yaml file located locally.
+        if (metadataCache is not None):
+            validator = metadataCache.localValidator(path)
+            doc = metadataCache.get(path, validator)
+            if (doc is not None):
+                return doc
+        try:
+            with open(path, 'r') as q:
+                try:
+                    doc = self.loadYaml(q.read())
+                except yaml.YAMLError as exc:
+                    raise
+        except BaseException:
+            raise
+        if (metadataCache is not None):
+            metadataCache.put(path, validator, doc)
+        return doc
+
+    def readYamlS3(self, path):  # to read the yaml file located on S3
+        headers = {}
+        cached = None
+        if (metadataCache is not None):
+            cached = metadataCache.getEntry(path)
+            if (cached is not None):
+                headers = metadataCache.conditionalHeaders(cached[0])
+        page = httpTransport.get(path, headers=headers)
+        if (cached is not None and page.status_code == 304):
+            metadataCache.touch(path)
+            return cached[1]
+        try:
+            doc = self.loadYaml(page.content)
+        except yaml.YAMLError as exc:
+            raise
+        if (metadataCache is not None):
+            metadataCache.put(path, metadataCache.remoteValidator(
+                page.headers.get('ETag'), page.headers.get('Last-Modified')), doc)
+        return doc
+
+    def readYamlS3_boto3(self, bucket, path):  # to read the yaml file located on S3
+        client = s3ClientPool.getClient()
+        uri = 's3://{0}/{1}'.format(bucket, path)
+        conditions = {}
+        cached = None
+        if (metadataCache is not None):
+            cached = metadataCache.getEntry(uri)
+            if (cached is not None and cached[0].startswith('etag:')):
+                conditions['IfNoneMatch'] = cached[0][5:]
+        try:
+            # requester pays buckets need the header and it is ignored by the
+            # others, so a single request covers both
+            page = client.get_object(
+                Bucket=bucket, Key=path, RequestPayer='requester', **conditions)
+        except ClientError as exc:
+            if (cached is not None and exc.response.get('Error', {}).get('Code') in ('304', 'NotModified')):
+                metadataCache.touch(uri)
+                return cached[1]
+            raise
+        try:
+            doc = self.loadYaml(page['Body'].read())
+        except yaml.YAMLError as exc:
+            raise
+        if (metadataCache is not None):
+            metadataCache.put(uri, metadataCache.remoteValidator(
+                page.get('ETag'), None), doc)
+        return doc
+
+    # to read the yaml file from local disk, http:// or s3:// through the\
+    # shared document cache
+    def readDocument(self, path):
+        doc = documentCache.get(path)
+        if (doc is not None):
+            return doc
+        if (path.startswith("http")):
+            doc = self.readYamlS3(path)
+        elif (path.startswith("s3:")):
+            # giving a start index of 5 will ensure that the / from s3:// is
+            # not returned.
+            index = path.find("/", 5)
+            # First 5 letters will always be s3://
+            doc = self.readYamlS3_boto3(path[5:index], path[index + 1:])
+        else:
+            doc = self.readYaml(path)
+        documentCache.put(path, doc)
+        return doc
+
+    # opens the optional sidecar directory for the embedded MRF documents
+    def configureMRFSidecars(self, path):
+        global mrfSidecars
+        if (mrfSidecars is None or mrfSidecars.path != path):
+            mrfSidecars = MRFSidecarStore(path)
+        return mrfSidecars
+
+    # the raster value of an embedded MRF document, the path of its sidecar\
+    # file when a sidecar directory is open and the document itself otherwise
+    def referenceMRF(self, mrf):
+        if (mrfSidecars is None):
+            return mrf
+        return mrfSidecars.reference(mrf)
+
+    # opens the optional persistent metadata cache used by the readYaml family
+    def configureMetadataCache(self, path, maxSizeMB=512):
+        global metadataCache
+        if (metadataCache is None or metadataCache.path != path):
+            metadataCache = MetadataCache(path, maxSizeMB)
+        return metadataCache
+
+    # the id of a scene's metadata document, None when it has none
+    def getSceneId(self, path):
+        doc = self.readDocument(path)
+        if (doc is None or doc.get('id') is None):
+            return None
+        return str(doc['id'])
+
+    # acquisition date, WGS84 bounding box, cloud cover and platform of a\
+    # scene for the crawler filters, None where the document has no value
+    def getSceneProperties(self, path):
+        doc = self.readDocument(path)
+        extent = doc.get('extent') or {}
+        scene = {
+            'date': extent.get('center_dt') or extent.get('from_dt'),
+            'platform': (doc.get('platform') or {}).get('code'),
+            'bbox': None,
+            'cloudCover': (doc.get('image') or {}).get('cloud_cover_percentage')}
+        coord = extent.get('coord')
+        if (coord):
+            lons = [point['lon'] for point in coord.values()]
+            lats = [point['lat'] for point in coord.values()]
+            scene['bbox'] = (min(lons), min(lats), max(lons), max(lats))
+        if (scene['cloudCover'] is None):
+            sources = (doc.get('lineage') or {}).get('source_datasets') or {}
+            for source in sources.values():
+                cloudCover = ((source or {}).get('image') or {}).get('cloud_cover_percentage')
+                if (cloudCover is not None):
+                    scene['cloudCover'] = cloudCover
+                    break
+        return scene
+
+    # opens the optional crawl state store used for incremental crawls
+    def configureCrawlState(self, path, reportPath=None):
+        global crawlState
+        if (crawlState is None or crawlState.path != path):
+            crawlState = CrawlState(path)
+        crawlState.reportPath = reportPath
+        return crawlState
+
+    # records a completed build when a crawl state store is open
+    def recordBuild(self, itemURI):
+        if (crawlState is not None):
+            crawlState.recordBuild(itemURI['path'], itemURI['tag'])
+
+    # size and change validator (mtime or ETag) of a metadata document, the\
+    # validator is None when it cannot be determined
+    def statScene(self, path):
+        try:
+            if (path.startswith("http")):
+                headers = httpTransport.head(path).headers
+                validator = headers.get('ETag') or headers.get('Last-Modified')
+                return (int(headers.get('Content-Length', -1)), validator)
+            if (path.startswith("s3:")):
+                index = path.find("/", 5)
+                head = s3ClientPool.getClient().head_object(
+                    Bucket=path[5:index], Key=path[index + 1:], RequestPayer='requester')
+                return (head.get('ContentLength'), head.get('ETag'))
+            stat = os.stat(path)
+            return (stat.st_size, repr(stat.st_mtime))
+        except BaseException:
+            return (None, None)